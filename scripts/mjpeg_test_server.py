@@ -0,0 +1,87 @@
+"""
+Server MJPEG gia lap digiCamControl Live View (de test khong can DSLR).
+Phat lan luot cac anh trong sample_photos/ duoi dang multipart/x-mixed-replace.
+
+Cach chay:
+    python scripts/mjpeg_test_server.py [--port 8080] [--fps 30]
+Sau do dung URL: http://127.0.0.1:8080/liveview.jpg
+"""
+import os
+import sys
+import time
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import cv2
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOUNDARY = "photoboothframe"
+
+
+def load_jpegs(folder, width=1056):
+    """Doc anh mau, thu nho ve kich thuoc live view va encode san JPEG."""
+    jpegs = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(('.png', '.jpg', '.jpeg')):
+            continue
+        img = cv2.imread(os.path.join(folder, name))
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        if w > width:
+            img = cv2.resize(img, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if ok:
+            jpegs.append(buf.tobytes())
+    return jpegs
+
+
+def make_handler(jpegs, fps):
+    class MjpegHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            i = 0
+            try:
+                while True:
+                    jpeg = jpegs[i % len(jpegs)]
+                    self.wfile.write(f"--{BOUNDARY}\r\n".encode())
+                    self.wfile.write(b"Content-Type: image/jpeg\r\n")
+                    self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                    self.wfile.write(jpeg)
+                    self.wfile.write(b"\r\n")
+                    i += 1
+                    time.sleep(1.0 / fps)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return MjpegHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MJPEG stand-in server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--folder", default=os.path.join(_PROJECT_ROOT, "sample_photos"))
+    args = parser.parse_args()
+
+    jpegs = load_jpegs(args.folder)
+    if not jpegs:
+        print(f"Khong tim thay anh trong {args.folder}")
+        return 1
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(jpegs, args.fps))
+    print(f"Dang phat {len(jpegs)} anh tai http://127.0.0.1:{args.port}/liveview.jpg ({args.fps} fps)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
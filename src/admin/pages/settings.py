@@ -210,11 +210,14 @@ class CameraSetupApp(QMainWindow):
         if self.camera_handler:
             # Ra lệnh cho handler trung tâm khởi động lại với cấu hình mới
             # và đặt callback nhận ảnh duy nhất cho màn hình Setup này
-            self.camera_handler.set_callback(self.on_frame_from_thread)
+            self.camera_handler.set_callback(self.on_frame_from_thread, size=(560, 420), fit="fit")
             self.camera_handler.restart_with_config(index, 1280, 720, use_dshow, use_compat)
-            # Kết nối sự kiện báo lỗi nếu có
-            if self.camera_handler.thread:
-                self.camera_handler.thread.error_occurred.connect(self.on_camera_error)
+            # Kết nối sự kiện báo lỗi nếu có (thread được giữ nguyên khi đổi cấu hình -> chỉ nối 1 lần)
+            thread = self.camera_handler.thread
+            if thread and getattr(self, '_connected_thread', None) is not thread:
+                thread.error_occurred.connect(self.on_camera_error)
+                thread.reconfigured.connect(self.on_camera_switched)
+                self._connected_thread = thread
         else:
             # Fallback nếu chạy độc lập
             from src.services.camera.camera_thread import CameraThread
@@ -222,10 +225,19 @@ class CameraSetupApp(QMainWindow):
                 self.cam_thread.stop()
             
             self.cam_thread = CameraThread(index, width=1280, height=720, use_dshow=use_dshow, use_compat=use_compat)
-            self.cam_thread.frame_ready.connect(self.on_frame_from_thread)
+            self.cam_thread.bus.subscribe("setup", self.on_frame_from_thread, size=(560, 420), fit="fit")
+            self.cam_thread.frame_available.connect(self._drain_standalone_frame)
             self.cam_thread.error_occurred.connect(self.on_camera_error)
             self.cam_thread.start()
 
+    def _drain_standalone_frame(self):
+        """Lấy frame mới nhất từ mailbox của thread (chế độ chạy độc lập)."""
+        if self.cam_thread:
+            renditions = self.cam_thread.mailbox.take()
+            if renditions is not None:
+                self.cam_thread.bus.deliver(renditions)
+                renditions.release()
+
     def on_frame_from_thread(self, q_img):
         """Callback khi có frame từ thread camera (Loại QImage)."""
         # Cập nhật UI nếu đây là frame đầu tiên (chuyển trạng thái)
@@ -233,8 +245,8 @@ class CameraSetupApp(QMainWindow):
             self.status_label.setText("Status: ✅ Camera active")
 
         # Hiển thị lên UI (Signal đã là QImage và đã được lật/xoay sẵn trong thread)
-        pixmap = QPixmap.fromImage(q_img).scaled(560, 420, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.preview_label.setPixmap(pixmap)
+        # Frame đã được thu nhỏ vừa khung 560x420 ở luồng camera
+        self.preview_label.setPixmap(QPixmap.fromImage(q_img))
 
     def on_camera_error(self, message):
         """Callback khi camera gặp lỗi."""
@@ -243,6 +255,10 @@ class CameraSetupApp(QMainWindow):
         self.status_label.setText(f"Status: ⚠️ Error - {message}")
         self.preview_label.setText(f"❌ CONNECTION ERROR\n{message}")
 
+    def on_camera_switched(self, info):
+        """Báo thời gian đổi camera/cấu hình (từ lúc yêu cầu tới khi có hình)."""
+        self.status_label.setText(f"Status: ✅ Camera active ({info['mode']}, {info['latency_ms']:.0f} ms)")
+
     def update_frame(self):
         # Hàm này không còn dùng nữa vì đã dùng CameraThread
         pass
@@ -285,10 +301,7 @@ class CameraSetupApp(QMainWindow):
         
         # Dọn dẹp trước khi thoát
         if self.camera_handler:
-            try:
-                self.camera_handler.frame_received.disconnect(self.on_frame_from_thread)
-            except:
-                pass
+            self.camera_handler.set_callback(None)
         elif hasattr(self, 'cam_thread') and self.cam_thread:
             self.cam_thread.stop()
             
@@ -26,7 +26,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel,
                              QPushButton, QVBoxLayout, QHBoxLayout, QScrollArea,
                              QMessageBox, QFrame, QGridLayout, QStackedWidget,
                              QGroupBox)
-from PyQt5.QtCore import Qt, QTimer, QSize
+from PyQt5.QtCore import Qt, QTimer, QSize, QEvent
 from PyQt5.QtGui import QImage, QPixmap, QFont, QIcon
 
 # Import shared
@@ -54,6 +54,7 @@ from src.services.image.template import (
     detect_layout_from_template
 )
 from src.services.image.collage import create_collage, crop_to_aspect_wh
+from src.services.image.layout_plan import get_layout_plan
 from src.services.image.filters import apply_filter, get_available_filters
 
 # Import UI components
@@ -155,6 +156,9 @@ class PhotoboothApp(QMainWindow):
         _use_compat = _cam_cfg.get("use_compat", False)
         _cam_w = _cam_cfg.get("width", 1280)
         _cam_h = _cam_cfg.get("height", 960)
+        # Nguồn frame: opencv / mjpeg / replay / synthetic (bỏ trống = tự chọn theo camera_index)
+        _cam_source = _cam_cfg.get("source")
+        _cam_source_path = _cam_cfg.get("source_path")
 
         # --- CAMERA SETUP via HANDLER ---
         self.camera_handler.camera_index = _cam_idx
@@ -162,12 +166,45 @@ class PhotoboothApp(QMainWindow):
         self.camera_handler._height = _cam_h
         self.camera_handler._use_dshow = _use_dshow
         self.camera_handler._use_compat = _use_compat
+        self.camera_handler._source = _cam_source
+        self.camera_handler._source_path = _cam_source_path
+        # Chế độ nghỉ: sau idle_after_min phút không ai chạm -> chỉ chạy idle_fps (0 = tắt)
+        self.camera_handler.configure_idle(_cam_cfg.get("idle_after_min", 5),
+                                           _cam_cfg.get("idle_fps", 3))
+        # Giải mã JPEG song song cho webcam MJPG độ phân giải cao (0 = giải mã trên luồng camera)
+        self.camera_handler.configure_decode(_cam_cfg.get("decode_workers", 0))
+        # Số frame chụp liên tiếp quanh thời điểm bấm máy để chọn ảnh đẹp nhất (1 = tắt)
+        self.burst_frames = int(_cam_cfg.get("burst_frames", 5))
+        # Encoder video session: auto (ffmpeg H.264 nếu có) / ffmpeg / opencv
+        self.camera_handler.configure_video(
+            encoder=_cam_cfg.get("video_encoder", "auto"),
+            crf=_cam_cfg.get("video_crf", 23),
+            bitrate=_cam_cfg.get("video_bitrate"),
+            preset=_cam_cfg.get("video_preset", "veryfast"),
+            ffmpeg_path=_cam_cfg.get("ffmpeg_path"),
+            passthrough=_cam_cfg.get("video_passthrough", True),
+        )
+        # Độ dài mỗi đoạn video upload dần (giây, 0 = upload cả file khi kết thúc)
+        self.video_segment_seconds = _cam_cfg.get("video_segment_seconds", 5)
+        # Ảnh động tạo ở tiến trình nền khi kết thúc: gif / boomerang / timelapse
+        self.media_outputs = _cam_cfg.get("media_outputs", ["gif", "boomerang"])
+        self.session_clips = []
+        # Lồng khung template vào video session (cần file video đầy đủ -> tắt upload theo đoạn)
+        self.video_branding = _cam_cfg.get("video_branding", False)
+        # Cache template đã giải mã + dữ liệu trộn alpha (MB)
+        from src.services.image.template_cache import configure_template_cache
+        configure_template_cache(_cam_cfg.get("template_cache_mb", 128))
+        from src.services.media import MediaJobService
+        self.media_service = MediaJobService(OUTPUT_DIR, max_workers=_cam_cfg.get("media_workers"),
+                                             encoder_options=self.camera_handler._video_options)
+        # Mọi thao tác chạm/bấm trong ứng dụng đều đánh thức camera
+        QApplication.instance().installEventFilter(self)
         
         # Chỉ khởi chạy camera ngay nếu không phải bản Free
         if not getattr(self, 'is_free_mode', False):
             self.camera_handler.start()
             # Đăng ký callback mặc định cho Home
-            self.camera_handler.set_callback(self.on_frame_home)
+            self._route_camera_to_home()
 
         # --- MAIN LAYOUT ---
         self.central_widget = QWidget()
@@ -201,7 +238,7 @@ class PhotoboothApp(QMainWindow):
         self.stacked.setCurrentIndex(self.IDX_HOME)
         
         # Connect camera handler to initial screen
-        self.camera_handler.set_callback(self.on_frame_home)
+        self._route_camera_to_home()
 
         # Trạng thái lấp đầy slot
         self.current_slot_index = 0
@@ -221,29 +258,63 @@ class PhotoboothApp(QMainWindow):
         if hasattr(self, 'home_screen') and self.home_screen.camera_view:
             self.home_screen.camera_view.set_frame(qt_img)
 
-    def on_frame_interactive(self, qt_img):
-        """Feed cho màn hình Interactive (Step 9)."""
-        # Chuyển sang Pixmap một lần duy nhất để tối ưu
-        pix = QPixmap.fromImage(qt_img)
-        
-        # 1. Cập nhật màn hình chính (Page 1 - Camera Full)
-        if hasattr(self, 'interactive_camera_label'):
-            lbl_size = self.interactive_camera_label.size()
-            if not lbl_size.isEmpty():
-                scaled = pix.scaled(lbl_size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-                self.interactive_camera_label.setPixmap(scaled)
-        
-        # 2. Cập nhật Camera mini ở sidebar (Page 0)
+    def eventFilter(self, obj, event):
+        """Ghi nhận thao tác của khách để camera thoát chế độ nghỉ."""
+        if event.type() in (QEvent.MouseButtonPress, QEvent.TouchBegin, QEvent.KeyPress):
+            self.camera_handler.notify_activity()
+        return super().eventFilter(obj, event)
+
+    def _route_camera_to_home(self):
+        """Chỉ HomeScreen nhận frame, render sẵn đúng kích thước khung camera (cover)."""
+        self.camera_handler.set_callback(None)
+        self.camera_handler.set_idle_enabled(True)
+        size = None
+        if hasattr(self, 'home_screen') and self.home_screen.camera_view:
+            lbl = self.home_screen.camera_view.image_label.size()
+            size = (lbl.width(), lbl.height())
+        self.camera_handler.subscribe("home", self.on_frame_home, size=size, fit="cover")
+
+    def _route_camera_to_interactive(self):
+        """
+        Step 9: camera full (Page 1) và camera mini (Page 0) đăng ký riêng,
+        mỗi bên nhận đúng kích thước của mình nên UI không phải scale lại.
+        """
+        self.camera_handler.set_callback(None, self.layout_type)
+        # Trong phiên chụp có thể lâu không chạm màn hình (đếm ngược) -> không cho nghỉ
+        self.camera_handler.set_idle_enabled(False)
+        if hasattr(self, 'interactive_stack'):
+            # Label camera full chiếm trọn stack (chưa layout thì label.size() chưa đúng)
+            size = self.interactive_stack.size()
+            self.camera_handler.subscribe("interactive_full", self._on_frame_interactive_full,
+                                          size=(size.width(), size.height()), fit="cover")
         if hasattr(self, 'interactive_camera_mini'):
-            from src.utils import get_rounded_pixmap
             mini_w = self.interactive_camera_mini.width() - 12
             mini_h = self.interactive_camera_mini.height() - 12
-            
             if mini_w > 0 and mini_h > 0:
-                # Scale Pixmap thay vì Image để tránh lỗi màu xanh
-                mini_pix = pix.scaled(mini_w, mini_h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
-                mini_rounded = get_rounded_pixmap(mini_pix, radius=20)
-                self.interactive_camera_mini.setPixmap(mini_rounded)
+                # Mini chỉ là ô xem trước nhỏ -> 15 fps là đủ
+                self.camera_handler.subscribe("interactive_mini", self._on_frame_interactive_mini,
+                                              size=(mini_w, mini_h), max_fps=15, fit="stretch")
+
+    def _on_frame_interactive_full(self, qt_img):
+        """Feed cho camera full của màn hình Interactive (Page 1)."""
+        if not hasattr(self, 'interactive_camera_label'):
+            return
+        lbl_size = self.interactive_camera_label.size()
+        if lbl_size.isEmpty():
+            return
+        pix = QPixmap.fromImage(qt_img)
+        if pix.size() != lbl_size:
+            pix = pix.scaled(lbl_size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        self.interactive_camera_label.setPixmap(pix)
+
+    def _on_frame_interactive_mini(self, qt_img):
+        """Feed cho camera mini ở sidebar (Page 0), frame đã đúng kích thước."""
+        if not hasattr(self, 'interactive_camera_mini'):
+            return
+        from src.utils import get_rounded_pixmap
+        # Scale Pixmap thay vì Image để tránh lỗi màu xanh
+        mini_rounded = get_rounded_pixmap(QPixmap.fromImage(qt_img), radius=20)
+        self.interactive_camera_mini.setPixmap(mini_rounded)
 
     # ==========================================
     # LAYOUT SELECT SCREEN (giữ trong app vì phức tạp)
@@ -470,7 +541,7 @@ class PhotoboothApp(QMainWindow):
         """Chế độ chọn Template -> Chụp lấp đầy (Interactive)."""
         self.state = "INTERACTIVE_CAPTURE"
         self.stacked.setCurrentIndex(self.IDX_INTERACTIVE)
-        self.camera_handler.set_callback(self.on_frame_interactive, self.layout_type)
+        self._route_camera_to_interactive()
         self.update_interactive_template_preview()
         self.update_interactive_button_text()
         self.start_video_recording()
@@ -671,7 +742,6 @@ class PhotoboothApp(QMainWindow):
     def apply_template(self, template_path, source_btn=None):
         """Áp dụng template lên ảnh, tự phát hiện layout_type từ tên file template."""
         import os
-        from src.shared.types.models import get_layout_config
         
         # Highlight nút đã chọn
         if source_btn:
@@ -688,32 +758,29 @@ class PhotoboothApp(QMainWindow):
             folder_name = os.path.basename(os.path.dirname(template_path))
             self.layout_type = "4x1" if folder_name == "vertical" else folder_name
         
-        cfg = get_layout_config(self.layout_type)
+        plan = get_layout_plan(self.layout_type)
         
         # Cập nhật số lượng ảnh cần chụp (slots)
-        if "SLOTS" in cfg:
-            self.selected_frame_count = len(cfg["SLOTS"])
-        elif self.selected_frame_count == 0:
-            self.selected_frame_count = 4  # Mặc định
+        self.selected_frame_count = len(plan)
         
         print(f"[DEBUG] Template Selected: {template_path}")
         print(f"[DEBUG] Layout: {self.layout_type} ({self.selected_frame_count} slots)")
 
         # 3. Áp dụng template lên ảnh
         self.selected_template_path = template_path
-        if self.collage_image is not None:
-            self.merged_image = apply_template_overlay(self.collage_image, template_path)
+        collage = self._session_collage()
+        if collage is not None:
+            self.merged_image = apply_template_overlay(collage, template_path)
         else:
             # Chưa có ảnh -> Tạo canvas trống với màu hồng nhạt + vẽ các ô giữ chỗ màu xám
-            bw, bh = cfg.get("CANVAS_W", 1210), cfg.get("CANVAS_H", 1810)
-            blank = np.zeros((bh, bw, 3), dtype=np.uint8)
-            blank[:] = (245, 245, 255) 
+            # Chỉ là preview -> dựng ở độ phân giải khung hiển thị
+            from src.services.image.slot_canvas import preview_scale
+            label_size = self.template_preview_label.size()
+            preview = plan.scaled(preview_scale(plan, label_size.width(), label_size.height()))
+            blank = preview.blank((245, 245, 255))
             
             # Vẽ các ô "chừa phần chứa ảnh" bằng màu hồng nền để tạo cảm giác trong suốt
-            slots = cfg.get("SLOTS", [])
-            for slot in slots:
-                sx, sy, sw, sh = slot[:4]
-                cv2.rectangle(blank, (sx, sy), (sx+sw, sy+sh), (229, 227, 242), -1)
+            preview.fill_slots(blank, (229, 227, 242))
                 
             self.merged_image = apply_template_overlay(blank, template_path)
             
@@ -732,7 +799,7 @@ class PhotoboothApp(QMainWindow):
                 # Bản Free: Vào giao diện chụp lấp đầy ngay
                 self.state = "INTERACTIVE_CAPTURE"
                 self.stacked.setCurrentIndex(self.IDX_INTERACTIVE)
-                self.camera_handler.set_callback(self.on_frame_interactive, self.layout_type)
+                self._route_camera_to_interactive()
                 self.update_interactive_template_preview()
                 self.update_interactive_button_text()
                 self.start_video_recording()
@@ -859,7 +926,10 @@ class PhotoboothApp(QMainWindow):
                 # Kéo dài Flash lên 400ms cho "đã"
                 QTimer.singleShot(400, self.interactive_flash_overlay.hide)
             
-            # Chụp ảnh sau khi Flash sáng được một nửa (250ms) để lấy đúng khoảnh khắc
+            # Chụp ảnh sau khi Flash sáng được một nửa (250ms) để lấy đúng khoảnh khắc.
+            # Ghi lại thời điểm bấm máy ngay bây giờ: take_one_photo lấy frame theo mốc này
+            # trong vòng đệm camera, nên QTimer có chạy trễ cũng không lệch khoảnh khắc.
+            self._shutter_at = time.monotonic() + 0.25
             print("[DEBUG] Countdown reached 0. Triggering take_one_photo...")
             QTimer.singleShot(250, self.take_one_photo)
             # Tự động ẩn đếm ngược (đã làm ở trên) và đảm bảo flash sẽ ẩn
@@ -884,17 +954,20 @@ class PhotoboothApp(QMainWindow):
             self.cam_overlay_left.hide()
             self.cam_overlay_right.hide()
 
-        # Lấy frame từ CameraHandler
-        frame = None
-        if self.camera_handler.thread and self.camera_handler.thread.last_cv_frame is not None:
-            print("[DEBUG] Getting frame from CameraThread...")
-            frame = self.camera_handler.thread.last_cv_frame.copy()
+        # Lấy ảnh tĩnh full-res từ CameraHandler (mảng mới, không cần copy thêm)
+        print("[DEBUG] Getting still frame from CameraThread...")
+        frame = self.camera_handler.capture_still(at=getattr(self, '_shutter_at', None),
+                                                  burst=getattr(self, 'burst_frames', 1))
+        # Clip ngắn quanh lúc bấm máy cho GIF / boomerang (Future, thu nhỏ ở luồng nền)
+        clip = self.camera_handler.capture_clip(at=getattr(self, '_shutter_at', None)) if self.media_outputs else None
+        self._shutter_at = None
         
         if frame is not None:
             # Lưu ảnh vào danh sách
             if not hasattr(self, 'interactive_photos'):
                 self.interactive_photos = []
-            self.interactive_photos.append(frame.copy())
+            self.interactive_photos.append(frame)
+            self.session_clips.append(clip)
             self.current_slot_index = getattr(self, 'current_slot_index', 0) + 1
             
             # Cập nhật UI
@@ -912,57 +985,57 @@ class PhotoboothApp(QMainWindow):
         """Xóa tấm ảnh gần nhất để chụp lại."""
         if hasattr(self, 'interactive_photos') and self.interactive_photos:
             self.interactive_photos.pop()
+            if self.session_clips:
+                self.session_clips.pop()
             self.current_slot_index = max(0, getattr(self, 'current_slot_index', 1) - 1)
             self.update_interactive_template_preview()
             self.update_interactive_button_text()
 
     def update_interactive_template_preview(self):
-        """Vẽ Preview Template với những ảnh đã chụp lấp vào slot."""
-        from src.shared.types.models import get_layout_config
-        from src.services.image.template import apply_template_overlay
-        from src.services.image.collage import crop_to_aspect_wh
+        """Vẽ Preview Template với những ảnh đã chụp lấp vào slot (chỉ vẽ lại ô thay đổi)."""
+        from src.services.image.slot_canvas import SlotCanvas, preview_scale
         
-        cfg = get_layout_config(self.layout_type)
-        bw, bh = cfg.get("CANVAS_W", 1210), cfg.get("CANVAS_H", 1810)
+        plan = get_layout_plan(self.layout_type)
+        template_path = getattr(self, 'selected_template_path', None)
+        if not (template_path and os.path.exists(template_path)):
+            template_path = None
         
-        # Nền hồng nhạt sang trọng (#FFF5F5 -> BGR: 245, 245, 255)
-        canvas = np.zeros((bh, bw, 3), dtype=np.uint8)
-        canvas[:] = (245, 245, 255)
+        # Dựng thẳng ở độ phân giải của khung hiển thị (ảnh in full-res do ImageWorkflow dựng)
+        label_size = self.interactive_template_label.size()
+        scale = preview_scale(plan, label_size.width(), label_size.height())
         
-        # Lấy Slots (Nếu 4x1 thì tự tính nếu cfg trống)
-        slots = cfg.get("SLOTS", [])
-        if not slots and self.layout_type == "4x1":
-             slots = [(53, 48 + i*(312+32), 445, 312) for i in range(4)]
+        # Canvas giữ suốt phiên chụp; đổi layout / kích thước khung thì dựng lại
+        slot_canvas = getattr(self, 'slot_canvas', None)
+        if slot_canvas is None or not slot_canvas.matches(plan, scale):
+            slot_canvas = self.slot_canvas = SlotCanvas(plan, template_path, scale)
+        elif slot_canvas.template_path != template_path:
+            slot_canvas.set_template(template_path)
         
         interactive_photos = getattr(self, 'interactive_photos', [])
-        print(f"[DEBUG] update_interactive: Layout={self.layout_type}, Slots={len(slots)}, Image Count={len(interactive_photos)}")
+        changed = slot_canvas.sync(interactive_photos)
+        print(f"[DEBUG] update_interactive: Layout={self.layout_type}, Slots={len(plan)}, Image Count={len(interactive_photos)}, Redrawn={len(changed)}")
         
-        # Vẽ các ảnh đã chụp
-        for i, slot in enumerate(slots):
-            sx, sy, sw, sh = slot[:4]
-            if i < len(interactive_photos):
-                photo = interactive_photos[i]
-                cropped = crop_to_aspect_wh(photo, sw, sh)
-                resized = cv2.resize(cropped, (sw, sh))
-                canvas[sy:sy+sh, sx:sx+sw] = resized
-            else:
-                # Vẽ ô trống màu hồng giống màu nền (#F2E3E5 -> BGR: 229, 227, 242)
-                cv2.rectangle(canvas, (sx, sy), (sx+sw, sy+sh), (229, 227, 242), -1)
-        
-        # Vẽ viền bao quanh toàn bộ canvas để thấy rõ biên
-        cv2.rectangle(canvas, (0, 0), (bw-1, bh-1), (0, 0, 0), 5)
+        # Canvas đã đúng kích thước khung -> không scale lại. Không gán vào collage_image:
+        # canvas preview bị sửa tại chỗ ở pô sau và chỉ ở độ phân giải khung hiển thị.
+        self.interactive_template_label.setPixmap(convert_cv_qt(slot_canvas.image))
 
-        # Lồng khung Template (nếu có)
-        if hasattr(self, 'selected_template_path') and self.selected_template_path and os.path.exists(self.selected_template_path):
-            canvas = apply_template_overlay(canvas, self.selected_template_path)
+    def _session_collage(self, template_path=None):
+        """Collage full-res: dựng từ plan theo ảnh chụp tương tác nếu có, không thì collage_image."""
+        from src.services.image.slot_canvas import SlotCanvas
         
-        self.collage_image = canvas  # Lưu lại kết quả cuối
-        pixmap = convert_cv_qt(canvas)  # Returns QPixmap
-        scaled = pixmap.scaled(self.interactive_template_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.interactive_template_label.setPixmap(scaled)
+        interactive_photos = getattr(self, 'interactive_photos', [])
+        if not interactive_photos:
+            return self.collage_image
+        canvas = SlotCanvas(get_layout_plan(self.layout_type), template_path)
+        canvas.sync(interactive_photos)
+        return canvas.image
 
     def use_no_template(self):
-        self.merged_image = self.collage_image.copy() if self.collage_image is not None else None
+        template_path = getattr(self, 'selected_template_path', None)
+        if not (template_path and os.path.exists(template_path)):
+            template_path = None
+        collage = self._session_collage(template_path)
+        self.merged_image = collage.copy() if collage is not None else None
         self.handle_template_confirmation()
 
     def accept_and_print(self):
@@ -1003,17 +1076,20 @@ class PhotoboothApp(QMainWindow):
                 self.gallery_photos[half:] if half > 0 else self.gallery_photos[:4])
 
         # Hiển thị Dialog KẾT THÚC (QR + Chọn in)
-        # TẮT CAMERA hoàn toàn để tránh giật lag khi hiển thị Dialog
+        # TẠM DỪNG camera để tránh giật lag khi hiển thị Dialog
         if hasattr(self, 'camera_handler'):
             self.camera_handler.set_callback(None)
-            # Dừng hoàn toàn thread để giải phóng CPU khi hiện Dialog
-            self.camera_handler.stop()
+            # Ngừng đọc frame để giải phóng CPU, nhưng giữ camera mở cho khách tiếp theo
+            self.camera_handler.pause()
 
         from src.ui.dialogs.dialogs import FinishDialog
         video_path = getattr(self, 'current_video_path', None)
         layout_type = getattr(self, 'layout_type', "4x1")
+        media_jobs = self.submit_media_jobs(video_path)
         
-        dialog = FinishDialog(final_img, video_path, layout_type, self)
+        dialog = FinishDialog(final_img, video_path, layout_type, self,
+                              video_uploader=getattr(self, 'video_uploader', None),
+                              media_jobs=media_jobs)
         if dialog.exec_():
             # Nếu người dùng bấm XÁC NHẬN & IN
             print_count = dialog.print_count
@@ -1032,6 +1108,42 @@ class PhotoboothApp(QMainWindow):
         # Reset ứng dụng về trạng thái ban đầu
         self.reset_all()
 
+    @staticmethod
+    def _clip_result(future):
+        """Kết quả clip đã thu nhỏ ở luồng nền ([] nếu không có / lỗi)."""
+        if future is None:
+            return []
+        try:
+            return future.result(timeout=5.0)
+        except Exception as e:
+            print(f"[APP ERROR] Could not prepare clip: {e}")
+            return []
+
+    def submit_media_jobs(self, video_path):
+        """Gửi các job ảnh động sang tiến trình nền, trả về list MediaJob để upload."""
+        jobs = []
+        try:
+            clips = [c for c in (self._clip_result(f) for f in self.session_clips) if c]
+            if "gif" in self.media_outputs and clips:
+                # Mỗi pô góp vài frame giữa clip -> GIF kể lại cả phiên chụp
+                frames = [f for c in clips for f in c[max(0, len(c) // 2 - 1):len(c) // 2 + 2]]
+                jobs.append(self.media_service.submit_gif(frames))
+            if "boomerang" in self.media_outputs and clips:
+                jobs.append(self.media_service.submit_boomerang(clips[-1]))
+            # Video upload theo đoạn không còn file đầy đủ ở máy -> bỏ qua timelapse / lồng khung
+            if not getattr(self, 'video_uploader', None):
+                if "timelapse" in self.media_outputs:
+                    jobs.append(self.media_service.submit_timelapse(video_path))
+                template_path = getattr(self, 'selected_template_path', None)
+                if self.video_branding and template_path and os.path.exists(template_path):
+                    from src.shared.types.models import get_layout_config
+                    slots = get_layout_config(getattr(self, 'layout_type', "4x1")).get("SLOTS")
+                    jobs.append(self.media_service.submit_branded(video_path, template_path, slots))
+        except Exception as e:
+            print(f"[APP ERROR] Could not submit media jobs: {e}")
+        self.session_clips = []
+        return [j for j in jobs if j is not None]
+
     def start_video_recording(self):
         """Bắt đầu ghi video session."""
         try:
@@ -1039,7 +1151,16 @@ class PhotoboothApp(QMainWindow):
             import datetime
             ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             self.current_video_path = os.path.join(OUTPUT_DIR, f"video_{ts}.mp4")
-            self.camera_handler.start_recording(self.current_video_path)
+            # Cắt video thành đoạn ngắn và upload dần trong lúc chụp (cần Cloudinary)
+            self.video_uploader = None
+            if self.video_segment_seconds > 0 and not self.video_branding and is_cloudinary_valid():
+                from src.services.cloud.segment_upload import SegmentUploader
+                self.video_uploader = SegmentUploader(session_id=f"session_{ts}")
+            self.camera_handler.start_recording(
+                self.current_video_path,
+                segment_seconds=self.video_segment_seconds if self.video_uploader else None,
+                segment_sink=self.video_uploader,
+            )
             print(f"[APP] Video recording started: {self.current_video_path}")
         except Exception as e:
             print(f"[APP ERROR] Could not start video recording: {e}")
@@ -1056,19 +1177,21 @@ class PhotoboothApp(QMainWindow):
         self.state = "START"
         self.captured_photos = []
         self.interactive_photos = []
+        self.session_clips = []
         self.current_slot_index = 0
         self.selected_photo_indices = []
         self.selected_frame_count = 0
         self.collage_image = None
         self.merged_image = None
+        self.slot_canvas = None
         self.payment_confirmed = False
         self.selected_price_type = 0
         self.layout_type = ""
         self.stacked.setCurrentIndex(0)
-        # Bảm bảo camera handler chạy lại sau khi bị stop ở FinishDialog
+        # Chạy lại camera ngay sau khi tạm dừng ở FinishDialog (không mở lại thiết bị)
         if hasattr(self, 'camera_handler'):
-            self.camera_handler.start()
-            self.camera_handler.set_callback(self.on_frame_home)
+            self.camera_handler.resume()
+            self._route_camera_to_home()
 
     def open_camera_setup(self):
         """Mở cửa sổ thiết lập Camera (phím F1)."""
@@ -1079,7 +1202,7 @@ class PhotoboothApp(QMainWindow):
             self.camera_setup_window = CameraSetupApp(self.camera_handler)
             # Khôi phục callback về màn hình chính khi đóng cửa sổ setup
             self.camera_setup_window.closeEvent = lambda event: (
-                self.camera_handler.set_callback(self.on_frame_home),
+                self._route_camera_to_home(),
                 event.accept()
             )
             self.camera_setup_window.show()
@@ -1132,6 +1255,8 @@ class PhotoboothApp(QMainWindow):
         
         if hasattr(self, 'cap') and self.cap:
             self.cap.release()
+        if hasattr(self, 'media_service'):
+            self.media_service.shutdown()
         event.accept()
 
     def trigger_dslr_capture(self):
@@ -1230,4 +1355,7 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 sys.excepthook = handle_exception
 
 if __name__ == "__main__":
+    # Cần cho ProcessPoolExecutor (job media) khi đóng gói exe trên Windows
+    import multiprocessing
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -42,7 +42,7 @@ class FreePhotobooth(PhotoboothApp):
         
         # Bắt đầu camera ngay cho bản Free
         self.camera_handler.start()
-        self.camera_handler.set_callback(self.on_frame_home)
+        self._route_camera_to_home()
 
     def go_to_price_select(self):
         """Chuyển thẳng đến chọn gói (Step 1)."""
@@ -56,7 +56,7 @@ class FreePhotobooth(PhotoboothApp):
         """Màn hình chụp Interactive."""
         self.state = "INTERACTIVE_CAPTURE"
         self.stacked.setCurrentIndex(self.IDX_INTERACTIVE)
-        self.camera_handler.set_callback(self.on_frame_interactive, self.layout_type)
+        self._route_camera_to_interactive()
         self.update_interactive_template_preview()
         self.update_interactive_button_text()
         self.start_video_recording()
@@ -81,12 +81,6 @@ class FreePhotobooth(PhotoboothApp):
             getattr(self, 'selected_template_path', None)
         )
 
-    def reset_all(self):
-        super().reset_all()
-        # Restart camera cho màn hình Home
-        self.camera_handler.start()
-        self.camera_handler.set_callback(self.on_frame_home)
-
     def open_camera_setup(self):
         """Mở cửa sổ thiết lập Camera."""
         from src.admin.pages.settings import CameraSetupApp
@@ -96,7 +90,7 @@ class FreePhotobooth(PhotoboothApp):
 
     def _on_setup_closed(self, event):
         """Callback khi đóng setup - Trả lại luồng cho màn hình Home."""
-        self.camera_handler.set_callback(self.on_frame_home)
+        self._route_camera_to_home()
         event.accept()
 
 
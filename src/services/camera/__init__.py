@@ -1,3 +1,16 @@
 # Camera Service
 from src.services.camera.camera_thread import CameraThread
 from src.services.camera.camera_handler import CameraHandler
+from src.services.camera.avi_writer import MjpegAviWriter
+from src.services.camera.encoders import FFmpegEncoder, OpenCVEncoder, create_encoder
+from src.services.camera.frame_bus import FrameBus, Subscription
+from src.services.camera.frame_mailbox import FrameMailbox
+from src.services.camera.frame_pool import Frame, FramePool
+from src.services.camera.frame_transform import FrameTransform
+from src.services.camera.idle_governor import IdleGovernor
+from src.services.camera.jpeg_decode_pool import JpegDecodePool
+from src.services.camera.mjpeg_reader import MjpegReader
+from src.services.camera.sources import (
+    CameraSource, OpenCVSource, ReplaySource, SyntheticSource, create_source
+)
+from src.services.camera.video_recorder import VideoRecorder, wait_for_recording
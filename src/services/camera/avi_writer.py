@@ -0,0 +1,172 @@
+# ==========================================
+# MJPEG AVI WRITER - Ghi JPEG gốc vào file AVI (không giải mã / encode lại)
+# ==========================================
+"""
+Ghi thẳng các JPEG nhận từ camera (MJPEG) vào container AVI 1.0 (RIFF):
+
+    RIFF 'AVI '
+      LIST 'hdrl' (avih + LIST 'strl' (strh + strf))
+      LIST 'movi' ('00dc' chunk cho mỗi JPEG)
+      idx1       (bảng chỉ mục, mỗi ô thời gian 1 mục)
+
+Frame lặp lại (lấp ô trống của dòng thời gian CFR) chỉ thêm một mục idx1
+trỏ về chunk JPEG đã ghi, không ghi thêm dữ liệu.
+Các kích thước trong header được ghi tạm rồi sửa lại khi release().
+"""
+
+import struct
+
+_AVIF_HASINDEX = 0x10
+_AVIIF_KEYFRAME = 0x10
+
+# Marker SOF (Start Of Frame) chứa kích thước ảnh
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(jpeg):
+    """Đọc (width, height) từ header JPEG mà không giải mã. None nếu không đọc được."""
+    pos = 2
+    n = len(jpeg)
+    while pos + 9 < n:
+        if jpeg[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = jpeg[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack(">H", jpeg[pos + 2:pos + 4])[0]
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack(">HH", jpeg[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+
+class MjpegAviWriter:
+    """Ghi file AVI MJPEG từ các JPEG có sẵn."""
+
+    name = "avi-passthrough"
+
+    def __init__(self, output_path, width, height, fps):
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._file = None
+        self._index = []            # (offset trong movi, kích thước)
+        self._last = None
+        self._max_chunk = 0
+        self._movi_start = 0        # Vị trí fourcc 'movi'
+        self._riff_size_pos = 0
+        self._movi_size_pos = 0
+        self._avih_frames_pos = 0
+        self._avih_bufsize_pos = 0
+        self._strh_length_pos = 0
+        self._strh_bufsize_pos = 0
+
+    @property
+    def frame_count(self):
+        return len(self._index)
+
+    def open(self):
+        try:
+            self._file = open(self.output_path, "wb")
+        except OSError as e:
+            print(f"[AVI] Khong tao duoc file {self.output_path}: {e}")
+            return False
+        self._write_headers()
+        return True
+
+    def _write_headers(self):
+        f = self._file
+        scale, rate = 1000, int(round(self.fps * 1000))
+
+        f.write(b"RIFF")
+        self._riff_size_pos = f.tell()
+        f.write(struct.pack("<I", 0))
+        f.write(b"AVI ")
+
+        # LIST hdrl = 'hdrl' + avih(8+56) + LIST strl(8 + 'strl' + strh(8+56) + strf(8+40))
+        strl_size = 4 + (8 + 56) + (8 + 40)
+        hdrl_size = 4 + (8 + 56) + (8 + strl_size)
+        f.write(b"LIST" + struct.pack("<I", hdrl_size) + b"hdrl")
+
+        f.write(b"avih" + struct.pack("<I", 56))
+        f.write(struct.pack("<IIII", int(1e6 / self.fps), 0, 0, _AVIF_HASINDEX))
+        self._avih_frames_pos = f.tell()
+        f.write(struct.pack("<III", 0, 0, 1))     # TotalFrames, InitialFrames, Streams
+        self._avih_bufsize_pos = f.tell()
+        f.write(struct.pack("<III", 0, self.width, self.height))
+        f.write(b"\0" * 16)
+
+        f.write(b"LIST" + struct.pack("<I", strl_size) + b"strl")
+        f.write(b"strh" + struct.pack("<I", 56))
+        f.write(b"vids" + b"MJPG")
+        f.write(struct.pack("<IHHI", 0, 0, 0, 0))  # Flags, Priority, Language, InitialFrames
+        f.write(struct.pack("<III", scale, rate, 0))
+        self._strh_length_pos = f.tell()
+        f.write(struct.pack("<I", 0))
+        self._strh_bufsize_pos = f.tell()
+        f.write(struct.pack("<IiI", 0, -1, 0))     # SuggestedBufferSize, Quality, SampleSize
+        f.write(struct.pack("<hhhh", 0, 0, self.width, self.height))
+
+        f.write(b"strf" + struct.pack("<I", 40))
+        f.write(struct.pack("<IiiHH", 40, self.width, self.height, 1, 24))
+        f.write(b"MJPG")
+        f.write(struct.pack("<IiiII", self.width * self.height * 3, 0, 0, 0, 0))
+
+        f.write(b"LIST")
+        self._movi_size_pos = f.tell()
+        f.write(struct.pack("<I", 0))
+        self._movi_start = f.tell()
+        f.write(b"movi")
+
+    def write_jpeg(self, jpeg):
+        """Ghi một JPEG thành chunk '00dc' mới."""
+        f = self._file
+        offset = f.tell() - self._movi_start
+        size = len(jpeg)
+        f.write(b"00dc" + struct.pack("<I", size))
+        f.write(jpeg)
+        if size % 2:
+            f.write(b"\0")
+        self._last = (offset, size)
+        self._index.append(self._last)
+        self._max_chunk = max(self._max_chunk, size)
+
+    def write_duplicate(self):
+        """Lặp lại frame trước (chỉ thêm mục chỉ mục)."""
+        if self._last is not None:
+            self._index.append(self._last)
+
+    def release(self):
+        f = self._file
+        if f is None:
+            return
+        try:
+            movi_end = f.tell()
+            f.write(b"idx1" + struct.pack("<I", 16 * len(self._index)))
+            for offset, size in self._index:
+                f.write(b"00dc" + struct.pack("<III", _AVIIF_KEYFRAME, offset, size))
+            end = f.tell()
+
+            frames = len(self._index)
+            f.seek(self._riff_size_pos)
+            f.write(struct.pack("<I", end - 8))
+            f.seek(self._movi_size_pos)
+            f.write(struct.pack("<I", movi_end - self._movi_start))
+            f.seek(self._avih_frames_pos)
+            f.write(struct.pack("<I", frames))
+            f.seek(self._avih_bufsize_pos)
+            f.write(struct.pack("<I", self._max_chunk))
+            f.seek(self._strh_length_pos)
+            f.write(struct.pack("<I", frames))
+            f.seek(self._strh_bufsize_pos)
+            f.write(struct.pack("<I", self._max_chunk))
+        finally:
+            f.close()
+            self._file = None
@@ -4,27 +4,53 @@
 """
 Quản lý việc chuyển đổi recipient (người nhận frame) tùy theo state của ứng dụng.
 Sử dụng một CameraThread duy nhất để tối ưu hiệu năng.
+Các màn hình đăng ký nhận frame qua FrameBus (subscribe) với kích thước,
+tần suất và định dạng riêng; set_callback là cách đăng ký nhanh một consumer.
 """
 
+import time
+
 from PyQt5.QtCore import QObject, pyqtSignal
 from src.services.camera.camera_thread import CameraThread
+from src.services.camera.frame_bus import FrameBus
+from src.services.camera.idle_governor import IdleGovernor
 from src.shared.types.models import get_layout_config
 
 
+# Giá trị mặc định "giữ nguyên cấu hình hiện tại" (None có nghĩa riêng: tự chọn)
+_KEEP = object()
+
+
 class CameraHandler(QObject):
     """Quản lý thread camera và phân phối frame."""
-    frame_received = pyqtSignal(object) # Chuyển tiếp frame đến UI hiện tại
+    reconfigured = pyqtSignal(dict)   # Đổi cấu hình nóng xong (mode, apply_ms, latency_ms)
 
-    def __init__(self, camera_index=0, width=1280, height=960, use_dshow=True, use_compat=False):
+    # Khóa reconfigure -> thuộc tính lưu cấu hình của handler (dùng khi start lại thread)
+    _CONFIG_ATTRS = {
+        "camera_index": "camera_index", "width": "_width", "height": "_height",
+        "use_dshow": "_use_dshow", "use_compat": "_use_compat", "source": "_source",
+        "source_path": "_source_path", "fourcc": "_fourcc", "rotation": "_rotation", "mirror": "_mirror",
+    }
+
+    def __init__(self, camera_index=0, width=1280, height=960, use_dshow=True, use_compat=False,
+                 source=None, source_path=None, fourcc=None, mirror=True):
         super().__init__()
         self.camera_index = camera_index
+        self._source = source
+        self._source_path = source_path
         self._width = width
         self._height = height
         self._use_dshow = use_dshow
         self._use_compat = use_compat
+        self._fourcc = fourcc
+        self._mirror = mirror
+        self._decode_workers = 0
         
         self.thread = None
-        self._current_callback = None
+        self._rotation = 0
+        self._video_options = None
+        self.bus = FrameBus()
+        self.governor = IdleGovernor()
 
     def start(self):
         """Khởi động thread camera."""
@@ -36,9 +62,18 @@ class CameraHandler(QObject):
             width=self._width, 
             height=self._height,
             use_dshow=self._use_dshow, 
-            use_compat=self._use_compat
+            use_compat=self._use_compat,
+            source=self._source,
+            source_path=self._source_path,
+            bus=self.bus,
+            governor=self.governor,
+            fourcc=self._fourcc,
+            mirror=self._mirror,
+            decode_workers=self._decode_workers
         )
-        self.thread.frame_ready.connect(self._on_frame)
+        self.thread.rotation = self._rotation
+        self.thread.frame_available.connect(self._on_frame_available)
+        self.thread.reconfigured.connect(self.reconfigured)
         self.thread.start()
         print(f"[CAMERA HANDLER] Initialized index {self.camera_index}")
 
@@ -49,47 +84,193 @@ class CameraHandler(QObject):
             self.thread.wait()
             self.thread = None
 
-    def set_callback(self, callback, layout_type=None):
-        """Đổi hàm nhận frame và cập nhật rotation theo layout."""
+    def pause(self):
+        """Tạm dừng đọc frame nhưng giữ camera mở (giữa 2 khách)."""
+        if self.thread:
+            self.thread.pause()
+
+    def resume(self):
+        """Chạy lại ngay sau pause(); khởi động thread nếu chưa chạy."""
+        if self.thread and self.thread.isRunning():
+            self.thread.resume()
+        else:
+            self.start()
+
+    @property
+    def is_paused(self):
+        return bool(self.thread and self.thread.is_paused)
+
+    def set_rotation(self, layout_type=None):
+        """Cập nhật rotation theo layout (None = không xoay)."""
+        rot = 0
         if layout_type:
             try:
                 cfg = get_layout_config(layout_type)
                 rot = cfg.get("rotation", 0)
-                if self.thread:
-                    self.thread.rotation = rot
-                    print(f"[CAMERA HANDLER] Rotation set to {rot} for {layout_type}")
             except Exception as e:
                 print(f"[CAMERA HANDLER] Error setting rotation: {e}")
-        else:
-            if self.thread:
-                self.thread.rotation = 0
-                print(f"[CAMERA HANDLER] Rotation reset to 0")
+        self.reconfigure(rotation=rot)
+        print(f"[CAMERA HANDLER] Rotation set to {rot} for {layout_type or 'default'}")
 
-        self._current_callback = callback
+    def set_callback(self, callback, layout_type=None, size=None, fit="cover"):
+        """
+        Đổi hàm nhận frame (thay toàn bộ consumer hiện tại) và cập nhật rotation theo layout.
+        size: kích thước label hiển thị để luồng camera thu nhỏ sẵn frame.
+        """
+        self.set_rotation(layout_type)
+        self.bus.clear()
+        if callback:
+            self.bus.subscribe("main", callback, size=size, fit=fit)
         print(f"[CAMERA HANDLER] Callback changed to {callback.__name__ if callback else 'None'}")
 
-    def _on_frame(self, frame):
-        """Nhận frame từ thread và chuyển cho callback đang hoạt động."""
-        if self._current_callback:
-            self._current_callback(frame)
-        self.frame_received.emit(frame)
-
-    def restart_with_config(self, index, w, h, dshow, compat):
-        """Cập nhật cấu hình camera nóng."""
-        self.stop()
-        self.camera_index = index
-        self._width = w
-        self._height = h
-        self._use_dshow = dshow
-        self._use_compat = compat
-        self.start()
-
-    def start_recording(self, output_path, w=1280, h=720, fps=20.0):
-        """Proxy bắt đầu ghi video."""
+    def subscribe(self, name, callback, size=None, max_fps=None, fmt="qimage", fit="cover"):
+        """Đăng ký thêm một consumer (xem FrameBus.subscribe)."""
+        return self.bus.subscribe(name, callback, size=size, max_fps=max_fps, fmt=fmt, fit=fit)
+
+    def unsubscribe(self, name):
+        self.bus.unsubscribe(name)
+
+    def _on_frame_available(self):
+        """Lấy bản render mới nhất từ mailbox và giao cho các consumer."""
+        thread = self.sender() or self.thread
+        if thread is None:
+            return
+        if not self.bus.has_subscribers():
+            # Không ai nhận -> bỏ frame, không tốn công vẽ
+            thread.mailbox.discard()
+            return
+
+        renditions = thread.mailbox.take()
+        if renditions is None:
+            return
+        try:
+            # QImage bọc quanh buffer của pool: consumer phải vẽ/convert ngay,
+            # không giữ lại QImage sau khi callback kết thúc.
+            self.bus.deliver(renditions)
+        finally:
+            renditions.release()
+
+    def notify_activity(self):
+        """Báo có thao tác của khách (chạm/bấm) để camera thoát chế độ nghỉ."""
+        self.governor.notify_activity()
+
+    def set_idle_enabled(self, enabled):
+        """Cho phép/không cho phép chế độ nghỉ (tắt trong phiên chụp)."""
+        self.governor.enabled = enabled
+        if enabled:
+            self.governor.notify_activity()
+
+    def configure_idle(self, idle_after_min=None, idle_fps=None):
+        """Đổi thời gian chờ (phút, 0 = tắt) và fps khi nghỉ."""
+        self.governor.configure(idle_after_min, idle_fps)
+
+    def configure_decode(self, workers=0):
+        """
+        Số luồng giải mã JPEG song song (0 = tắt). Webcam được đọc ở dạng JPEG nén
+        (CAP_PROP_FORMAT=-1) nếu backend hỗ trợ. Áp dụng từ lần start() tiếp theo.
+        """
+        self._decode_workers = max(0, int(workers or 0))
+
+    def decode_stats(self):
+        """Thống kê giải mã song song: workers, decode_ms, busy_dropped, reorder_dropped..."""
+        if self.thread:
+            return self.thread.decode_stats()
+        return {}
+
+    def frame_stats(self):
+        """Thống kê mailbox (số frame bị ghi đè / bị bỏ) để theo dõi độ trễ preview."""
         if self.thread:
-            self.thread.start_recording(output_path, w, h, fps)
+            return self.thread.mailbox.stats()
+        return {}
+
+    def acquire_latest_frame(self):
+        """Tham chiếu frame full-res mới nhất (nhớ gọi release())."""
+        if self.thread:
+            return self.thread.acquire_latest_frame()
+        return None
+
+    def capture_still(self, at=None, burst=1):
+        """
+        Lấy ảnh tĩnh full-res (đã xoay/lật) cho việc chụp.
+        at: thời điểm bấm máy (time.monotonic) -> chọn frame gần nhất trong vòng đệm.
+        burst > 1: chấm điểm `burst` frame quanh `at` và lấy frame nét nhất / không nhắm mắt.
+        """
+        if self.thread:
+            if at is not None and burst > 1:
+                return self.thread.get_best_still(at, burst)
+            still = self.thread.get_still_frame(at)
+            if at is not None:
+                print(f"[CAMERA HANDLER] Shutter offset {self.thread.ring.last_offset_ms:+.1f} ms")
+            return still
+        return None
+
+    def capture_clip(self, at=None, count=10, width=480):
+        """
+        Các frame thu nhỏ quanh thời điểm bấm máy (cho GIF / boomerang).
+        Trả về Future -> list frame (thu nhỏ ở luồng nền), hoặc None nếu chưa có camera.
+        """
+        if self.thread:
+            return self.thread.get_clip_async(at if at is not None else time.monotonic(), count, width)
+        return None
+
+    def reconfigure(self, **changes):
+        """
+        Đổi cấu hình camera (xem CameraThread.RECONFIG_KEYS) mà không dừng thread.
+        Thread đang chạy áp dụng giữa 2 frame; kết quả + độ trễ báo qua signal reconfigured.
+        """
+        for key, value in changes.items():
+            if key not in self._CONFIG_ATTRS:
+                raise ValueError(f"Khong doi duoc: {key}")
+            setattr(self, self._CONFIG_ATTRS[key], value)
+        if self.thread and self.thread.isRunning():
+            self.thread.reconfigure(**changes)
+
+    def last_switch(self):
+        """Lần đổi cấu hình gần nhất: mode (software/device/reopen), apply_ms, latency_ms."""
+        return self.thread.last_switch if self.thread else {}
+
+    def restart_with_config(self, index, w, h, dshow, compat, source=_KEEP, source_path=_KEEP, fourcc=_KEEP):
+        """
+        Cập nhật cấu hình camera nóng (không dựng lại thread).
+        source: opencv / mjpeg / replay / synthetic (None = tự chọn theo index).
+        source / source_path / fourcc không truyền -> giữ giá trị đang dùng.
+        """
+        changes = dict(camera_index=index, width=w, height=h, use_dshow=dshow, use_compat=compat)
+        for key, value in (("source", source), ("source_path", source_path), ("fourcc", fourcc)):
+            if value is not _KEEP:
+                changes[key] = value
+        self.reconfigure(**changes)
+        if not (self.thread and self.thread.isRunning()):
+            self.start()
+
+    def configure_video(self, encoder="auto", crf=23, bitrate=None, preset="veryfast", ffmpeg_path=None,
+                        passthrough=True):
+        """
+        Cấu hình encoder cho video session (xem encoders.create_encoder).
+        passthrough: nguồn MJPEG thì ghi JPEG gốc vào AVI, chuyển sang mp4 sau khi dừng quay.
+        """
+        self._video_options = {
+            "encoder": encoder, "crf": crf, "bitrate": bitrate,
+            "preset": preset, "ffmpeg_path": ffmpeg_path, "passthrough": passthrough,
+        }
+
+    def start_recording(self, output_path, w=1280, h=720, fps=20.0, segment_seconds=None, segment_sink=None):
+        """Proxy bắt đầu ghi video (segment_sink: vd SegmentUploader để upload từng đoạn)."""
+        if self.thread:
+            self.thread.start_recording(output_path, w, h, fps,
+                                        encoder_options=self._video_options,
+                                        segment_seconds=segment_seconds, segment_sink=segment_sink)
 
     def stop_recording(self):
-        """Proxy dừng ghi video."""
+        """Proxy dừng ghi video (không chặn UI, file được đóng ở luồng ghi)."""
         if self.thread:
-            self.thread.stop_recording()
+            recorder = self.thread.stop_recording()
+            if recorder is not None:
+                self._last_recorder = recorder
+
+    def recording_stats(self):
+        """Thống kê hàng đợi / thời gian encode của lần quay hiện tại (hoặc gần nhất)."""
+        if self.thread and self.thread.recorder is not None:
+            return self.thread.recording_stats()
+        recorder = getattr(self, '_last_recorder', None)
+        return recorder.stats() if recorder is not None else {}
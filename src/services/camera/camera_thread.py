@@ -2,44 +2,111 @@ import cv2
 import time
 import datetime
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PyQt5.QtCore import QThread, pyqtSignal, QMutex, QMutexLocker
 from PyQt5.QtGui import QImage
+from src.services.camera.frame_bus import FrameBus, RenditionSet
+from src.services.camera.frame_mailbox import FrameMailbox
+from src.services.camera.frame_pool import FramePool
+from src.services.camera.frame_ring import FrameRing
+from src.services.camera.frame_transform import FrameTransform
+from src.services.camera.idle_governor import IdleGovernor
+from src.services.camera.jpeg_decode_pool import JpegDecodePool
+from src.services.camera.mjpeg_reader import MjpegReader
+from src.services.camera.sources import create_source
+from src.services.camera.video_recorder import VideoRecorder
+from src.services.image.frame_scoring import preload_cascades, select_best_frame, to_score_gray
+
+# Các thông số đổi được khi thread đang chạy (reconfigure)
+_SOFTWARE_KEYS = {"rotation", "mirror"}                 # Chỉ đổi phép xoay/lật
+_FORMAT_KEYS = {"width", "height", "fourcc"}            # Thử đổi trên thiết bị đang mở
+_DEVICE_KEYS = {"camera_index", "source", "source_path", "use_dshow", "use_compat"}  # Phải mở lại
+RECONFIG_KEYS = _SOFTWARE_KEYS | _FORMAT_KEYS | _DEVICE_KEYS
+
 
 class CameraThread(QThread):
     """
     Luồng phụ chuyên đọc frame từ Camera để tránh làm treo UI.
-    Hỗ trợ Web Camera (webcam) và DSLR (qua MJPEG URL).
+    Hỗ trợ Web Camera (webcam), DSLR (qua MJPEG URL), phát lại và nguồn giả lập
+    (xem src/services/camera/sources.py).
     Hỗ trợ quay video ở luồng phụ.
+    Các bản render cho consumer của FrameBus được đặt vào self.mailbox, UI nhận tín hiệu
+    frame_available rồi tự lấy ra (không truyền frame qua hàng đợi signal).
     """
-    frame_ready = pyqtSignal(QImage)
+    frame_available = pyqtSignal()
     error_occurred = pyqtSignal(str)
+    idle_changed = pyqtSignal(bool)   # True = vào chế độ nghỉ, False = chạy lại đầy đủ
+    reconfigured = pyqtSignal(dict)   # Kết quả reconfigure: mode, apply_ms, latency_ms
 
-    def __init__(self, camera_index=0, width=1280, height=720, use_dshow=True, use_compat=False):
+    def __init__(self, camera_index=0, width=1280, height=720, use_dshow=True, use_compat=False,
+                 source=None, source_path=None, bus=None, governor=None, ring_size=10,
+                 fourcc=None, mirror=True, decode_workers=0):
         super().__init__()
         self.camera_index = camera_index
+        self.source = source            # opencv / mjpeg / replay / synthetic (None = tự chọn)
+        self.source_path = source_path  # Đường dẫn cho replay
         self.width = width
         self.height = height
         self.use_dshow = use_dshow
         self.use_compat = use_compat
-        self.rotation = 0
-        self.last_cv_frame = None
+        self.fourcc = fourcc
+        # > 0: đọc JPEG nén và giải mã song song trên JpegDecodePool
+        self.decode_workers = decode_workers
+        self.decoder = None
+        self._reduction = 1
+        # Xoay + lật gương đã gộp sẵn (tạo lại khi đổi rotation / mirror)
+        self._transform = FrameTransform(0, mirror)
+        self._render_shape = None
+        # Hàng đợi lệnh đổi cấu hình, áp dụng ở luồng camera giữa 2 frame
+        self._commands = deque()
+        self._pending_switch = None
+        self.last_switch = {}
+        # Tạm dừng: không đọc/chuyển đổi frame nhưng giữ thiết bị mở và cấu hình
+        self._paused = False
+        self._is_paused = False
+        self._wake = threading.Event()
+        self._resume_requested = 0.0
+        self.resume_ms = 0.0
+
+        # Vòng đệm các frame full-res gần nhất (chụp ảnh theo đúng thời điểm bấm máy)
+        self.ring = FrameRing(ring_size)
+        # Thu nhỏ clip GIF/boomerang ở luồng riêng, không chiếm luồng GUI lúc bấm máy
+        self._clip_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CameraClip")
+        # Buffer dùng lại cho frame gốc (full-res) và frame preview (BGRA).
+        # Pool gốc phải đủ cho cả vòng đệm + các frame đang được xử lý.
+        self.raw_pool = FramePool(max_buffers=ring_size + 4, name="raw")
+        self.preview_pool = FramePool(max_buffers=6, name="preview")
+        self._latest_shape = None
+        # Danh sách consumer và kích thước/tần suất mong muốn (do CameraHandler quản lý)
+        self.bus = bus if bus is not None else FrameBus()
+        # Chế độ nghỉ khi không có khách (do CameraHandler quản lý)
+        self.governor = governor if governor is not None else IdleGovernor()
         
         self.running = False
         self.cap = None
         self.mutex = QMutex()
+        self.mailbox = FrameMailbox()
         
-        # Cấu hình quay video
-        self.is_recording = False
-        self.video_writer = None
-        self.record_width = 1280
-        self.record_height = 720
+        # Quay video ở luồng ghi riêng (VideoRecorder)
+        self.recorder = None
 
     def run(self):
         self.running = True
         try:
+            # Nạp Haar cascade ở luồng camera để lần chụp đầu (luồng GUI) không phải chờ
+            preload_cascades()
             self._open_camera()
             while self.running:
+                if self._commands:
+                    self._apply_commands()
+                if self._paused:
+                    self._idle_paused()
+                    continue
+                if self._is_paused:
+                    self._leave_pause()
                 if self.cap is None or not self.cap.isOpened():
                     # Thử mở lại sau một khoảng thời gian nếu mất kết nối
                     time.sleep(1)
@@ -47,90 +114,454 @@ class CameraThread(QThread):
                         self._open_camera()
                     continue
 
-                ret, frame = self.cap.read()
-                if ret and frame is not None:
-                    # Pre-processing (Xoay, Lật)
-                    if getattr(self, 'rotation', 0) == 90:
-                        frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-                    elif getattr(self, 'rotation', 0) == 180:
-                        frame = cv2.rotate(frame, cv2.ROTATE_180)
-                    elif getattr(self, 'rotation', 0) == 270:
-                        frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
-                    # Mirror (Lật gương toàn hệ thống tại trạm gốc)
-                    frame = cv2.flip(frame, 1)
-
-                     # Lưu frame copy cho chụp ảnh (OpenCV format)
-                    self.last_cv_frame = frame.copy()
-
-                    # Ghi video nếu đang quay
-                    with QMutexLocker(self.mutex):
-                        if self.is_recording and self.video_writer:
-                            try:
-                                v_frame = cv2.resize(frame, (self.record_width, self.record_height))
-                                self.video_writer.write(v_frame)
-                            except Exception as ve:
-                                print(f"[THREAD CAMERA] Loi ghi video: {ve}")
-
-                    # Chuyển đổi sang QImage ngay tại đây để UI dùng luôn
-                    # Sử dụng Format_ARGB32 kết hợp với BGR2BGRA là cách nhanh và ổn định nhất trên Windows/Qt
-                    bgra_image = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
-                    h, w, ch = bgra_image.shape
-                    bytes_per_line = ch * w
-                    
-                    # Tạo QImage và gọi .copy() để đảm bảo an toàn vùng nhớ
-                    qt_image = QImage(bgra_image.data, w, h, bytes_per_line, QImage.Format_ARGB32).copy()
+                frame = self._read_frame()
+                if frame is not None:
+                    raw = frame.array
+                    if self._pending_switch is not None:
+                        self._finish_switch(frame)
+                    # Tier full-res: chỉ giữ tham chiếu buffer gốc trong vòng đệm, chưa xoay/lật.
+                    # Chỉ xử lý khi cần chụp ảnh (get_still_frame).
+                    self.ring.push(frame)
 
-                    # Phát tín hiệu báo có frame mới
-                    self.frame_ready.emit(qt_image)
+                    # Chế độ nghỉ: không có thao tác trong N phút -> giảm fps, không render preview
+                    if self.governor.update(raw, busy=self.is_recording):
+                        idle = self.governor.idle
+                        print(f"[THREAD CAMERA] {'Vao' if idle else 'Thoat'} che do nghi")
+                        self.idle_changed.emit(idle)
+
+                    # Quay video: chỉ đẩy tham chiếu frame sang luồng ghi (không encode ở đây)
+                    recorder = self.recorder
+                    if recorder is not None:
+                        recorder.submit(frame)
+
+                    # Tier preview: mỗi bản render (size, fmt, fit) của FrameBus được tạo
+                    # 1 lần ở luồng camera. Không ai đăng ký -> bỏ qua hoàn toàn.
+                    specs = self.bus.due_specs() if not self.governor.idle else None
+                    if specs:
+                        renditions = RenditionSet(frame.seq, frame.timestamp)
+                        for spec in specs:
+                            renditions.add(spec, self._render(raw, spec, frame))
+                        frame.release()
+
+                        # Ghi đè vào mailbox, chỉ báo UI khi slot đang trống
+                        # (UI chưa lấy frame trước thì không phát thêm signal)
+                        if self.mailbox.post(renditions):
+                            self.frame_available.emit()
+                    else:
+                        frame.release()
                     
-                    # Điều tiết FPS (khoảng 30fps)
-                    self.msleep(30)
+                    # Điều tiết FPS (khoảng 30fps, vài fps khi đang nghỉ)
+                    if self.governor.idle:
+                        self.msleep(int(self.governor.frame_interval * 1000))
+                    else:
+                        self.msleep(30)
                 else:
                     # Lỗi đọc frame
                     self.msleep(10)
         finally:
+            self.ring.clear()
+            self.mailbox.discard()
             # Luôn giải phóng camera khi thoát loop (vì bất cứ lý do gì)
             self._close_all()
 
+    @property
+    def rotation(self):
+        return self._transform.rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        # Chỉ biên dịch lại (và bỏ buffer cũ) khi rotation thực sự đổi
+        if value != self._transform.rotation:
+            self._transform = FrameTransform(value, self._transform.mirror)
+
+    @property
+    def mirror(self):
+        return self._transform.mirror
+
+    @mirror.setter
+    def mirror(self, value):
+        if bool(value) != self._transform.mirror:
+            self._transform = FrameTransform(self._transform.rotation, value)
+
+    def pause(self):
+        """Ngừng đọc/chuyển đổi frame, giữ camera mở (gọi từ luồng bất kỳ)."""
+        self._paused = True
+
+    def resume(self):
+        """Đọc frame lại ngay (không mở lại thiết bị)."""
+        if self._paused:
+            self._resume_requested = time.monotonic()
+            self._paused = False
+            self._wake.set()
+
+    @property
+    def is_paused(self):
+        return self._paused
+
+    def _idle_paused(self):
+        """Một nhịp của trạng thái tạm dừng: chỉ chờ lệnh resume / reconfigure / stop."""
+        if not self._is_paused:
+            self._is_paused = True
+            # Frame cũ trong vòng đệm/mailbox không còn đúng thời điểm -> trả buffer về pool
+            self.ring.clear()
+            self.mailbox.discard()
+            if self.decoder is not None:
+                self.decoder.reset()
+            print("[THREAD CAMERA] Tam dung (giu camera mo)")
+        self._wake.wait(0.2)
+        self._wake.clear()
+
+    def _leave_pause(self):
+        self._is_paused = False
+        if self.cap is not None and self.cap.isOpened():
+            # Bỏ các frame driver còn giữ từ lúc tạm dừng
+            self.cap.flush()
+        self.resume_ms = (time.monotonic() - self._resume_requested) * 1000.0 if self._resume_requested else 0.0
+        print(f"[THREAD CAMERA] Tiep tuc sau {self.resume_ms:.1f} ms")
+
+    def reconfigure(self, **changes):
+        """
+        Yêu cầu đổi cấu hình khi thread đang chạy (gọi từ luồng bất kỳ).
+        Khóa hợp lệ: RECONFIG_KEYS. Lệnh được áp dụng ở luồng camera giữa 2 frame;
+        kết quả (cách áp dụng + độ trễ) báo qua signal reconfigured.
+        """
+        unknown = set(changes) - RECONFIG_KEYS
+        if unknown:
+            raise ValueError(f"Khong doi duoc: {', '.join(sorted(unknown))}")
+        self._commands.append((time.monotonic(), changes))
+
+    def _apply_commands(self):
+        """Gộp các lệnh đang chờ và áp dụng với chi phí thấp nhất có thể."""
+        requested = None
+        changes = {}
+        while self._commands:
+            ts, command = self._commands.popleft()
+            if requested is None:
+                requested = ts
+            changes.update(command)
+        changes = {k: v for k, v in changes.items() if getattr(self, k) != v}
+        if not changes:
+            return
+
+        t0 = time.monotonic()
+        for key, value in changes.items():
+            setattr(self, key, value)
+
+        keys = set(changes)
+        if keys & _DEVICE_KEYS:
+            mode = "reopen"
+            self._open_camera()
+        elif keys & _FORMAT_KEYS:
+            # Thử đổi ngay trên thiết bị đang mở, driver từ chối thì mới mở lại
+            if self.cap is not None and self.cap.configure(self.width, self.height, self.fourcc):
+                mode = "device"
+            else:
+                mode = "reopen"
+                self._open_camera()
+            self._latest_shape = None
+            self.raw_pool.clear()
+        else:
+            mode = "software"
+
+        previous = self._pending_switch
+        if previous is not None:
+            # Lần đổi trước chưa ra hình -> gộp lại, đo từ yêu cầu đầu tiên
+            keys |= set(previous["changes"])
+            requested = previous["requested"]
+        self._pending_switch = {
+            "changes": sorted(keys),
+            "mode": mode,
+            "requested": requested,
+            "apply_ms": round((time.monotonic() - t0) * 1000.0, 1),
+        }
+        print(f"[THREAD CAMERA] Doi cau hinh {sorted(keys)} ({mode})")
+
+    def _finish_switch(self, frame):
+        """Frame đầu tiên sau khi đổi cấu hình: đo độ trễ từ lúc yêu cầu tới lúc có hình."""
+        info = self._pending_switch
+        self._pending_switch = None
+        info["latency_ms"] = round((time.monotonic() - info.pop("requested")) * 1000.0, 1)
+        info["shape"] = tuple(frame.array.shape)
+        self.last_switch = info
+        print(f"[THREAD CAMERA] Doi cau hinh xong sau {info['latency_ms']:.0f} ms")
+        self.reconfigured.emit(info)
+
+    def _apply_orientation(self, frame):
+        """
+        Xoay theo layout và lật gương (Lật gương toàn hệ thống tại trạm gốc).
+        Trả về mảng mới -> dùng được từ luồng khác (chụp ảnh, luồng ghi video).
+        """
+        return self._transform.apply(frame)
+
+    def _target_size(self, spec, w, h):
+        """Kích thước (w, h) của bản render cho frame đã xoay có kích thước w x h."""
+        size, _, fit = spec
+        if size is None:
+            return w, h
+        tw, th = size
+        if fit == "stretch":
+            return tw, th
+        if fit == "fit":
+            scale = min(tw / w, th / h)
+        else:  # cover
+            scale = max(tw / w, th / h)
+        scale = min(scale, 1.0)
+        return max(1, round(w * scale)), max(1, round(h * scale))
+
+    def _needed_scale(self, raw_w, raw_h):
+        """Tỷ lệ lớn nhất mà các consumer cần so với frame gốc (dùng chọn mức giải mã MJPEG)."""
+        if self.rotation in (90, 270):
+            raw_w, raw_h = raw_h, raw_w
+        specs = self.bus.all_specs()
+        if not specs:
+            return 0.0
+        scale = 0.0
+        for spec in specs:
+            tw, th = self._target_size(spec, raw_w, raw_h)
+            scale = max(scale, tw / raw_w, th / raw_h)
+        return scale
+
+    def _render(self, raw, spec, frame):
+        """
+        Tạo một bản render từ frame gốc: thu nhỏ TRƯỚC khi xoay/lật để giảm chi phí.
+        Trả về Frame của preview_pool (payload = QImage nếu fmt là "qimage").
+        """
+        transform = self._transform
+        if raw.shape != self._render_shape:
+            # Đổi độ phân giải -> bỏ các buffer trung gian cũ
+            transform.reset()
+            self._render_shape = raw.shape
+        raw_h, raw_w = raw.shape[:2]
+        swap = transform.swaps_axes
+        ow, oh = (raw_h, raw_w) if swap else (raw_w, raw_h)
+        tw, th = self._target_size(spec, ow, oh)
+        pre_size = (th, tw) if swap else (tw, th)
+
+        # Mọi bước ghi vào buffer có sẵn: không cấp phát ảnh mới trong vòng lặp
+        small = raw
+        if pre_size != (raw_w, raw_h):
+            interp = cv2.INTER_AREA if pre_size[0] < raw_w else cv2.INTER_LINEAR
+            small = cv2.resize(raw, pre_size, dst=transform.buffer("resize", (pre_size[1], pre_size[0], 3)),
+                               interpolation=interp)
+
+        if spec[1] == "bgr":
+            out = self.preview_pool.acquire((th, tw, 3))
+            transform.apply(small, out.array)
+        else:
+            oriented = transform.apply(small, transform.buffer("oriented", (th, tw, 3)))
+            # Chuyển đổi sang QImage ngay tại đây để UI dùng luôn
+            # Sử dụng Format_ARGB32 kết hợp với BGR2BGRA là cách nhanh và ổn định nhất trên Windows/Qt.
+            # BGRA ghi thẳng vào buffer của pool, QImage bọc quanh buffer (không copy);
+            # buffer được trả về pool khi UI vẽ xong hoặc khi bị frame mới ghi đè.
+            out = self.preview_pool.acquire((th, tw, 4))
+            cv2.cvtColor(oriented, cv2.COLOR_BGR2BGRA, dst=out.array)
+            out.payload = QImage(out.array.data, tw, th, 4 * tw, QImage.Format_ARGB32)
+        out.seq, out.timestamp = frame.seq, frame.timestamp
+        return out
+
+    def _read_frame(self):
+        """Đọc frame tiếp theo thẳng vào buffer của pool. Trả về Frame hoặc None."""
+        if self.decoder is not None and self.cap.compressed:
+            return self._read_pooled_frame()
+        if isinstance(self.cap, MjpegReader):
+            return self._read_mjpeg_frame()
+
+        shape = self._latest_shape
+        if shape is None:
+            ret, img = self.cap.read()
+            if not ret or img is None:
+                return None
+            self._latest_shape = img.shape
+            return self.raw_pool.adopt(img)
+
+        frame = self.raw_pool.acquire(shape)
+        ret, img = self.cap.read(frame.array)
+        if not ret or img is None:
+            frame.release()
+            return None
+        if img is not frame.array:
+            # Backend trả về mảng mới (vd: đổi kích thước) -> bọc mảng đó thay cho buffer
+            frame.release()
+            if img.shape != shape:
+                self.raw_pool.clear()
+                self._latest_shape = img.shape
+            return self.raw_pool.adopt(img)
+        # Timestamp = lúc frame đọc xong (không phải lúc lấy buffer)
+        frame.timestamp = time.monotonic()
+        return frame
+
+    def _choose_reduction(self, current):
+        """Hệ số giải mã thu nhỏ JPEG (1/2/4/8) cho frame tiếp theo; current: hệ số của frame trước."""
+        if self.governor.idle:
+            # Đang nghỉ chỉ cần ảnh rất nhỏ để dò chuyển động
+            return 8
+        if self._latest_shape is None or self._recording_needs_full_decode():
+            return 1
+        # Hệ số thu nhỏ lớn nhất mà ảnh giải mã vẫn phủ kín kích thước hiển thị
+        h, w = self._latest_shape[:2]
+        scale = self._needed_scale(w * current, h * current)
+        for factor in (8, 4, 2):
+            if scale * factor <= 1.0:
+                return factor
+        return 1
+
+    def _read_pooled_frame(self):
+        """
+        Đọc JPEG nén, giao cho JpegDecodePool và lấy frame đã giải mã kế tiếp theo thứ tự.
+        Pipeline trễ 1-2 frame nhưng giải mã được nhiều frame song song.
+        """
+        jpeg, timestamp = self.cap.read_compressed()
+        if jpeg is not None:
+            self._reduction = self._choose_reduction(self._reduction)
+            self.decoder.submit(jpeg, timestamp, self._reduction)
+        decoded = self.decoder.get(wait=0.05)
+        if decoded is None:
+            return None
+        self._latest_shape = decoded.image.shape
+        frame = self.raw_pool.adopt(decoded.image)
+        frame.jpeg = decoded.jpeg
+        frame.reduction = decoded.reduction
+        frame.timestamp = decoded.timestamp
+        return frame
+
+    def decode_stats(self):
+        """Thống kê giải mã song song (rỗng nếu không dùng)."""
+        decoder = self.decoder
+        return decoder.stats() if decoder is not None else {}
+
+    def _read_mjpeg_frame(self):
+        """Đọc JPEG mới nhất từ MjpegReader, giải mã thu nhỏ nếu chỉ cần preview."""
+        reader = self.cap
+        reader.set_reduction(self._choose_reduction(reader.reduction))
+
+        ret, img = reader.read()
+        if not ret or img is None:
+            return None
+        self._latest_shape = img.shape
+        frame = self.raw_pool.adopt(img)
+        frame.jpeg = reader.last_jpeg
+        frame.reduction = reader.reduction
+        # Thời điểm JPEG về tới máy, sát với lúc chụp hơn lúc giải mã xong
+        frame.timestamp = reader.last_jpeg_time
+        return frame
+
+    def acquire_latest_frame(self):
+        """
+        Lấy tham chiếu tới frame full-res mới nhất (chưa xoay/lật).
+        Người gọi PHẢI gọi frame.release() khi dùng xong.
+        """
+        return self.ring.latest()
+
+    def acquire_frame_at(self, timestamp, wait=0.15):
+        """
+        Lấy tham chiếu tới frame full-res có timestamp (time.monotonic) gần nhất.
+        Nếu thời điểm đó chưa tới, chờ tối đa `wait` giây. Người gọi PHẢI release().
+        """
+        return self.ring.closest(timestamp, wait)
+
+    def get_still_frame(self, at=None):
+        """
+        Lấy ảnh tĩnh full-res từ buffer gốc (đã xoay/lật).
+        at: thời điểm bấm máy (time.monotonic), None = frame mới nhất.
+        Trả về mảng mới, người gọi có thể giữ lại mà không cần copy.
+        """
+        frame = self.acquire_latest_frame() if at is None else self.acquire_frame_at(at)
+        if frame is None:
+            return None
+        try:
+            return self._still_from_frame(frame)
+        finally:
+            frame.release()
+
+    def get_best_still(self, at, count=5, check_eyes=True, budget_ms=50.0):
+        """
+        Chụp liên tiếp: lấy `count` frame gốc quanh thời điểm `at`, chấm điểm trên bản
+        thu nhỏ (độ nét + mắt mở) và trả về ảnh full-res của frame tốt nhất.
+        """
+        frames = self.ring.around(at, count, wait=0.15)
+        if not frames:
+            return None
+        try:
+            # Ảnh chấm điểm phải đúng chiều (Haar chỉ dò được mặt thẳng đứng)
+            grays = [self._apply_orientation(to_score_gray(f.array)) for f in frames]
+            best, _ = select_best_frame(grays, check_eyes, budget_ms)
+            return self._still_from_frame(frames[max(best, 0)])
+        finally:
+            for f in frames:
+                f.release()
+
+    def get_clip(self, at, count=10, width=480):
+        """
+        Các frame quanh thời điểm `at` (thu nhỏ về `width`, đã xoay/lật) cho GIF/boomerang.
+        Trả về list mảng mới, không giữ buffer của pool.
+        """
+        return self._make_clip(self.ring.around(at, count), self._transform, width)
+
+    def get_clip_async(self, at, count=10, width=480):
+        """
+        Như get_clip nhưng chỉ giữ (retain) frame ngay lúc gọi; thu nhỏ + xoay chạy
+        ở luồng CameraClip. Trả về Future -> list frame.
+        """
+        frames = self.ring.around(at, count)
+        try:
+            return self._clip_executor.submit(self._make_clip, frames, self._transform, width)
+        except RuntimeError:
+            for f in frames:
+                f.release()
+            raise
+
+    @staticmethod
+    def _make_clip(frames, transform, width):
+        clip = []
+        try:
+            for f in frames:
+                img = f.array
+                h, w = img.shape[:2]
+                # Sau khi xoay 90/270 chiều rộng là h
+                scale = width / (h if transform.swaps_axes else w)
+                if scale < 1.0:
+                    img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+                clip.append(transform.apply(img))
+        finally:
+            for f in frames:
+                f.release()
+        return clip
+
+    def _still_from_frame(self, frame):
+        """Ảnh full-res đã xoay/lật từ một frame gốc."""
+        if frame.jpeg is not None and frame.reduction > 1:
+            # Preview đang giải mã thu nhỏ -> giải mã lại full-res từ JPEG gốc
+            full = cv2.imdecode(np.frombuffer(frame.jpeg, np.uint8), cv2.IMREAD_COLOR)
+            if full is not None:
+                return self._apply_orientation(full)
+        return self._apply_orientation(frame.array)
+
+    @property
+    def last_cv_frame(self):
+        """Tương thích ngược: frame full-res đã xoay/lật."""
+        return self.get_still_frame()
+
     def _open_camera(self):
         """Khởi tạo kết nối camera."""
         if self.cap is not None:
             self.cap.release()
             self.cap = None
+        self._latest_shape = None
+        if self.decoder is not None:
+            # Frame đang giải mã thuộc nguồn cũ
+            self.decoder.reset()
 
         try:
-            # MJPEG Stream (thường từ digiCamControl hoặc Web Server MJPEG)
-            if isinstance(self.camera_index, str) and self.camera_index.startswith("http"):
-                self.cap = cv2.VideoCapture(self.camera_index)
-            else:
-                # OpenCV Camera Index
-                idx = int(self.camera_index)
-                if self.use_dshow:
-                    self.cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-                else:
-                    self.cap = cv2.VideoCapture(idx)
-                
-                if not self.cap.isOpened() and self.use_dshow:
-                    self.cap = cv2.VideoCapture(idx)
-
-            if self.cap and self.cap.isOpened():
-                print(f"[THREAD CAMERA] Opened index {self.camera_index} SUCCESSFULLY.")
-                if not (isinstance(self.camera_index, str) and self.camera_index.startswith("http")):
-                    # Đợi một chút để driver ổn định
-                    time.sleep(0.3)
-                    try:
-                        if self.use_compat:
-                            # MJPG mode
-                            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
-                            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                            print(f"[THREAD CAMERA] Mode: COMPAT (MJPG 640x480)")
-                        else:
-                            print(f"[THREAD CAMERA] Setting resolution to {self.width}x{self.height}")
-                            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-                            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-                    except Exception as se:
-                        print(f"[THREAD CAMERA] WARNING: Could not set camera properties: {se}")
+            self.cap = create_source(
+                self.camera_index, self.width, self.height,
+                self.use_dshow, self.use_compat,
+                source=self.source, source_path=self.source_path, fourcc=self.fourcc,
+                compressed=self.decode_workers > 0,
+            )
+            if self.cap.open() and self.cap.isOpened():
+                print(f"[THREAD CAMERA] Opened {self.cap.name} source {self.camera_index} SUCCESSFULLY.")
+                if self.decode_workers > 0 and self.cap.compressed and self.decoder is None:
+                    self.decoder = JpegDecodePool(self.decode_workers)
                 return True
             else:
                 print(f"[THREAD CAMERA] FAILED to open index {self.camera_index}")
@@ -140,37 +571,57 @@ class CameraThread(QThread):
             self.error_occurred.emit(str(e))
             return False
 
-    def start_recording(self, output_path, width=1280, height=720, fps=20.0):
-        """Bắt đầu ghi video ở luồng phụ."""
+    @property
+    def is_recording(self):
+        return self.recorder is not None
+
+    def _recording_needs_full_decode(self):
+        """Quay video cần ảnh giải mã full-res (trừ khi ghi passthrough JPEG gốc)."""
+        recorder = self.recorder
+        return recorder is not None and not recorder.passthrough
+
+    def start_recording(self, output_path, width=1280, height=720, fps=20.0, encoder_options=None,
+                        segment_seconds=None, segment_sink=None):
+        """
+        Bắt đầu ghi video ở luồng ghi riêng (encoder_options: xem encoders.create_encoder).
+        segment_seconds + segment_sink: cắt video thành từng đoạn và giao ngay cho sink.
+        """
         with QMutexLocker(self.mutex):
             try:
-                self.record_width = width
-                self.record_height = height
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                self.video_writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-                self.is_recording = True
-                print(f"[THREAD CAMERA] Bat dau ghi video tai: {output_path}")
+                # Nguồn MJPEG: ghi thẳng JPEG gốc, không giải mã/encode trong phiên quay
+                passthrough = (isinstance(self.cap, MjpegReader)
+                               and (encoder_options or {}).get("passthrough", True))
+                recorder = VideoRecorder(output_path, width, height, fps,
+                                         transform=self._apply_orientation, rotation=self.rotation,
+                                         mirror=self.mirror,
+                                         encoder_options=encoder_options, passthrough=passthrough,
+                                         segment_seconds=segment_seconds, segment_sink=segment_sink)
+                if recorder.start():
+                    self.recorder = recorder
+                    print(f"[THREAD CAMERA] Bat dau ghi video tai: {output_path}")
             except Exception as e:
                 print(f"[THREAD CAMERA] Loi khoi tao VideoWriter: {e}")
-                self.is_recording = False
+                self.recorder = None
 
     def stop_recording(self):
-        """Dừng ghi video."""
+        """Dừng ghi video (không chặn: luồng ghi tự xả hàng đợi rồi đóng file)."""
         with QMutexLocker(self.mutex):
-            self.is_recording = False
-            if self.video_writer:
-                self.video_writer.release()
-                self.video_writer = None
-                print("[THREAD CAMERA] Da dung va luu video.")
-
-    def change_camera(self, index, width=1280, height=720, use_dshow=True, use_compat=False):
-        """Đổi camera index một cách an toàn."""
-        self.camera_index = index
-        self.width = width
-        self.height = height
-        self.use_dshow = use_dshow
-        self.use_compat = use_compat
-        self._open_camera()
+            recorder = self.recorder
+            self.recorder = None
+        if recorder is not None:
+            recorder.stop()
+            print("[THREAD CAMERA] Da yeu cau dung video, dang xa hang doi...")
+        return recorder
+
+    def recording_stats(self):
+        recorder = self.recorder
+        return recorder.stats() if recorder is not None else {}
+
+    def change_camera(self, index, width=1280, height=720, use_dshow=True, use_compat=False,
+                      source=None, source_path=None):
+        """Đổi camera index một cách an toàn (mở lại thiết bị ở luồng camera, giữa 2 frame)."""
+        self.reconfigure(camera_index=index, width=width, height=height, use_dshow=use_dshow,
+                         use_compat=use_compat, source=source, source_path=source_path)
 
     def _close_all(self):
         """Giải phóng tài nguyên."""
@@ -178,10 +629,14 @@ class CameraThread(QThread):
         if self.cap:
             self.cap.release()
             self.cap = None
+        if self.decoder is not None:
+            self.decoder.shutdown()
+            self.decoder = None
 
     def stop(self):
         """Dừng thread một cách an toàn."""
         self.running = False
+        self._wake.set()
         # Chờ tối đa 2 giây để thread tự thoát vòng lặp
         if not self.wait(2000):
             print("[THREAD CAMERA] Thread khong thoat dung han, dang cuong che dung...")
@@ -0,0 +1,288 @@
+# ==========================================
+# VIDEO ENCODERS - Backend ghi video
+# ==========================================
+"""
+Các backend encode cho VideoRecorder, cùng giao diện:
+    open() -> bool, write(bgr_image), release(), width / height
+
+- "opencv" : cv2.VideoWriter mp4v (luôn có, file lớn).
+- "ffmpeg" : Đẩy frame BGR thô qua pipe vào tiến trình ffmpeg (libx264, yuv420p, faststart).
+             File nhỏ hơn nhiều lần -> upload nhanh, ít tốn chỗ thư mục tạm.
+- "auto"   : ffmpeg nếu tìm thấy, không thì opencv.
+
+Các khóa trong camera_settings.json: video_encoder, video_crf, video_bitrate, video_preset, ffmpeg_path.
+"""
+
+import os
+import shutil
+import subprocess
+
+import cv2
+
+ENCODER_TYPES = ("auto", "ffmpeg", "opencv")
+
+# ffmpeg thoát ngay (sai tham số, thiếu libx264...) thì thường chết trong khoảng này
+_STARTUP_WAIT = 0.1
+# Số frame đầu được giữ lại để ghi lại bằng OpenCV nếu ffmpeg chết khi bắt đầu encode
+_STARTUP_FRAMES = 3
+
+
+def _fit(image, width, height):
+    """Frame sai kích thước -> resize về đúng kích thước encoder."""
+    if image.shape[1] != width or image.shape[0] != height:
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def find_ffmpeg(path=None):
+    """Đường dẫn ffmpeg (ưu tiên path cấu hình, sau đó PATH). None nếu không có."""
+    if path and os.path.isfile(path):
+        return path
+    return shutil.which("ffmpeg")
+
+
+class OpenCVEncoder:
+    """cv2.VideoWriter với codec mp4v."""
+
+    name = "opencv"
+
+    def __init__(self, output_path, width, height, fps):
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._writer = None
+
+    def open(self):
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self._writer = cv2.VideoWriter(self.output_path, fourcc, self.fps, (self.width, self.height))
+        if not self._writer.isOpened():
+            self._writer = None
+            return False
+        return True
+
+    def write(self, image):
+        # VideoWriter bỏ qua im lặng frame sai kích thước
+        self._writer.write(_fit(image, self.width, self.height))
+
+    def release(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+class FFmpegEncoder:
+    """
+    H.264 qua tiến trình ffmpeg, nhận frame bgr24 từ stdin.
+    ffmpeg chết lúc khởi động hoặc ở vài frame đầu (thiếu libx264, lỗi tham số)
+    -> tự chuyển sang OpenCVEncoder cùng file, ghi lại các frame đầu đã giữ.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, output_path, width, height, fps, ffmpeg="ffmpeg",
+                 crf=23, bitrate=None, preset="veryfast"):
+        self.output_path = output_path
+        # yuv420p yêu cầu kích thước chẵn
+        self.width = width - (width % 2)
+        self.height = height - (height % 2)
+        self.fps = fps
+        self.ffmpeg = ffmpeg
+        self.crf = crf
+        self.bitrate = bitrate
+        self.preset = preset
+        self._proc = None
+        self._fallback = None
+        self._startup = []          # Frame đầu (chưa chắc ffmpeg đã nhận được)
+        self.frames = 0
+
+    def _command(self):
+        cmd = [
+            self.ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{self.width}x{self.height}", "-r", str(self.fps),
+            "-i", "-",
+            "-an", "-c:v", "libx264", "-preset", self.preset,
+        ]
+        if self.bitrate:
+            # Bitrate cố định (vd: "2M") thay cho CRF
+            cmd += ["-b:v", str(self.bitrate), "-maxrate", str(self.bitrate),
+                    "-bufsize", str(self.bitrate)]
+        else:
+            cmd += ["-crf", str(self.crf)]
+        cmd += ["-pix_fmt", "yuv420p", "-movflags", "+faststart", self.output_path]
+        return cmd
+
+    def open(self):
+        try:
+            self._proc = subprocess.Popen(
+                self._command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                # Không bật cửa sổ console trên Windows
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+        except OSError as e:
+            print(f"[ENCODER] Khong chay duoc ffmpeg: {e}")
+            self._proc = None
+            return False
+        try:
+            self._proc.wait(timeout=_STARTUP_WAIT)
+        except subprocess.TimeoutExpired:
+            return True
+        print(f"[ENCODER] ffmpeg thoat ngay khi khoi dong (ma {self._proc.returncode})")
+        self._proc = None
+        return False
+
+    def write(self, image):
+        if self._fallback is not None:
+            self._fallback.write(image)
+            return
+        image = _fit(image, self.width, self.height)
+        try:
+            self._proc.stdin.write(image.tobytes())
+            if self.frames < _STARTUP_FRAMES and self._proc.poll() is not None:
+                raise BrokenPipeError(f"ffmpeg da thoat (ma {self._proc.returncode})")
+        except OSError as e:
+            if self.frames >= _STARTUP_FRAMES:
+                raise
+            self._start_fallback(image, e)
+            return
+        self.frames += 1
+        if self.frames <= _STARTUP_FRAMES:
+            self._startup.append(image)
+        else:
+            self._startup = []
+
+    def _start_fallback(self, image, error):
+        """ffmpeg chết ở các frame đầu -> mở OpenCVEncoder và ghi lại từ đầu."""
+        print(f"[ENCODER] ffmpeg loi khi bat dau encode ({error}), chuyen sang OpenCV (mp4v)")
+        self._kill()
+        fallback = OpenCVEncoder(self.output_path, self.width, self.height, self.fps)
+        if not fallback.open():
+            raise IOError(f"Khong mo duoc encoder OpenCV: {self.output_path}")
+        for frame in self._startup + [image]:
+            fallback.write(frame)
+        self._startup = []
+        self._fallback = fallback
+        self.name = fallback.name
+
+    def _kill(self):
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        self._proc = None
+
+    def release(self):
+        if self._fallback is not None:
+            self._fallback.release()
+            return
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=60)
+        except Exception as e:
+            print(f"[ENCODER] ffmpeg khong ket thuc dung han: {e}")
+            self._proc.kill()
+        if self._proc.returncode not in (0, None):
+            print(f"[ENCODER] ffmpeg loi (ma {self._proc.returncode})")
+        self._proc = None
+
+
+def create_encoder(output_path, width, height, fps, encoder="auto", crf=23, bitrate=None,
+                   preset="veryfast", ffmpeg_path=None):
+    """
+    Tạo và mở encoder theo cấu hình, tự lùi về OpenCV nếu không dùng được ffmpeg.
+    Trả về encoder đã mở hoặc None.
+    """
+    if encoder not in ENCODER_TYPES:
+        print(f"[ENCODER] Encoder khong hop le: {encoder}, dung auto")
+        encoder = "auto"
+
+    if encoder in ("auto", "ffmpeg"):
+        ffmpeg = find_ffmpeg(ffmpeg_path)
+        if ffmpeg:
+            enc = FFmpegEncoder(output_path, width, height, fps, ffmpeg, crf, bitrate, preset)
+            if enc.open():
+                return enc
+        print("[ENCODER] Khong dung duoc ffmpeg, dung OpenCV (mp4v)")
+
+    enc = OpenCVEncoder(output_path, width, height, fps)
+    return enc if enc.open() else None
+
+
+def _orientation_filter(rotation, mirror=True):
+    """Bộ lọc ffmpeg tương đương xoay theo layout + lật gương (nếu mirror)."""
+    filters = {90: ["transpose=1"], 180: ["transpose=1", "transpose=1"], 270: ["transpose=2"]}.get(rotation, [])
+    if mirror:
+        filters.append("hflip")
+    return ",".join(filters)
+
+
+def transcode_to_mp4(input_path, output_path, width, height, fps, rotation=0, transform=None,
+                     mirror=True, encoder="auto", crf=23, bitrate=None, preset="veryfast",
+                     ffmpeg_path=None):
+    """
+    Chuyển video gốc (vd: AVI MJPEG passthrough) sang mp4 kích thước width x height
+    (sau khi xoay), đúng tốc độ khung hình cố định. Trả về True nếu thành công.
+    transform: hàm xoay/lật dùng cho đường OpenCV (khi không có ffmpeg).
+    mirror: lật gương trên đường ffmpeg (phải khớp với transform).
+    """
+    pre_w, pre_h = (height, width) if rotation in (90, 270) else (width, height)
+    ffmpeg = find_ffmpeg(ffmpeg_path) if encoder in ("auto", "ffmpeg") else None
+    if ffmpeg:
+        orient = _orientation_filter(rotation, mirror)
+        vf = f"scale={pre_w}:{pre_h},{orient}" if orient else f"scale={pre_w}:{pre_h}"
+        cmd = [ffmpeg, "-y", "-loglevel", "error", "-i", input_path, "-vf", vf,
+               "-r", str(fps), "-an", "-c:v", "libx264", "-preset", preset]
+        if bitrate:
+            cmd += ["-b:v", str(bitrate), "-maxrate", str(bitrate), "-bufsize", str(bitrate)]
+        else:
+            cmd += ["-crf", str(crf)]
+        cmd += ["-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+            if result.returncode == 0:
+                return True
+            print(f"[ENCODER] ffmpeg chuyen ma loi (ma {result.returncode}), thu OpenCV")
+        except OSError as e:
+            print(f"[ENCODER] Khong chay duoc ffmpeg: {e}")
+
+    # Đường OpenCV: đọc lại từng frame, đặt theo timestamp vào dòng thời gian CFR
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        return False
+    enc = OpenCVEncoder(output_path, width, height, fps)
+    if not enc.open():
+        cap.release()
+        return False
+    written = 0
+    last = None
+    try:
+        while True:
+            ok, img = cap.read()
+            if not ok:
+                break
+            slot = int(round(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 * fps))
+            if slot < written:
+                continue
+            img = cv2.resize(img, (pre_w, pre_h), interpolation=cv2.INTER_AREA)
+            if transform is not None:
+                img = transform(img)
+            while last is not None and written < slot:
+                enc.write(last)
+                written += 1
+            enc.write(img)
+            written += 1
+            last = img
+    finally:
+        cap.release()
+        enc.release()
+    return written > 0
@@ -0,0 +1,113 @@
+# ==========================================
+# FRAME BUS - Phân phối frame cho nhiều consumer
+# ==========================================
+"""
+Mỗi consumer (HomeScreen, Step 9 full/mini, Camera Setup...) đăng ký với:
+- size    : kích thước đích (w, h) hoặc None = full-res
+- max_fps : tần suất tối đa muốn nhận (None = mọi frame)
+- fmt     : "qimage" (QImage ARGB32) hoặc "bgr" (numpy BGR)
+- fit     : "cover" (phủ kín, giữ tỷ lệ), "fit" (vừa khung, giữ tỷ lệ), "stretch" (kéo giãn)
+
+Luồng camera chỉ tạo mỗi bản render (size, fmt, fit) MỘT lần cho mỗi frame,
+và bỏ qua hoàn toàn việc render khi không có ai đăng ký.
+"""
+
+import threading
+import time
+
+
+class Subscription:
+    """Một consumer đăng ký nhận frame."""
+
+    def __init__(self, name, callback, size=None, max_fps=None, fmt="qimage", fit="cover"):
+        self.name = name
+        self.callback = callback
+        self.size = (int(size[0]), int(size[1])) if size else None
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.fmt = fmt
+        self.fit = fit
+        self.last_delivery = 0.0
+
+    @property
+    def spec(self):
+        return (self.size, self.fmt, self.fit)
+
+    def is_due(self, now):
+        return now - self.last_delivery >= self.min_interval
+
+
+class RenditionSet:
+    """Các bản render của cùng một frame, gửi qua mailbox sang UI."""
+
+    def __init__(self, seq=0, timestamp=0.0):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.items = {}
+
+    def add(self, spec, item):
+        self.items[spec] = item
+
+    def get(self, spec):
+        """Trả về dữ liệu để giao cho consumer (QImage hoặc numpy)."""
+        item = self.items.get(spec)
+        if item is None:
+            return None
+        return item.payload if item.payload is not None else item.array
+
+    def release(self):
+        for item in self.items.values():
+            item.release()
+        self.items.clear()
+
+
+class FrameBus:
+    """Danh sách consumer, an toàn khi đọc từ luồng camera và sửa từ luồng UI."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}
+
+    def subscribe(self, name, callback, size=None, max_fps=None, fmt="qimage", fit="cover"):
+        """Đăng ký (hoặc thay thế) consumer theo tên."""
+        sub = Subscription(name, callback, size, max_fps, fmt, fit)
+        with self._lock:
+            self._subs[name] = sub
+        return sub
+
+    def unsubscribe(self, name):
+        with self._lock:
+            self._subs.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._subs.clear()
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subs)
+
+    def subscribers(self):
+        with self._lock:
+            return list(self._subs.values())
+
+    def due_specs(self, now=None):
+        """Các bản render cần tạo cho frame hiện tại (bỏ qua consumer chưa tới lượt)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return {sub.spec for sub in self._subs.values() if sub.is_due(now)}
+
+    def all_specs(self):
+        with self._lock:
+            return {sub.spec for sub in self._subs.values()}
+
+    def deliver(self, renditions, now=None):
+        """Giao bản render phù hợp cho từng consumer (chạy ở luồng UI)."""
+        now = time.monotonic() if now is None else now
+        for sub in self.subscribers():
+            if not sub.is_due(now):
+                continue
+            data = renditions.get(sub.spec)
+            if data is None:
+                continue
+            sub.last_delivery = now
+            sub.callback(data)
@@ -0,0 +1,74 @@
+# ==========================================
+# FRAME MAILBOX - Hộp thư 1 slot giữa CameraThread và UI
+# ==========================================
+"""
+Luồng camera luôn ghi đè frame mới nhất vào một slot duy nhất,
+UI chỉ lấy ra tối đa một lần cho mỗi lượt vẽ.
+Nhờ vậy khi UI bận, signal không bị dồn hàng đợi và live view không bị trễ.
+Frame có hàm release() (Frame của FramePool) sẽ được trả về pool khi bị ghi đè/bỏ.
+"""
+
+import threading
+
+
+def _release(frame):
+    """Trả frame về pool nếu frame có cơ chế đếm tham chiếu."""
+    if frame is not None and hasattr(frame, "release"):
+        frame.release()
+
+
+class FrameMailbox:
+    """Slot chứa frame mới nhất, an toàn khi dùng giữa 2 thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+
+        # Bộ đếm thống kê
+        self.posted = 0       # Số frame luồng camera đã gửi vào
+        self.delivered = 0    # Số frame UI đã lấy ra
+        self.superseded = 0   # Số frame bị ghi đè khi UI chưa kịp lấy
+        self.dropped = 0      # Số frame bị bỏ vì không có ai nhận
+
+    def post(self, frame):
+        """
+        Ghi đè slot bằng frame mới nhất.
+        Trả về True nếu slot đang trống, tức là cần báo cho UI biết có frame mới.
+        """
+        with self._lock:
+            old = self._frame
+            if old is not None:
+                self.superseded += 1
+            self._frame = frame
+            self.posted += 1
+        _release(old)
+        return old is None
+
+    def take(self):
+        """Lấy frame mới nhất ra khỏi slot (None nếu slot trống)."""
+        with self._lock:
+            frame = self._frame
+            self._frame = None
+            if frame is not None:
+                self.delivered += 1
+            return frame
+
+    def discard(self):
+        """Bỏ frame đang chờ (khi không có consumer nào)."""
+        with self._lock:
+            old = self._frame
+            self._frame = None
+            if old is not None:
+                self.dropped += 1
+        _release(old)
+
+    def stats(self):
+        """Trả về bộ đếm hiện tại."""
+        with self._lock:
+            return {
+                "posted": self.posted,
+                "delivered": self.delivered,
+                "superseded": self.superseded,
+                "dropped": self.dropped,
+                "pending": self._frame is not None,
+            }
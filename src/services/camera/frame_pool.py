@@ -0,0 +1,128 @@
+# ==========================================
+# FRAME POOL - Buffer numpy dùng lại + đếm tham chiếu
+# ==========================================
+"""
+Thay vì copy frame ở mỗi bước (preview, quay video, chụp ảnh),
+luồng camera đọc thẳng vào một buffer lấy từ pool. Các consumer
+giữ tham chiếu (retain) và trả lại (release); khi không còn ai giữ,
+buffer quay về pool để dùng cho frame tiếp theo.
+"""
+
+import threading
+import time
+import numpy as np
+
+
+class Frame:
+    """Một frame trong pool: buffer numpy + số thứ tự + timestamp (monotonic)."""
+
+    __slots__ = ("array", "seq", "timestamp", "payload", "jpeg", "reduction", "_pool", "_refs")
+
+    def __init__(self, array, pool=None):
+        self.array = array
+        self.seq = 0
+        self.timestamp = 0.0
+        self.payload = None    # Dữ liệu đi kèm (vd: QImage bọc quanh buffer)
+        self.jpeg = None       # JPEG gốc (nếu nguồn là MJPEG)
+        self.reduction = 1     # Hệ số thu nhỏ khi giải mã JPEG gốc
+        self._pool = pool
+        self._refs = 1
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def retain(self):
+        """Giữ thêm một tham chiếu tới frame. Trả về chính frame để tiện dùng."""
+        if self._pool is not None:
+            with self._pool._lock:
+                self._refs += 1
+        else:
+            self._refs += 1
+        return self
+
+    def release(self):
+        """Trả tham chiếu. Buffer về pool khi không còn ai giữ."""
+        if self._pool is not None:
+            self._pool._release(self)
+        else:
+            self._refs = max(0, self._refs - 1)
+
+
+class FramePool:
+    """Pool các buffer numpy cấp phát sẵn, tái sử dụng theo shape."""
+
+    def __init__(self, max_buffers=8, name="frames"):
+        self.name = name
+        self.max_buffers = max_buffers
+        self._lock = threading.Lock()
+        self._free = []
+        self._seq = 0
+
+        # Thống kê
+        self.allocated = 0   # Số buffer đã cấp phát mới
+        self.reused = 0      # Số lần lấy lại buffer từ pool
+        self.in_use = 0      # Số frame đang có người giữ
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Lấy một frame (refcount = 1) có buffer đúng shape."""
+        shape = tuple(shape)
+        with self._lock:
+            frame = None
+            for i, candidate in enumerate(self._free):
+                if candidate.array.shape == shape and candidate.array.dtype == dtype:
+                    frame = self._free.pop(i)
+                    self.reused += 1
+                    break
+            if frame is None:
+                frame = Frame(np.empty(shape, dtype=dtype), self)
+                self.allocated += 1
+            self._stamp(frame)
+            return frame
+
+    def adopt(self, array):
+        """Bọc một mảng đã có sẵn thành frame của pool (khi không đọc được vào buffer)."""
+        with self._lock:
+            frame = Frame(array, self)
+            self.allocated += 1
+            self._stamp(frame)
+            return frame
+
+    def _stamp(self, frame):
+        """Gán seq/timestamp mới cho frame vừa lấy ra (gọi khi đang giữ lock)."""
+        self._seq += 1
+        frame.seq = self._seq
+        frame.timestamp = time.monotonic()
+        frame.payload = None
+        frame.jpeg = None
+        frame.reduction = 1
+        frame._refs = 1
+        self.in_use += 1
+
+    def _release(self, frame):
+        with self._lock:
+            if frame._refs <= 0:
+                return
+            frame._refs -= 1
+            if frame._refs > 0:
+                return
+            self.in_use -= 1
+            frame.payload = None
+            frame.jpeg = None
+            # Giữ lại buffer nếu pool chưa đầy, nếu không thì để GC thu hồi
+            if len(self._free) < self.max_buffers:
+                self._free.append(frame)
+
+    def clear(self):
+        """Bỏ toàn bộ buffer rảnh (khi đổi độ phân giải)."""
+        with self._lock:
+            self._free.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "allocated": self.allocated,
+                "reused": self.reused,
+                "in_use": self.in_use,
+                "free": len(self._free),
+            }
@@ -0,0 +1,102 @@
+# ==========================================
+# FRAME RING - Vòng đệm các frame full-res gần nhất
+# ==========================================
+"""
+Giữ tham chiếu tới N frame gốc mới nhất (kèm timestamp monotonic) để chụp
+"không trễ": ảnh được chọn theo thời điểm bấm máy dự kiến, không phụ thuộc
+vào việc event loop của UI gọi hàm chụp sớm hay muộn.
+
+Frame vào vòng đệm được retain(), bị đẩy ra thì release() về pool.
+Frame lấy ra cho người gọi đã được retain() thêm, người gọi phải release().
+"""
+
+import threading
+from collections import deque
+
+
+class FrameRing:
+    """Vòng đệm frame có timestamp, an toàn giữa luồng camera và luồng UI."""
+
+    def __init__(self, capacity=10):
+        self.capacity = max(1, int(capacity))
+        self._frames = deque()
+        self._cond = threading.Condition()
+
+        # Thống kê
+        self.pushed = 0
+        self.lookups = 0
+        self.last_offset_ms = 0.0   # Lệch giữa frame được chọn và thời điểm yêu cầu
+
+    def push(self, frame):
+        """Thêm frame mới nhất (luồng camera)."""
+        frame.retain()
+        evicted = []
+        with self._cond:
+            self._frames.append(frame)
+            while len(self._frames) > self.capacity:
+                evicted.append(self._frames.popleft())
+            self.pushed += 1
+            self._cond.notify_all()
+        for old in evicted:
+            old.release()
+
+    def latest(self):
+        """Frame mới nhất (đã retain) hoặc None."""
+        with self._cond:
+            if not self._frames:
+                return None
+            return self._frames[-1].retain()
+
+    def closest(self, timestamp, wait=0.0):
+        """
+        Frame có timestamp gần với `timestamp` nhất (đã retain) hoặc None.
+        Nếu thời điểm yêu cầu còn ở tương lai, chờ tối đa `wait` giây cho frame kế tiếp.
+        """
+        with self._cond:
+            if wait > 0 and (not self._frames or self._frames[-1].timestamp < timestamp):
+                self._cond.wait_for(
+                    lambda: bool(self._frames) and self._frames[-1].timestamp >= timestamp, wait)
+            if not self._frames:
+                return None
+            best = min(self._frames, key=lambda f: abs(f.timestamp - timestamp))
+            self.lookups += 1
+            self.last_offset_ms = (best.timestamp - timestamp) * 1000.0
+            return best.retain()
+
+    def around(self, timestamp, count, wait=0.0):
+        """
+        Tối đa `count` frame gần `timestamp` nhất (đã retain), sắp theo thời gian.
+        Dùng cho chụp liên tiếp (burst). `wait` giống closest().
+        """
+        with self._cond:
+            if wait > 0 and (not self._frames or self._frames[-1].timestamp < timestamp):
+                self._cond.wait_for(
+                    lambda: bool(self._frames) and self._frames[-1].timestamp >= timestamp, wait)
+            nearest = sorted(self._frames, key=lambda f: abs(f.timestamp - timestamp))[:count]
+            nearest.sort(key=lambda f: f.timestamp)
+            return [f.retain() for f in nearest]
+
+    def clear(self):
+        with self._cond:
+            frames = list(self._frames)
+            self._frames.clear()
+            self._cond.notify_all()
+        for frame in frames:
+            frame.release()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._frames)
+
+    def stats(self):
+        with self._cond:
+            span = 0.0
+            if len(self._frames) > 1:
+                span = self._frames[-1].timestamp - self._frames[0].timestamp
+            return {
+                "frames": len(self._frames),
+                "span_ms": round(span * 1000.0, 1),
+                "pushed": self.pushed,
+                "lookups": self.lookups,
+                "last_offset_ms": round(self.last_offset_ms, 1),
+            }
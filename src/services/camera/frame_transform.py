@@ -0,0 +1,91 @@
+# ==========================================
+# FRAME TRANSFORM - Xoay + lật gương gộp thành một phép biến đổi
+# ==========================================
+"""
+Xoay theo layout (0/90/180/270) rồi lật gương ngang vốn cần 2 lần cấp phát
+ảnh full-size (cv2.rotate + cv2.flip). FrameTransform gộp sẵn tổ hợp này:
+
+    xoay   | lật gương           | không lật gương
+    -------+---------------------+------------------
+    0      | flip(1)             | copy
+    90     | transpose           | rotate(CW)
+    180    | flip(0)             | flip(-1)
+    270    | transpose, flip(-1) | rotate(CCW)
+
+apply(src, dst) ghi thẳng vào buffer đích có sẵn. Các buffer trung gian
+(ảnh thu nhỏ, ảnh đã xoay trước khi đổi sang BGRA...) được giữ trong đối tượng
+và chỉ cấp phát lại khi đổi độ phân giải hoặc đổi rotation (tạo transform mới).
+Buffer KHÔNG an toàn giữa nhiều luồng: chỉ luồng camera dùng buffer();
+các luồng khác gọi apply(src) không có dst (cấp phát 1 lần).
+"""
+
+import cv2
+import numpy as np
+
+_OPS = {
+    (0, True): (("flip", 1),),
+    (0, False): (("copy", None),),
+    (90, True): (("transpose", None),),
+    (90, False): (("rotate", cv2.ROTATE_90_CLOCKWISE),),
+    (180, True): (("flip", 0),),
+    (180, False): (("flip", -1),),
+    (270, True): (("transpose", None), ("flip", -1)),
+    (270, False): (("rotate", cv2.ROTATE_90_COUNTERCLOCKWISE),),
+}
+
+
+class FrameTransform:
+    """Phép xoay + lật gương đã biên dịch cho một cấu hình (rotation, mirror)."""
+
+    def __init__(self, rotation=0, mirror=True):
+        rotation = int(rotation or 0) % 360
+        if rotation not in (0, 90, 180, 270):
+            print(f"[FRAME TRANSFORM] Rotation khong hop le: {rotation}, dung 0")
+            rotation = 0
+        self.rotation = rotation
+        self.mirror = bool(mirror)
+        self._ops = _OPS[(rotation, self.mirror)]
+        self._buffers = {}
+
+    @property
+    def swaps_axes(self):
+        """True nếu ảnh đầu ra đổi chiều rộng/cao (xoay 90/270)."""
+        return self.rotation in (90, 270)
+
+    def output_shape(self, shape):
+        if self.swaps_axes:
+            return (shape[1], shape[0]) + tuple(shape[2:])
+        return tuple(shape)
+
+    def buffer(self, tag, shape, dtype=np.uint8):
+        """Buffer trung gian dùng lại giữa các frame (theo tên + shape)."""
+        key = (tag, tuple(shape))
+        buf = self._buffers.get(key)
+        if buf is None or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
+
+    def reset(self):
+        """Bỏ các buffer trung gian (khi đổi độ phân giải)."""
+        self._buffers.clear()
+
+    def apply(self, src, dst=None):
+        """Biến đổi src; ghi vào dst nếu có (đúng output_shape), trả về ảnh kết quả."""
+        if dst is None:
+            dst = np.empty(self.output_shape(src.shape), dtype=src.dtype)
+        for op, arg in self._ops:
+            if op == "flip":
+                # Bước sau của tổ hợp chạy tại chỗ trên dst (cv2.flip hỗ trợ src == dst)
+                cv2.flip(src, arg, dst=dst)
+            elif op == "transpose":
+                cv2.transpose(src, dst=dst)
+            elif op == "rotate":
+                cv2.rotate(src, arg, dst=dst)
+            else:
+                np.copyto(dst, src)
+            src = dst
+        return dst
+
+    def __call__(self, src):
+        return self.apply(src)
@@ -0,0 +1,125 @@
+# ==========================================
+# IDLE GOVERNOR - Giảm tải camera khi không có khách
+# ==========================================
+"""
+Sau N phút không có thao tác chạm/bấm, luồng camera chuyển sang chế độ nghỉ:
+- Chỉ đọc vài frame mỗi giây, không render preview (không BGR2BGRA, không QImage).
+- So sánh một bản thu nhỏ rất nhỏ (ảnh xám ~32x24) giữa các frame liên tiếp,
+  thấy chuyển động thì quay lại tốc độ đầy đủ ngay.
+
+notify_activity() được gọi từ luồng UI, các hàm còn lại chạy ở luồng camera.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# Kích thước ảnh xám dùng để dò chuyển động
+_PROBE_W = 32
+_PROBE_H = 24
+
+
+class IdleGovernor:
+    """Theo dõi thời gian không hoạt động và dò chuyển động khi đang nghỉ."""
+
+    def __init__(self, idle_after_min=5.0, idle_fps=3.0, pixel_threshold=25, motion_ratio=0.02):
+        self.idle_after = max(0.0, float(idle_after_min)) * 60.0   # 0 = tắt chế độ nghỉ
+        self.idle_fps = max(0.5, float(idle_fps))
+        self.pixel_threshold = pixel_threshold   # Chênh lệch mức xám tính là "đổi"
+        self.motion_ratio = motion_ratio         # Tỷ lệ điểm ảnh đổi để tính là có chuyển động
+        self.enabled = True                      # Tắt khi đang trong phiên chụp
+
+        self._last_activity = time.monotonic()
+        self._idle = False
+        self._reference = None
+
+        # Thống kê
+        self.idle_entries = 0
+        self.motion_wakes = 0
+
+    @property
+    def idle(self):
+        return self._idle
+
+    @property
+    def frame_interval(self):
+        """Thời gian nghỉ giữa 2 frame khi đang ở chế độ nghỉ (giây)."""
+        return 1.0 / self.idle_fps
+
+    def configure(self, idle_after_min=None, idle_fps=None):
+        if idle_after_min is not None:
+            self.idle_after = max(0.0, float(idle_after_min)) * 60.0
+        if idle_fps is not None:
+            self.idle_fps = max(0.5, float(idle_fps))
+
+    def notify_activity(self):
+        """Có thao tác của người dùng (luồng UI)."""
+        self._last_activity = time.monotonic()
+
+    def update(self, raw, busy=False):
+        """
+        Cập nhật trạng thái cho frame mới (luồng camera).
+        busy=True (vd: đang quay video) thì luôn chạy tốc độ đầy đủ.
+        Trả về True nếu trạng thái nghỉ vừa thay đổi.
+        """
+        now = time.monotonic()
+        if busy or not self.enabled or self.idle_after <= 0:
+            return self._set_idle(False)
+
+        if not self._idle:
+            if now - self._last_activity >= self.idle_after:
+                self._reference = self._probe(raw)
+                return self._set_idle(True)
+            return False
+
+        if now - self._last_activity < self.idle_after:
+            # Có người chạm màn hình trong lúc nghỉ
+            return self._set_idle(False)
+
+        probe = self._probe(raw)
+        moved = self._has_motion(probe)
+        self._reference = probe
+        if moved:
+            self.motion_wakes += 1
+            # Coi chuyển động như một lần hoạt động để không ngủ lại ngay
+            self._last_activity = now
+            return self._set_idle(False)
+        return False
+
+    def _set_idle(self, idle):
+        if idle == self._idle:
+            return False
+        self._idle = idle
+        if idle:
+            self.idle_entries += 1
+        else:
+            self._reference = None
+        return True
+
+    @staticmethod
+    def _probe(raw):
+        """Ảnh xám ~32x24 lấy mẫu cách quãng (không resize toàn frame)."""
+        h, w = raw.shape[:2]
+        step_y = max(1, h // _PROBE_H)
+        step_x = max(1, w // _PROBE_W)
+        small = np.ascontiguousarray(raw[::step_y, ::step_x])
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        # Làm mờ nhẹ để nhiễu cảm biến không bị tính là chuyển động
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+
+    def _has_motion(self, probe):
+        ref = self._reference
+        if ref is None or ref.shape != probe.shape:
+            return False
+        diff = cv2.absdiff(probe, ref)
+        changed = np.count_nonzero(diff > self.pixel_threshold)
+        return changed >= self.motion_ratio * diff.size
+
+    def stats(self):
+        return {
+            "idle": self._idle,
+            "idle_entries": self.idle_entries,
+            "motion_wakes": self.motion_wakes,
+            "inactive_s": round(time.monotonic() - self._last_activity, 1),
+        }
@@ -0,0 +1,166 @@
+# ==========================================
+# JPEG DECODE POOL - Giải mã JPEG song song cho webcam MJPEG độ phân giải cao
+# ==========================================
+"""
+Ở 1920x1080 MJPG, giải mã tuần tự trên luồng camera không đạt nổi 30 fps trên
+máy kiosk. Luồng camera chỉ lấy JPEG nén (CAP_PROP_FORMAT=-1 hoặc MjpegReader),
+giao cho JpegDecodePool giải mã trên vài luồng (cv2.imdecode nhả GIL).
+
+- Kết quả trả ra ĐÚNG THỨ TỰ chụp.
+- Frame về muộn (frame mới hơn đã giải mã xong trước) bị bỏ, không xếp hàng chờ.
+- Đang giải mã đủ số frame tối đa -> frame mới bị bỏ ngay (không tích độ trễ).
+- Luồng camera lấy chậm hơn tốc độ giải mã -> chỉ giữ vài frame mới nhất.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.services.camera.mjpeg_reader import _REDUCED_FLAGS
+
+
+def _decode(data, flag):
+    t0 = time.perf_counter()
+    if not isinstance(data, np.ndarray):
+        data = np.frombuffer(data, np.uint8)
+    image = cv2.imdecode(data, flag)
+    return image, (time.perf_counter() - t0) * 1000.0
+
+
+class DecodedFrame:
+    """Một JPEG đã giải mã cùng thông tin lúc chụp."""
+
+    __slots__ = ("image", "jpeg", "timestamp", "reduction", "seq")
+
+    def __init__(self, image, jpeg, timestamp, reduction, seq):
+        self.image = image
+        self.jpeg = jpeg
+        self.timestamp = timestamp
+        self.reduction = reduction
+        self.seq = seq
+
+
+class _Job:
+    __slots__ = ("seq", "jpeg", "timestamp", "reduction", "future")
+
+    def __init__(self, seq, jpeg, timestamp, reduction, future):
+        self.seq = seq
+        self.jpeg = jpeg
+        self.timestamp = timestamp
+        self.reduction = reduction
+        self.future = future
+
+
+class JpegDecodePool:
+    """Giải mã JPEG trên ThreadPoolExecutor, trả kết quả theo thứ tự, bỏ frame muộn."""
+
+    def __init__(self, workers=2, max_in_flight=None):
+        self.workers = max(1, int(workers))
+        # Mỗi worker giữ tối đa 2 frame -> độ trễ pipeline chỉ 1-2 frame
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="JpegDecode")
+        self._lock = threading.Lock()
+        self._pending = deque()     # Job đang giải mã, theo thứ tự chụp
+        self._ready = deque()       # Đã giải mã xong, chờ luồng camera lấy
+        self._seq = 0
+
+        # Thống kê
+        self.submitted = 0
+        self.decoded = 0
+        self.busy_dropped = 0       # Bỏ vì đang giải mã đủ số frame tối đa
+        self.reorder_dropped = 0    # Bỏ vì về muộn hơn frame mới hơn
+        self.overflow_dropped = 0   # Bỏ vì luồng camera lấy chậm, hàng chờ đã đủ
+        self.failed = 0
+        self.decode_ms = 0.0        # Trung bình trượt thời gian giải mã 1 frame
+        self.max_decode_ms = 0.0
+
+    def submit(self, jpeg, timestamp, reduction=1):
+        """Giao một JPEG để giải mã. Trả về False nếu bị bỏ do pool đang bận."""
+        with self._lock:
+            if len(self._pending) >= self.max_in_flight:
+                self.busy_dropped += 1
+                return False
+            self._seq += 1
+            flag = _REDUCED_FLAGS.get(reduction, cv2.IMREAD_COLOR)
+            future = self._executor.submit(_decode, jpeg, flag)
+            self._pending.append(_Job(self._seq, jpeg, timestamp, reduction, future))
+            self.submitted += 1
+            return True
+
+    def _collect(self):
+        """Chuyển các job đã xong sang _ready theo thứ tự; job chưa xong nằm trước job đã xong bị bỏ."""
+        last_done = -1
+        for i, job in enumerate(self._pending):
+            if job.future.done():
+                last_done = i
+        for _ in range(last_done + 1):
+            job = self._pending.popleft()
+            if not job.future.done():
+                # Frame mới hơn đã xong trước -> frame này về muộn, bỏ
+                job.future.cancel()
+                self.reorder_dropped += 1
+                continue
+            try:
+                image, ms = job.future.result()
+            except Exception as e:
+                print(f"[JPEG DECODE] Loi giai ma: {e}")
+                image, ms = None, 0.0
+            if image is None:
+                self.failed += 1
+                continue
+            self.decoded += 1
+            self.decode_ms = ms if self.decoded == 1 else 0.9 * self.decode_ms + 0.1 * ms
+            self.max_decode_ms = max(self.max_decode_ms, ms)
+            self._ready.append(DecodedFrame(image, job.jpeg, job.timestamp, job.reduction, job.seq))
+        # Luồng camera lấy chậm hơn tốc độ giải mã -> chỉ giữ vài frame mới nhất
+        while len(self._ready) > self.workers:
+            self._ready.popleft()
+            self.overflow_dropped += 1
+
+    def get(self, wait=0.0):
+        """Frame kế tiếp theo thứ tự (DecodedFrame) hoặc None. wait: chờ frame đầu hàng tối đa (giây)."""
+        with self._lock:
+            self._collect()
+            if self._ready:
+                return self._ready.popleft()
+            head = self._pending[0] if self._pending else None
+        if head is None or wait <= 0:
+            return None
+        try:
+            head.future.result(wait)
+        except Exception:
+            pass
+        with self._lock:
+            self._collect()
+            return self._ready.popleft() if self._ready else None
+
+    def reset(self):
+        """Bỏ mọi frame đang chờ (đổi nguồn / tạm dừng)."""
+        with self._lock:
+            for job in self._pending:
+                job.future.cancel()
+            self._pending.clear()
+            self._ready.clear()
+
+    def shutdown(self):
+        self.reset()
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": len(self._pending),
+                "submitted": self.submitted,
+                "decoded": self.decoded,
+                "busy_dropped": self.busy_dropped,
+                "reorder_dropped": self.reorder_dropped,
+                "overflow_dropped": self.overflow_dropped,
+                "failed": self.failed,
+                "decode_ms": round(self.decode_ms, 2),
+                "max_decode_ms": round(self.max_decode_ms, 2),
+            }
@@ -0,0 +1,331 @@
+# ==========================================
+# MJPEG READER - Đọc live view MJPEG qua HTTP (digiCamControl)
+# ==========================================
+"""
+Client multipart MJPEG tự viết, thay cho cv2.VideoCapture(url).
+- Giữ một kết nối HTTP lâu dài, tự tách các part theo boundary + Content-Length
+  (part xong ngay khi đủ byte, không chờ boundary kế tiếp).
+- Chỉ giữ lại JPEG hoàn chỉnh MỚI NHẤT, các part cũ bị bỏ mà không giải mã.
+- Chỉ giải mã khi có người đọc, và có thể giải mã thu nhỏ (IMREAD_REDUCED_COLOR_2/4/8)
+  khi chỉ cần preview.
+
+Giao diện giống cv2.VideoCapture (isOpened / read / release) để CameraThread dùng trực tiếp.
+"""
+
+import threading
+import time
+import http.client
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+# Hệ số thu nhỏ khi giải mã -> flag của OpenCV
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+
+
+class MjpegReader:
+    """Đọc stream multipart/x-mixed-replace, chỉ giải mã frame mới nhất."""
+
+    name = "mjpeg"
+    compressed = True       # Luôn có JPEG nén (giải mã được ở JpegDecodePool)
+
+    def __init__(self, url, reduction=1, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self.reduction = reduction if reduction in _REDUCED_FLAGS else 1
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._opened = False
+        self._conn = None
+        self._response = None
+
+        # JPEG mới nhất (bytes) + số thứ tự
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._jpeg_time = 0.0
+        self._read_seq = 0
+        self.last_jpeg = None
+        self.last_jpeg_time = 0.0
+
+        # Thống kê
+        self.parts_received = 0
+        self.parts_skipped = 0    # Part bị thay thế trước khi kịp giải mã
+        self.parts_dropped = 0    # Part hỏng / cụt (không có EOI), không bao giờ publish
+        self.decoded = 0
+        self.decode_ms = 0.0
+
+    # --- Kết nối ---
+    def open(self):
+        """Mở kết nối (đồng bộ) và khởi động luồng đọc. Trả về True nếu thành công."""
+        self.release()
+        try:
+            self._connect()
+        except Exception as e:
+            print(f"[MJPEG] Khong ket noi duoc {self.url}: {e}")
+            return False
+        self._running = True
+        self._opened = True
+        self._thread = threading.Thread(target=self._reader_loop, name="MjpegReader", daemon=True)
+        self._thread.start()
+        return True
+
+    def _connect(self):
+        parts = urlsplit(self.url)
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(parts.hostname, parts.port, timeout=self.timeout)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn.request("GET", path, headers={"Connection": "keep-alive"})
+        response = conn.getresponse()
+        if response.status != 200:
+            conn.close()
+            raise IOError(f"HTTP {response.status}")
+        self._conn = conn
+        self._response = response
+        self._boundary = self._parse_boundary(response.getheader("Content-Type", ""))
+
+    @staticmethod
+    def _parse_boundary(content_type):
+        """Lấy boundary từ header Content-Type (None nếu không có)."""
+        for param in content_type.split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "boundary" and value:
+                value = value.strip('"')
+                if not value.startswith("--"):
+                    value = "--" + value
+                return value.encode("latin-1")
+        return None
+
+    def _close_connection(self):
+        try:
+            if self._response is not None:
+                self._response.close()
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._response = None
+        self._conn = None
+
+    # --- Luồng đọc ---
+    def _reader_loop(self):
+        while self._running:
+            try:
+                if self._response is None:
+                    self._connect()
+                self._pump(self._response)
+            except Exception as e:
+                if self._running:
+                    print(f"[MJPEG] Mat ket noi, thu lai: {e}")
+            self._close_connection()
+            if not self._running:
+                break
+            # Đợi rồi kết nối lại; nếu vẫn lỗi thì báo đóng để CameraThread mở lại
+            time.sleep(1)
+            try:
+                self._connect()
+            except Exception:
+                self._opened = False
+                break
+
+    def _pump(self, response):
+        """Đọc dữ liệu liên tục, tách từng JPEG hoàn chỉnh."""
+        buf = bytearray()
+        while self._running:
+            chunk = response.read1(65536)
+            if not chunk:
+                raise IOError("Stream ket thuc")
+            buf += chunk
+            jpeg, consumed = self._extract_latest(buf)
+            if consumed:
+                del buf[:consumed]
+            if jpeg is not None:
+                self._publish(jpeg)
+            if len(buf) > 16 * 1024 * 1024:
+                # Dữ liệu rác quá lớn -> bỏ để không phình bộ nhớ
+                buf.clear()
+
+    def _extract_latest(self, buf):
+        """
+        Tìm JPEG hoàn chỉnh cuối cùng trong buf.
+        Trả về (jpeg_bytes hoặc None, số byte đã dùng).
+        Các JPEG cũ hơn trong cùng buffer được bỏ qua mà không giải mã.
+        """
+        latest = None
+        consumed = 0
+        while True:
+            part = self._next_part(buf, consumed)
+            if part is None:
+                break
+            jpeg, consumed = part
+            if jpeg is None:
+                continue
+            if latest is not None:
+                self.parts_skipped += 1
+            latest = jpeg
+            self.parts_received += 1
+        if consumed == 0:
+            # Chưa có part nào xong: bỏ phần rác trước boundary / SOI đầu tiên,
+            # giữ vài byte cuối phòng khi marker bị cắt đôi
+            marker = self._boundary if self._boundary is not None else _SOI
+            start = buf.find(marker)
+            consumed = max(0, len(buf) - len(marker) + 1) if start < 0 else start
+        return latest, consumed
+
+    def _next_part(self, buf, pos):
+        """
+        Part kế tiếp từ vị trí pos: (jpeg hoặc None nếu part hỏng, vị trí kết thúc),
+        hoặc None nếu chưa đủ dữ liệu.
+        """
+        if self._boundary is None:
+            # Không có boundary: JPEG là đoạn SOI..EOI
+            start = buf.find(_SOI, pos)
+            if start < 0:
+                return None
+            eoi = buf.find(_EOI, start + 2)
+            return (bytes(buf[start:eoi + 2]), eoi + 2) if eoi >= 0 else None
+
+        mark = buf.find(self._boundary, pos)
+        if mark < 0:
+            return None
+        header_end = buf.find(b"\r\n\r\n", mark)
+        if header_end < 0:
+            return None
+        body = header_end + 4
+        length = self._content_length(bytes(buf[mark + len(self._boundary):header_end]))
+
+        if length is not None:
+            # Có Content-Length: part xong ngay khi đủ byte, không chờ boundary kế tiếp
+            end = body + length
+            if len(buf) < end:
+                return None
+            start = buf.find(_SOI, body, end)
+            eoi = buf.rfind(_EOI, body, end)
+            if start < 0 or eoi < start + 2:
+                self.parts_dropped += 1
+                return None, end
+            return bytes(buf[start:eoi + 2]), end
+
+        # Không có độ dài: kết thúc ở EOI đầu tiên sau SOI, ngay khi EOI đã về
+        nxt = buf.find(self._boundary, body)
+        start = buf.find(_SOI, body, nxt if nxt >= 0 else len(buf))
+        eoi = buf.find(_EOI, start + 2, nxt if nxt >= 0 else len(buf)) if start >= 0 else -1
+        if eoi >= 0:
+            return bytes(buf[start:eoi + 2]), eoi + 2
+        if nxt >= 0:
+            # Boundary kế tiếp đã tới mà part không có EOI -> part cụt, bỏ
+            self.parts_dropped += 1
+            return None, nxt
+        return None
+
+    @staticmethod
+    def _content_length(headers):
+        """Giá trị Content-Length trong khối header của part (None nếu không có)."""
+        for line in headers.split(b"\r\n"):
+            key, _, value = line.partition(b":")
+            if key.strip().lower() == b"content-length":
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return None
+        return None
+
+    def _publish(self, jpeg):
+        with self._cond:
+            if self._jpeg is not None and self._jpeg_seq > self._read_seq:
+                # Part trước chưa ai đọc -> bị thay thế, không giải mã
+                self.parts_skipped += 1
+            self._jpeg = jpeg
+            self._jpeg_seq += 1
+            self._jpeg_time = time.monotonic()
+            self._cond.notify_all()
+
+    # --- Giao diện giống cv2.VideoCapture ---
+    def isOpened(self):
+        return self._opened
+
+    def read_jpeg(self, wait=1.0):
+        """Lấy JPEG mới nhất chưa đọc (bytes) mà không giải mã. None nếu hết thời gian chờ."""
+        with self._cond:
+            if self._jpeg_seq <= self._read_seq:
+                self._cond.wait_for(lambda: self._jpeg_seq > self._read_seq or not self._opened, wait)
+            if self._jpeg_seq <= self._read_seq:
+                return None
+            self._read_seq = self._jpeg_seq
+            self.last_jpeg = self._jpeg
+            self.last_jpeg_time = self._jpeg_time
+            return self._jpeg
+
+    def read(self, image=None):
+        """Giải mã JPEG mới nhất (theo hệ số reduction). Trả về (ret, frame)."""
+        jpeg = self.read_jpeg()
+        if jpeg is None:
+            return False, None
+        frame = self.decode(jpeg, self.reduction)
+        return frame is not None, frame
+
+    def decode(self, jpeg, reduction=1):
+        """Giải mã một JPEG với hệ số thu nhỏ cho trước."""
+        t0 = time.perf_counter()
+        flag = _REDUCED_FLAGS.get(reduction, cv2.IMREAD_COLOR)
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), flag)
+        self.decode_ms = (time.perf_counter() - t0) * 1000.0
+        self.decoded += 1
+        return frame
+
+    def set_reduction(self, reduction):
+        """Đổi hệ số giải mã thu nhỏ (1, 2, 4, 8)."""
+        if reduction in _REDUCED_FLAGS:
+            self.reduction = reduction
+
+    def set(self, prop, value):
+        # Stream MJPEG không cho đổi thuộc tính phía client
+        return False
+
+    def get(self, prop):
+        return 0.0
+
+    def configure(self, width, height, fourcc=None):
+        # Độ phân giải do máy ảnh quyết định
+        return False
+
+    def flush(self):
+        # Chỉ giữ JPEG mới nhất -> không có frame cũ để bỏ
+        pass
+
+    def read_compressed(self):
+        """JPEG mới nhất chưa đọc + thời điểm về tới máy."""
+        jpeg = self.read_jpeg()
+        return jpeg, self.last_jpeg_time
+
+    def release(self):
+        self._running = False
+        self._opened = False
+        self._close_connection()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def stats(self):
+        return {
+            "parts_received": self.parts_received,
+            "parts_skipped": self.parts_skipped,
+            "parts_dropped": self.parts_dropped,
+            "decoded": self.decoded,
+            "decode_ms": round(self.decode_ms, 2),
+            "reduction": self.reduction,
+        }
@@ -0,0 +1,408 @@
+# ==========================================
+# CAMERA SOURCES - Các nguồn frame có thể thay thế cho nhau
+# ==========================================
+"""
+Mỗi nguồn có giao diện giống cv2.VideoCapture:
+    open() -> bool, isOpened(), read(image=None) -> (ret, frame), set(), get(), release()
+    configure(width, height, fourcc) -> bool : đổi độ phân giải/FOURCC trên thiết bị đang mở
+                                               (False = phải mở lại nguồn)
+    flush()                                  : bỏ frame cũ còn đọng sau khi tạm dừng đọc
+    read_compressed() -> (jpeg, timestamp)   : JPEG nén chưa giải mã (chỉ khi compressed = True)
+
+Các nguồn hỗ trợ (khóa "source" trong camera_settings.json):
+- "opencv"    : Webcam/thiết bị qua OpenCV (index, DirectShow, MJPG compat)
+- "mjpeg"     : Live view MJPEG qua HTTP (digiCamControl) - xem MjpegReader
+- "replay"    : Phát lại thư mục ảnh hoặc file video theo đúng timestamp gốc
+- "synthetic" : Tự sinh hình ảnh (benchmark / test trên máy không có camera)
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.services.camera.mjpeg_reader import MjpegReader
+
+SOURCE_TYPES = ("opencv", "mjpeg", "replay", "synthetic")
+
+
+class CameraSource:
+    """Lớp cơ sở cho một nguồn frame."""
+
+    name = "base"
+    compressed = False      # True nếu đọc được JPEG nén (giải mã ở JpegDecodePool)
+
+    def open(self):
+        raise NotImplementedError
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def read(self, image=None):
+        raise NotImplementedError
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        return 0.0
+
+    def configure(self, width, height, fourcc=None):
+        return False
+
+    def flush(self):
+        pass
+
+    def read_compressed(self):
+        return None, 0.0
+
+    def release(self):
+        pass
+
+
+class OpenCVSource(CameraSource):
+    """Camera thật qua cv2.VideoCapture (ưu tiên DirectShow trên Windows)."""
+
+    name = "opencv"
+
+    def __init__(self, index=0, width=1280, height=720, use_dshow=True, use_compat=False, fourcc=None,
+                 compressed=False):
+        self.index = int(index)
+        self.width = width
+        self.height = height
+        self.use_dshow = use_dshow
+        self.use_compat = use_compat
+        self.fourcc = fourcc        # vd: "MJPG", "YUY2" (None = mặc định của driver)
+        self.want_compressed = compressed
+        self.compressed = False
+        self.cap = None
+
+    def open(self):
+        if self.use_dshow:
+            self.cap = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+        else:
+            self.cap = cv2.VideoCapture(self.index)
+
+        if not self.cap.isOpened() and self.use_dshow:
+            self.cap = cv2.VideoCapture(self.index)
+
+        if not self.cap.isOpened():
+            return False
+
+        # Đợi một chút để driver ổn định
+        time.sleep(0.3)
+        try:
+            if self.use_compat:
+                # MJPG mode
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                print(f"[THREAD CAMERA] Mode: COMPAT (MJPG 640x480)")
+            else:
+                print(f"[THREAD CAMERA] Setting resolution to {self.width}x{self.height}")
+                self._set_format(self.width, self.height, self.fourcc)
+        except Exception as se:
+            print(f"[THREAD CAMERA] WARNING: Could not set camera properties: {se}")
+        if self.want_compressed:
+            self._enable_compressed()
+        return True
+
+    def _enable_compressed(self):
+        """Xin backend trả JPEG thô (CAP_PROP_FORMAT=-1), không được thì đọc như thường."""
+        self.compressed = False
+        try:
+            if not self.fourcc:
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            if self.cap.set(cv2.CAP_PROP_FORMAT, -1) and self.cap.get(cv2.CAP_PROP_FORMAT) == -1:
+                self.compressed = True
+                print("[THREAD CAMERA] Doc JPEG nen, giai ma song song")
+        except Exception as e:
+            print(f"[THREAD CAMERA] Backend khong ho tro doc JPEG nen: {e}")
+        if not self.compressed:
+            print("[THREAD CAMERA] Backend khong tra JPEG nen, giai ma tren luong camera")
+
+    def _set_format(self, width, height, fourcc):
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def configure(self, width, height, fourcc=None):
+        """Đổi độ phân giải/FOURCC ngay trên thiết bị đang mở (không mở lại, không chờ driver)."""
+        if self.use_compat or not self.isOpened():
+            return False
+        try:
+            self._set_format(width, height, fourcc)
+        except Exception as e:
+            print(f"[THREAD CAMERA] Khong doi duoc dinh dang tren thiet bi dang mo: {e}")
+            return False
+        # Driver có thể từ chối -> chỉ coi là thành công khi đọc lại đúng kích thước
+        if (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))) != (width, height):
+            return False
+        self.width, self.height, self.fourcc = width, height, fourcc
+        return True
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self, image=None):
+        if image is not None:
+            return self.cap.read(image)
+        return self.cap.read()
+
+    def flush(self, max_frames=5):
+        """
+        Driver vẫn xếp hàng frame trong lúc không đọc -> grab() (không giải mã) bỏ các
+        frame cũ cho tới khi grab phải chờ frame mới (hàng đợi đã rỗng).
+        """
+        for _ in range(max_frames):
+            t0 = time.monotonic()
+            if not self.cap.grab() or time.monotonic() - t0 > 0.01:
+                break
+
+    def read_compressed(self):
+        """JPEG nén (mảng uint8 1 chiều) + thời điểm đọc xong."""
+        ok, buf = self.cap.read()
+        timestamp = time.monotonic()
+        if not ok or buf is None:
+            return None, timestamp
+        if buf.ndim == 3:
+            # Backend vẫn trả ảnh đã giải mã (vd: driver đổi định dạng) -> thôi đọc JPEG nén
+            self.compressed = False
+            return None, timestamp
+        return buf.reshape(-1), timestamp
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value) if self.cap is not None else False
+
+    def get(self, prop):
+        return self.cap.get(prop) if self.cap is not None else 0.0
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ReplaySource(CameraSource):
+    """
+    Phát lại một phiên đã ghi:
+    - File video: dùng CAP_PROP_POS_MSEC làm timestamp gốc.
+    - Thư mục ảnh: sắp xếp theo tên; timestamp lấy từ timestamps.txt
+      (mỗi dòng 1 số giây) nếu có, nếu không thì chia đều theo fps.
+    Frame được trả về đúng nhịp thời gian gốc, tự lặp lại khi hết.
+    """
+
+    name = "replay"
+
+    def __init__(self, path, fps=30.0, loop=True):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self._video = None
+        self._files = []
+        self._timestamps = []
+        self._index = 0
+        self._opened = False
+        self._start = 0.0
+        self._offset = 0.0
+        self._last_ts = 0.0
+
+    def open(self):
+        if not self.path or not os.path.exists(self.path):
+            print(f"[REPLAY] Khong tim thay: {self.path}")
+            return False
+        if os.path.isdir(self.path):
+            self._files = sorted(
+                os.path.join(self.path, f) for f in os.listdir(self.path)
+                if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))
+            )
+            if not self._files:
+                return False
+            self._timestamps = self._load_timestamps(len(self._files))
+        else:
+            self._video = cv2.VideoCapture(self.path)
+            if not self._video.isOpened():
+                return False
+            self.fps = self._video.get(cv2.CAP_PROP_FPS) or self.fps
+        self._index = 0
+        self._start = time.monotonic()
+        self._offset = 0.0
+        self._opened = True
+        return True
+
+    def _load_timestamps(self, count):
+        """Đọc timestamps.txt (giây), thiếu thì chia đều theo fps."""
+        ts_file = os.path.join(self.path, "timestamps.txt")
+        stamps = []
+        if os.path.exists(ts_file):
+            try:
+                with open(ts_file, 'r') as f:
+                    stamps = [float(line) for line in f if line.strip()]
+            except ValueError:
+                stamps = []
+        if len(stamps) < count:
+            stamps = [i / self.fps for i in range(count)]
+        first = stamps[0]
+        return [t - first for t in stamps[:count]]
+
+    def isOpened(self):
+        return self._opened
+
+    def _next(self):
+        """Frame kế tiếp + timestamp gốc (giây). Trả về (None, None) khi hết."""
+        if self._video is not None:
+            ok, frame = self._video.read()
+            if not ok:
+                return None, None
+            return frame, self._video.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if self._index >= len(self._files):
+            return None, None
+        frame = cv2.imread(self._files[self._index])
+        ts = self._timestamps[self._index]
+        self._index += 1
+        return frame, ts
+
+    def flush(self):
+        # Phát tiếp từ frame kế tiếp ngay bây giờ (không dồn frame bù thời gian tạm dừng)
+        self._start = time.monotonic() - self._offset - self._last_ts
+
+    def _rewind(self, last_ts):
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._index = 0
+        # Lần lặp sau bắt đầu ngay sau frame cuối cùng
+        self._offset += last_ts + 1.0 / self.fps
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        frame, ts = self._next()
+        if frame is None:
+            if not self.loop:
+                self._opened = False
+                return False, None
+            self._rewind(self._last_ts)
+            frame, ts = self._next()
+            if frame is None:
+                return False, None
+        self._last_ts = ts
+
+        # Chờ đến đúng thời điểm gốc của frame
+        delay = self._start + self._offset + ts - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if image is not None and image.shape == frame.shape:
+            image[:] = frame
+            return True, image
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        self._opened = False
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+
+class SyntheticSource(CameraSource):
+    """Sinh frame giả lập: nền gradient + khối di chuyển + số thứ tự frame."""
+
+    name = "synthetic"
+
+    def __init__(self, width=1280, height=720, fps=30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._opened = False
+        self._count = 0
+        self._background = None
+        self._next_time = 0.0
+
+    def open(self):
+        # Nền được tính 1 lần, mỗi frame chỉ copy rồi vẽ phần động lên
+        x = np.linspace(0, 255, self.width, dtype=np.uint8)
+        y = np.linspace(0, 255, self.height, dtype=np.uint8)
+        bg = np.empty((self.height, self.width, 3), np.uint8)
+        bg[:, :, 0] = x[None, :]
+        bg[:, :, 1] = y[:, None]
+        bg[:, :, 2] = 128
+        self._background = bg
+        self._count = 0
+        self._next_time = time.monotonic()
+        self._opened = True
+        return True
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        # Giữ đúng nhịp fps
+        delay = self._next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_time = max(self._next_time + 1.0 / self.fps, time.monotonic())
+
+        if image is None or image.shape != self._background.shape:
+            image = np.empty_like(self._background)
+        np.copyto(image, self._background)
+
+        size = min(self.width, self.height) // 4
+        span = max(1, self.width - size)
+        x = (self._count * 8) % (2 * span)
+        x = x if x < span else 2 * span - x
+        y = (self.height - size) // 2
+        cv2.rectangle(image, (x, y), (x + size, y + size), (255, 255, 255), -1)
+        cv2.putText(image, f"#{self._count}", (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+        self._count += 1
+        return True, image
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def configure(self, width, height, fourcc=None):
+        if not self._opened:
+            return False
+        self.width, self.height = width, height
+        return self.open()
+
+    def release(self):
+        self._opened = False
+
+
+def is_url(camera_index):
+    return isinstance(camera_index, str) and camera_index.startswith("http")
+
+
+def create_source(camera_index=0, width=1280, height=720, use_dshow=True, use_compat=False,
+                  source=None, source_path=None, fourcc=None, compressed=False):
+    """
+    Tạo nguồn frame theo cấu hình.
+    source=None: tự chọn theo camera_index (URL http -> mjpeg, còn lại -> opencv).
+    compressed: webcam OpenCV trả JPEG nén để giải mã song song (JpegDecodePool).
+    """
+    if not source:
+        source = "mjpeg" if is_url(camera_index) else "opencv"
+
+    if source == "replay":
+        return ReplaySource(source_path)
+    if source == "synthetic":
+        return SyntheticSource(width, height)
+    if source == "mjpeg":
+        return MjpegReader(source_path if source_path else camera_index)
+    if source == "opencv":
+        return OpenCVSource(camera_index, width, height, use_dshow, use_compat, fourcc, compressed)
+    raise ValueError(f"Nguon camera khong hop le: {source}")
@@ -0,0 +1,357 @@
+# ==========================================
+# VIDEO RECORDER - Ghi video ở luồng riêng
+# ==========================================
+"""
+Luồng camera chỉ đẩy tham chiếu frame gốc (đã retain) vào một hàng đợi có giới hạn,
+việc resize + xoay/lật + encode chạy ở luồng ghi riêng. Encoder có chậm thì
+preview và ảnh chụp cũng không bị ảnh hưởng.
+
+Chính sách khi hàng đợi đầy: bỏ frame CŨ NHẤT (đếm vào `dropped`).
+
+Video luôn có tốc độ khung hình cố định (CFR): mỗi frame được đặt vào ô thời gian
+theo timestamp lúc chụp. Ô bị trống (camera chậm / frame bị bỏ) thì lặp lại frame
+trước, hai frame rơi vào cùng một ô thì bỏ frame sau. Nhờ vậy video phát đúng tốc độ
+thật dù camera giao frame nhanh chậm thất thường.
+stop() không chặn: luồng ghi tự xả hết hàng đợi rồi đóng file.
+Nơi cần dùng file (vd: upload) gọi wait_for_recording(path) ở luồng nền.
+
+Chế độ passthrough (nguồn MJPEG): JPEG gốc của camera được ghi thẳng vào file AVI
+(không giải mã, không xoay/lật, không encode lại). Khi dừng quay, file AVI được
+chuyển sang mp4 (resize + xoay/lật) ở luồng ghi, ngoài phiên chụp.
+
+Chế độ cắt đoạn (segment_seconds + segment_sink): video được chia thành các file
+ngắn <tên>_000.mp4, <tên>_001.mp4... Mỗi đoạn vừa đóng được giao cho segment_sink
+(vd: SegmentUploader) để upload ngay trong lúc vẫn đang quay.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+
+import cv2
+
+from src.services.camera.avi_writer import MjpegAviWriter, jpeg_size
+from src.services.camera.encoders import create_encoder, transcode_to_mp4
+
+# Các file đang được ghi: path -> Event (set khi file đã đóng xong)
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def wait_for_recording(path, timeout=120.0):
+    """Chờ file video `path` ghi xong. Trả về True nếu file đã sẵn sàng (hoặc không đang ghi)."""
+    with _pending_lock:
+        done = _pending.get(path)
+    if done is None:
+        return True
+    return done.wait(timeout)
+
+
+class VideoRecorder:
+    """Luồng ghi video với hàng đợi frame có giới hạn."""
+
+    def __init__(self, output_path, width=1280, height=720, fps=20.0,
+                 transform=None, rotation=0, max_queue=8, encoder_options=None, passthrough=False,
+                 segment_seconds=None, segment_sink=None, mirror=True):
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.transform = transform     # Hàm xoay/lật frame (sau khi resize)
+        self.rotation = rotation       # Để biết kích thước trước khi xoay
+        self.mirror = mirror           # Lật gương khi chuyển mã bằng ffmpeg (khớp transform)
+        self.max_queue = max(1, int(max_queue))
+        # encoder / crf / bitrate / preset / ffmpeg_path (xem encoders.create_encoder)
+        self.encoder_options = encoder_options or {}
+        self.passthrough = passthrough
+        # Cắt đoạn: segment_sink cần có add_segment(index, path, prepare) và close()
+        self.segment_sink = segment_sink
+        self.segment_frames = 0
+        if segment_sink is not None and segment_seconds:
+            self.segment_frames = max(1, int(round(segment_seconds * fps)))
+        self._segment_index = 0
+        self._writer_path = None
+        self._writer_frames = 0     # Số ô đã ghi vào file hiện tại
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._writer = None
+        self.encoder_name = None
+        self._done = threading.Event()
+
+        # Dòng thời gian CFR
+        self._first_ts = None       # Timestamp của frame đầu tiên (ô 0)
+        self._last_ts = None
+        self._stop_ts = None        # Thời điểm gọi stop() -> video kéo dài tới đây
+        self._next_slot = 0         # Ô tiếp theo cần ghi = số frame đã ghi ra file
+        self._last_image = None     # Frame đã xử lý gần nhất (để lặp lại)
+
+        # Thống kê
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0            # Bỏ vì hàng đợi đầy
+        self.received = 0           # Frame luồng ghi đã nhận
+        self.duplicated = 0         # Frame lặp lại để lấp ô trống
+        self.cfr_dropped = 0        # Frame bỏ vì trùng ô thời gian
+        self.no_jpeg = 0            # Passthrough: frame không có JPEG gốc (bỏ qua)
+        self.transcode_ms = 0.0
+        self.segments = 0
+        self.max_depth = 0
+        self.encode_ms = 0.0        # Trung bình trượt thời gian xử lý 1 frame
+        self.max_encode_ms = 0.0
+
+    def start(self):
+        """Mở encoder và khởi động luồng ghi. Trả về True nếu thành công."""
+        if self.passthrough:
+            # File AVI được mở khi có JPEG đầu tiên (cần kích thước gốc của stream)
+            self.encoder_name = MjpegAviWriter.name
+        else:
+            if not self._open_writer():
+                print(f"[VIDEO RECORDER] Khong mo duoc encoder: {self.output_path}")
+                return False
+            self.encoder_name = self._writer.name
+            # Encoder có thể chỉnh kích thước (vd: H.264 cần số chẵn)
+            self.width, self.height = self._writer.width, self._writer.height
+        with _pending_lock:
+            _pending[self.output_path] = self._done
+        self._thread = threading.Thread(target=self._run, name="VideoRecorder", daemon=True)
+        self._thread.start()
+        return True
+
+    def submit(self, frame):
+        """Đưa frame vào hàng đợi (luồng camera). Frame được retain tới khi ghi xong."""
+        if self._stopping:
+            return
+        frame.retain()
+        dropped = None
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                dropped = self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(frame)
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify()
+        if dropped is not None:
+            dropped.release()
+
+    def stop(self):
+        """Yêu cầu dừng: không chặn, luồng ghi xả hết hàng đợi rồi đóng file."""
+        with self._cond:
+            self._stopping = True
+            self._stop_ts = time.monotonic()
+            self._cond.notify()
+
+    def wait(self, timeout=None):
+        """Chờ luồng ghi kết thúc (chỉ dùng ở luồng nền hoặc khi thoát ứng dụng)."""
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._queue or self._stopping)
+                    if not self._queue:
+                        break
+                    frame = self._queue.popleft()
+                try:
+                    self._encode(frame)
+                except Exception as e:
+                    print(f"[VIDEO RECORDER] Loi ghi frame: {e}")
+                finally:
+                    frame.release()
+            self._pad_until(self._stop_ts)
+        finally:
+            self._close()
+
+    def _encoder_kwargs(self):
+        return {k: v for k, v in self.encoder_options.items() if k != "passthrough"}
+
+    def _slot(self, timestamp):
+        return int(round((timestamp - self._first_ts) * self.fps))
+
+    def _encode(self, frame):
+        """Đặt frame vào dòng thời gian CFR theo timestamp rồi ghi."""
+        if self.passthrough and frame.jpeg is None:
+            self.no_jpeg += 1
+            return
+        self.received += 1
+        if self._first_ts is None:
+            self._first_ts = frame.timestamp
+        self._last_ts = frame.timestamp
+
+        slot = self._slot(frame.timestamp)
+        if slot < self._next_slot:
+            # Ô thời gian này đã có frame -> bỏ
+            self.cfr_dropped += 1
+            return
+
+        t0 = time.perf_counter()
+        if self.passthrough:
+            data = frame.jpeg
+        else:
+            # Resize trước rồi mới xoay/lật (xoay 90/270 thì đổi chiều)
+            data = frame.array
+            size = self._pre_rotation_size()
+            if (data.shape[1], data.shape[0]) != size:
+                data = cv2.resize(data, size, interpolation=cv2.INTER_AREA)
+            if self.transform is not None:
+                data = self.transform(data)
+
+        # Lấp các ô trống trước đó bằng frame gần nhất
+        self._pad_to_slot(slot)
+        if not self._write_slot(data):
+            return
+        self._last_image = data
+        self.written += 1
+
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.encode_ms = ms if self.written == 1 else 0.9 * self.encode_ms + 0.1 * ms
+        self.max_encode_ms = max(self.max_encode_ms, ms)
+
+    def _pre_rotation_size(self):
+        if self.rotation in (90, 270):
+            return (self.height, self.width)
+        return (self.width, self.height)
+
+    def _file_path(self):
+        """Đường dẫn file đang ghi (đoạn hiện tại, hoặc AVI tạm khi passthrough)."""
+        base, ext = os.path.splitext(self.output_path)
+        if self.passthrough:
+            ext = ".avi"
+        if self.segment_frames:
+            return f"{base}_{self._segment_index:03d}{ext}"
+        return base + ext
+
+    def _open_writer(self, jpeg=None):
+        path = self._file_path()
+        if self.passthrough:
+            size = jpeg_size(jpeg) if jpeg is not None else None
+            if size is None:
+                self.no_jpeg += 1
+                return False
+            writer = MjpegAviWriter(path, size[0], size[1], self.fps)
+            if not writer.open():
+                return False
+        else:
+            writer = create_encoder(path, self.width, self.height, self.fps, **self._encoder_kwargs())
+            if writer is None:
+                return False
+        self._writer = writer
+        self._writer_path = path
+        self._writer_frames = 0
+        return True
+
+    def _write_slot(self, data, duplicate=False):
+        """Ghi một ô thời gian (tự sang đoạn mới khi đoạn hiện tại đã đủ dài)."""
+        if self.segment_frames and self._writer_frames >= self.segment_frames:
+            self._finish_segment()
+        if self._writer is None and not self._open_writer(data if self.passthrough else None):
+            return False
+        if not self.passthrough:
+            self._writer.write(data)
+        elif duplicate and self._writer_frames > 0:
+            self._writer.write_duplicate()
+        else:
+            # Đầu đoạn mới thì frame lặp lại phải được ghi đầy đủ
+            self._writer.write_jpeg(data)
+        self._writer_frames += 1
+        self._next_slot += 1
+        return True
+
+    def _pad_to_slot(self, slot):
+        """Lặp lại frame trước cho tới ô `slot` (không gồm ô đó)."""
+        if self._last_image is None:
+            # Chưa có frame nào: frame đầu tiên luôn ở ô 0
+            self._next_slot = max(self._next_slot, slot)
+            return
+        while self._next_slot < slot:
+            if not self._write_slot(self._last_image, duplicate=True):
+                break
+            self.duplicated += 1
+
+    def _pad_until(self, timestamp):
+        """Kéo dài video tới thời điểm dừng quay (frame cuối giữ nguyên)."""
+        if timestamp is None or self._first_ts is None or self._writer is None:
+            return
+        self._pad_to_slot(self._slot(timestamp))
+
+    def _finish_segment(self):
+        """Đóng đoạn hiện tại và giao cho segment_sink."""
+        self._writer.release()
+        self._writer = None
+        path = self._writer_path
+        index = self._segment_index
+        self._segment_index += 1
+        self.segments += 1
+        prepare = None
+        if self.passthrough:
+            # Chuyển AVI -> mp4 ở luồng upload, không chiếm thời gian của luồng ghi
+            mp4_path = os.path.splitext(path)[0] + os.path.splitext(self.output_path)[1]
+            prepare = partial(self._transcode, path, mp4_path)
+        self.segment_sink.add_segment(index, path, prepare)
+
+    def _close(self):
+        try:
+            if self._writer is not None:
+                # Encoder có thể đã tự chuyển backend (ffmpeg lỗi -> OpenCV)
+                self.encoder_name = self._writer.name
+                if self.segment_frames:
+                    self._finish_segment()
+                else:
+                    self._writer.release()
+                    self._writer = None
+                    if self.passthrough:
+                        self._transcode(self._writer_path, self.output_path)
+            if self.segment_sink is not None:
+                self.segment_sink.close()
+            print(f"[VIDEO RECORDER] Da luu video: {self.output_path} "
+                  f"({self.encoder_name}) {self.stats()}")
+        finally:
+            with _pending_lock:
+                _pending.pop(self.output_path, None)
+            self._done.set()
+
+    def _transcode(self, src_path, dst_path):
+        """
+        AVI MJPEG gốc -> mp4 đúng kích thước và hướng (chạy ngoài phiên quay).
+        Trả về dst_path nếu thành công, None nếu lỗi (giữ lại file gốc).
+        """
+        t0 = time.perf_counter()
+        ok = transcode_to_mp4(src_path, dst_path, self.width, self.height, self.fps,
+                              rotation=self.rotation, transform=self.transform, mirror=self.mirror,
+                              **self._encoder_kwargs())
+        self.transcode_ms += (time.perf_counter() - t0) * 1000.0
+        if not ok:
+            print(f"[VIDEO RECORDER] Chuyen ma that bai, giu file goc: {src_path}")
+            return None
+        os.remove(src_path)
+        return dst_path
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._queue)
+        input_fps = 0.0
+        if self._first_ts is not None and self.received > 1 and self._last_ts > self._first_ts:
+            input_fps = (self.received - 1) / (self._last_ts - self._first_ts)
+        return {
+            "input_fps": round(input_fps, 2),
+            "output_fps": self.fps,
+            "output_frames": self._next_slot,
+            "duplicated": self.duplicated,
+            "cfr_dropped": self.cfr_dropped,
+            "queue_depth": depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "no_jpeg": self.no_jpeg,
+            "segments": self.segments,
+            "transcode_ms": round(self.transcode_ms, 1),
+            "encode_ms": round(self.encode_ms, 2),
+            "max_encode_ms": round(self.max_encode_ms, 2),
+        }
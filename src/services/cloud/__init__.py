@@ -1,2 +1,3 @@
 # Cloud Upload Service
 from src.services.cloud.cloud_upload import CloudinaryUploadThread, CloudinaryLandingPageThread
+from src.services.cloud.segment_upload import SegmentUploader
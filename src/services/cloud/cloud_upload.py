@@ -14,6 +14,7 @@ import cloudinary
 import cloudinary.uploader
 from PyQt5.QtCore import QThread, pyqtSignal
 from src.shared.types.models import APP_CONFIG
+from src.services.camera.video_recorder import wait_for_recording
 
 
 class CloudinaryUploadThread(QThread):
@@ -49,11 +50,57 @@ class CloudinaryLandingPageThread(QThread):
     """Thread upload ảnh từ bộ nhớ và tạo Landing Page Cloudinary."""
     upload_success = pyqtSignal(str)
     upload_error = pyqtSignal(str)
+    video_error = pyqtSignal(str)     # Video không upload đủ (trang vẫn tạo, không có video)
 
-    def __init__(self, image_data, video_path=None):
+    # Nhãn nút tải cho từng loại ảnh động
+    MEDIA_LABELS = {"gif": "Ảnh GIF", "boomerang": "Boomerang", "timelapse": "Timelapse"}
+
+    def __init__(self, image_data, video_path=None, video_uploader=None, media_jobs=None):
         super().__init__()
         self.image_data = image_data
         self.video_path = video_path
+        # SegmentUploader: video đã được upload từng đoạn trong lúc quay
+        self.video_uploader = video_uploader
+        # MediaJob: GIF / boomerang / timelapse đang tạo ở tiến trình nền
+        self.media_jobs = media_jobs or []
+
+    def _upload_media(self):
+        """Chờ từng job media xong rồi upload, trả về list (kind, url)."""
+        media = []
+        for job in self.media_jobs:
+            if job.kind == "branded":
+                continue
+            path = job.result()
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                res = cloudinary.uploader.upload(
+                    path,
+                    folder="photobooth/media",
+                    resource_type="video" if job.is_video else "image"
+                )
+                media.append((job.kind, res['secure_url']))
+            except Exception as e:
+                print(f"[CLOUD ERROR] Media upload error ({job.kind}): {e}")
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return media
+
+    def _media_html(self, media):
+        """Thẻ hiển thị và nút tải cho các ảnh động."""
+        tags, buttons = [], []
+        for kind, url in media:
+            label = self.MEDIA_LABELS.get(kind, kind)
+            if kind == "gif":
+                tags.append(f'<img src="{url}" alt="{label}">')
+                buttons.append(f'<a href="{url}" download="{kind}.gif" class="btn">⬇️ Tải {label}</a>')
+            else:
+                tags.append(f'<video src="{url}" autoplay loop muted playsinline></video>')
+                buttons.append(f'<a href="{url}" download="{kind}.mp4" class="btn">⬇️ Tải {label}</a>')
+        return "\n".join(tags), "\n".join(buttons)
 
     def run(self):
         try:
@@ -73,13 +120,30 @@ class CloudinaryLandingPageThread(QThread):
 
             # 2. Upload Video (Nếu có)
             v_url = ""
-            if self.video_path and os.path.exists(self.video_path):
-                v_res = cloudinary.uploader.upload(
-                    self.video_path,
-                    folder="photobooth",
-                    resource_type="video"
-                )
-                v_url = v_res['secure_url']
+            if self.video_uploader is not None:
+                # Các đoạn đã upload dần trong lúc quay -> chỉ chờ đoạn cuối, lấy URL ghép
+                v_url = self.video_uploader.finish()
+                if self.video_uploader.error:
+                    self.video_error.emit(self.video_uploader.error)
+            elif self.video_path:
+                # Chờ luồng ghi đóng file xong
+                wait_for_recording(self.video_path)
+                # Có bản lồng khung template thì upload bản đó thay cho video gốc
+                branded = next((j for j in self.media_jobs if j.kind == "branded"), None)
+                branded_path = branded.result() if branded else None
+                upload_path = branded_path or self.video_path
+                if os.path.exists(upload_path):
+                    v_res = cloudinary.uploader.upload(
+                        upload_path,
+                        folder="photobooth",
+                        resource_type="video"
+                    )
+                    v_url = v_res['secure_url']
+                if branded_path and os.path.exists(branded_path):
+                    os.remove(branded_path)
+
+            # 2b. Ảnh động (job ở tiến trình nền thường đã xong trong lúc upload ảnh/video)
+            media_tags, media_buttons = self._media_html(self._upload_media())
 
             # 3. Tạo HTML Landing Page
             html_content = f"""
@@ -119,11 +183,13 @@ class CloudinaryLandingPageThread(QThread):
                     <div class="media">
                         <img src="{p_url}" alt="Ảnh Photobooth">
                         {f'<video src="{v_url}" controls autoplay muted playsinline></video>' if v_url else ""}
+                        {media_tags}
                     </div>
 
                     <div class="btn-group">
                         <a href="{p_url}" download="photo.jpg" class="btn">⬇️ Tải Ảnh Của Bạn</a>
                         {f'<a href="{v_url}" download="video.mp4" class="btn">⬇️ Tải Video Của Bạn</a>' if v_url else ""}
+                        {media_buttons}
                     </div>
 
                     <div class="footer">
@@ -0,0 +1,179 @@
+# ==========================================
+# SEGMENT UPLOAD - Upload video theo từng đoạn trong lúc quay
+# ==========================================
+"""
+VideoRecorder cắt video session thành các đoạn ngắn (vd: 5 giây).
+Mỗi đoạn vừa đóng được đưa vào hàng đợi và upload lên Cloudinary ngay trong
+lúc khách vẫn đang chụp. Khi kết thúc chỉ còn phải chờ đoạn cuối.
+
+Video hoàn chỉnh được ghép phía server bằng URL biến đổi của Cloudinary
+(fl_splice): đoạn đầu làm nền, các đoạn sau được nối vào cuối.
+Đoạn upload lỗi được giữ file để thử lại một lần khi finish(); vẫn thiếu đoạn
+(hoặc hết thời gian chờ) thì không trả URL ghép thiếu mà báo lỗi qua `error`.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import cloudinary
+import cloudinary.uploader
+import cloudinary.utils
+
+
+class SegmentUploader:
+    """Hàng đợi upload các đoạn video của một phiên."""
+
+    def __init__(self, session_id=None, folder="photobooth/sessions"):
+        self.session_id = session_id or time.strftime("%Y%m%d_%H%M%S")
+        self.folder = f"{folder}/{self.session_id}"
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._count = 0             # Số đoạn đã nhận (index liên tiếp từ 0)
+        self._results = {}          # index -> public_id (None nếu lỗi)
+        self._retry = {}            # index -> file của đoạn upload lỗi (thử lại khi finish)
+        self.error = ""             # Lý do không có URL video (thiếu đoạn / hết thời gian)
+        self._thread = threading.Thread(target=self._run, name="SegmentUploader", daemon=True)
+        self._thread.start()
+
+        # Thống kê
+        self.uploaded = 0
+        self.failed = 0
+        self.upload_ms = 0.0        # Tổng thời gian upload
+        self.last_upload_ms = 0.0
+
+    def add_segment(self, index, path, prepare=None):
+        """
+        Đưa một đoạn đã đóng vào hàng đợi (gọi từ luồng ghi video).
+        prepare: hàm chuyển đoạn sang file cần upload (vd: AVI -> mp4), trả về đường dẫn mới.
+        """
+        with self._cond:
+            self._queue.append((index, path, prepare))
+            self._count = max(self._count, index + 1)
+            self._cond.notify()
+
+    def close(self):
+        """Báo không còn đoạn nào nữa (luồng ghi đã dừng)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    break
+                index, path, prepare = self._queue.popleft()
+            try:
+                if prepare is not None:
+                    path = prepare()
+            except Exception as e:
+                print(f"[SEGMENT UPLOAD] Loi chuan bi doan {index}: {e}")
+                path = None
+            self._upload(index, path)
+
+    def _upload(self, index, path):
+        """Upload một đoạn, ghi kết quả. Lỗi thì giữ file để finish() thử lại."""
+        public_id = None
+        elapsed = 0.0
+        try:
+            if not path or not os.path.exists(path):
+                raise IOError("Khong co file doan video")
+            t0 = time.perf_counter()
+            res = cloudinary.uploader.upload(
+                path,
+                folder=self.folder,
+                public_id=f"seg_{index:03d}",
+                resource_type="video"
+            )
+            public_id = res['public_id']
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            print(f"[SEGMENT UPLOAD] Doan {index} xong ({elapsed:.0f}ms)")
+        except Exception as e:
+            print(f"[SEGMENT UPLOAD] Loi doan {index}: {e}")
+        with self._cond:
+            self._results[index] = public_id
+            if public_id:
+                self._retry.pop(index, None)
+                self.last_upload_ms = elapsed
+                self.upload_ms += elapsed
+                self.uploaded += 1
+            else:
+                self.failed += 1
+                if path and os.path.exists(path):
+                    self._retry[index] = path
+                    path = None
+        self._remove(path)
+        return public_id
+
+    @staticmethod
+    def _remove(path):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def finish(self, timeout=120.0):
+        """
+        Chờ upload hết các đoạn (gọi ở luồng nền) rồi trả về URL video đã ghép.
+        Đoạn lỗi được thử upload lại một lần. Trả về "" (lý do ở `error`) nếu hết thời gian
+        chờ hoặc vẫn thiếu đoạn -> không đưa cho khách video bị hụt một khúc.
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return self._fail(f"Het thoi gian cho upload ({timeout:.0f}s)")
+
+        with self._cond:
+            count = self._count
+            retry = [(i, self._retry[i]) for i in range(count)
+                     if not self._results.get(i) and i in self._retry]
+        for index, path in retry:
+            print(f"[SEGMENT UPLOAD] Thu lai doan {index}")
+            self._upload(index, path)
+
+        with self._cond:
+            missing = [i for i in range(count) if not self._results.get(i)]
+            public_ids = [self._results[i] for i in range(count)]
+            leftover = list(self._retry.values())
+            self._retry.clear()
+        for path in leftover:
+            self._remove(path)
+        if not count:
+            return ""
+        if missing:
+            return self._fail(f"Thieu doan video {missing}")
+        return self.stitched_url(public_ids)
+
+    def _fail(self, reason):
+        self.error = reason
+        print(f"[SEGMENT UPLOAD] Khong ghep video: {reason}")
+        return ""
+
+    @staticmethod
+    def stitched_url(public_ids):
+        """URL Cloudinary nối các đoạn theo thứ tự (fl_splice)."""
+        base, rest = public_ids[0], public_ids[1:]
+        transformation = []
+        for pid in rest:
+            transformation.append({"overlay": "video:" + pid.replace("/", ":"), "flags": "splice"})
+            transformation.append({"flags": "layer_apply"})
+        url, _ = cloudinary.utils.cloudinary_url(
+            base, resource_type="video", format="mp4", secure=True,
+            transformation=transformation
+        )
+        return url
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._queue),
+                "uploaded": self.uploaded,
+                "failed": self.failed,
+                "upload_ms": round(self.upload_ms, 1),
+                "last_upload_ms": round(self.last_upload_ms, 1),
+            }
@@ -6,6 +6,10 @@ Service xử lý ảnh.
 """
 
 from src.services.image.collage import create_collage, crop_to_aspect_wh
+from src.services.image.layout_plan import LayoutPlan, SlotPlan, compile_layout, get_layout_plan
+from src.services.image.compositor import CompositeTemplate, prepare_template
+from src.services.image.template_cache import TemplateCache, template_cache, configure_template_cache
+from src.services.image.slot_canvas import SlotCanvas
 from src.services.image.template import (
     generate_frame_templates,
     load_templates_for_layout,
@@ -15,3 +19,4 @@ from src.services.image.template import (
 )
 from src.services.image.filters import apply_filter, get_available_filters
 from src.services.image.image_workflow import ImageWorkflow
+from src.services.image.frame_scoring import preload_cascades, select_best_frame, score_frames
@@ -0,0 +1,154 @@
+# ==========================================
+# FRAME SCORING - Chọn ảnh đẹp nhất trong một loạt chụp
+# ==========================================
+"""
+Chấm điểm K frame quanh thời điểm bấm máy trên bản thu nhỏ (ảnh xám ~320px):
+- Độ nét: phương sai Laplacian (ảnh rung/nhòe có điểm thấp).
+- Mắt mở (tùy chọn): Haar cascade có sẵn trong OpenCV (cv2.data.haarcascades).
+  Khuôn mặt chỉ dò 1 lần trên frame giữa, các frame còn lại chỉ dò mắt trong vùng mặt.
+
+Toàn bộ việc chấm điểm nằm trong một ngân sách thời gian (mặc định 50ms cho 5 frame);
+hết ngân sách trước khi dò mắt xong mọi frame thì xếp hạng tất cả chỉ theo độ nét.
+Cascade nạp sẵn lúc khởi động (preload_cascades) để lần chụp đầu không phải chờ.
+"""
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SCORE_WIDTH = 320          # Chiều rộng ảnh dùng để chấm điểm
+SHARPNESS_WEIGHT = 0.6
+EYES_WEIGHT = 0.4
+
+_cascades = None          # None: chưa nạp, False: không có, (face, eye): đã nạp
+_cascades_lock = threading.Lock()
+
+
+def preload_cascades():
+    """Nạp sẵn Haar cascade (gọi lúc khởi động, ngoài luồng GUI). Trả về True nếu dùng được."""
+    return _load_cascades() is not None
+
+
+def _load_cascades(wait=True):
+    """
+    Nạp cascade khuôn mặt + mắt (1 lần). Trả về (face, eye) hoặc None nếu không có.
+    wait=False: luồng khác đang nạp thì trả về None ngay, không chờ.
+    """
+    global _cascades
+    if _cascades is not None:
+        return _cascades or None
+    if not _cascades_lock.acquire(blocking=wait):
+        return None
+    try:
+        if _cascades is None:
+            _cascades = _read_cascades()
+        return _cascades or None
+    finally:
+        _cascades_lock.release()
+
+
+def _read_cascades():
+    """Đọc 2 file cascade của OpenCV. Trả về (face, eye) hoặc False."""
+    try:
+        base = cv2.data.haarcascades
+        face_path = os.path.join(base, "haarcascade_frontalface_default.xml")
+        eye_path = os.path.join(base, "haarcascade_eye_tree_eyeglasses.xml")
+        if os.path.exists(face_path) and os.path.exists(eye_path):
+            face = cv2.CascadeClassifier(face_path)
+            eye = cv2.CascadeClassifier(eye_path)
+            if not face.empty() and not eye.empty():
+                return face, eye
+    except Exception as e:
+        print(f"[SCORING] Khong nap duoc Haar cascade: {e}")
+    print("[SCORING] Khong co Haar cascade, chi cham diem do net")
+    return False
+
+
+def to_score_gray(image, width=SCORE_WIDTH):
+    """Thu nhỏ ảnh BGR về chiều rộng `width` rồi chuyển sang ảnh xám."""
+    h, w = image.shape[:2]
+    if w > width:
+        image = cv2.resize(image, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def sharpness(gray):
+    """Phương sai Laplacian của ảnh xám (càng lớn càng nét)."""
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+def _detect_faces(face_cascade, gray):
+    min_side = max(24, gray.shape[1] // 10)
+    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=4,
+                                          minSize=(min_side, min_side))
+    return [tuple(int(v) for v in f) for f in faces]
+
+
+def _eyes_open_ratio(eye_cascade, gray, faces):
+    """Tỷ lệ khuôn mặt dò được ít nhất 2 mắt (mắt nhắm thường không được dò ra)."""
+    open_faces = 0
+    for (x, y, w, h) in faces:
+        # Mắt nằm ở nửa trên khuôn mặt
+        roi = gray[y:y + h // 2 + h // 8, x:x + w]
+        eyes = eye_cascade.detectMultiScale(roi, scaleFactor=1.1, minNeighbors=3,
+                                            minSize=(max(6, w // 8), max(6, w // 8)))
+        if len(eyes) >= 2:
+            open_faces += 1
+    return open_faces / len(faces)
+
+
+def score_frames(grays, check_eyes=True, budget_ms=50.0):
+    """
+    Chấm điểm danh sách ảnh xám đã thu nhỏ.
+    Trả về list điểm (0..1) theo thứ tự đầu vào.
+    """
+    if not grays:
+        return []
+    t0 = time.perf_counter()
+
+    sharp = [sharpness(g) for g in grays]
+    best_sharp = max(sharp) or 1.0
+    sharp_norm = [s / best_sharp for s in sharp]
+
+    def over_budget():
+        return (time.perf_counter() - t0) * 1000.0 > budget_ms
+
+    # Không chờ nếu cascade đang được nạp ở luồng khác (preload_cascades)
+    cascades = _load_cascades(wait=False) if check_eyes else None
+    if cascades is None or over_budget():
+        return sharp_norm
+
+    face_cascade, eye_cascade = cascades
+    # Khuôn mặt gần như không đổi chỗ trong loạt chụp -> chỉ dò trên frame giữa
+    faces = _detect_faces(face_cascade, grays[len(grays) // 2])
+    if not faces:
+        return sharp_norm
+
+    scores = []
+    for i, gray in enumerate(grays):
+        if over_budget():
+            # Frame chưa dò mắt không so được với frame đã dò (có thể đã thấy nhắm mắt)
+            # -> xếp hạng tất cả chỉ theo độ nét
+            print(f"[SCORING] Het ngan sach {budget_ms:.0f}ms o frame {i}/{len(grays)}, chi dung do net")
+            return sharp_norm
+        eyes = _eyes_open_ratio(eye_cascade, gray, faces)
+        scores.append(SHARPNESS_WEIGHT * sharp_norm[i] + EYES_WEIGHT * eyes)
+    return scores
+
+
+def select_best_frame(grays, check_eyes=True, budget_ms=50.0):
+    """Chọn frame tốt nhất. Trả về (index, scores)."""
+    t0 = time.perf_counter()
+    scores = score_frames(grays, check_eyes, budget_ms)
+    if not scores:
+        return -1, scores
+    best = int(np.argmax(scores))
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    print(f"[SCORING] Chon frame {best + 1}/{len(scores)} "
+          f"(diem {scores[best]:.2f}, {elapsed:.1f}ms)")
+    return best, scores
@@ -0,0 +1,226 @@
+# ==========================================
+# LAYOUT PLAN - Biên dịch layout thành kế hoạch dựng ảnh cố định
+# ==========================================
+"""
+Mỗi layout (DEFAULT_LAYOUTS / CUSTOM_LAYOUTS) được biên dịch MỘT lần thành
+LayoutPlan bất biến: kích thước canvas, toạ độ các ô (slot) đã tính sẵn từ
+SLOTS hoặc từ PAD_*/GAP. Hình học crop theo từng độ phân giải nguồn và cách
+nội suy được tính một lần rồi nhớ lại.
+
+- Cache plan chỉ bị xoá khi custom_layouts.json đổi (mtime/kích thước),
+  không còn importlib.reload module models mỗi lần dựng collage.
+- create_collage (ảnh in), preview chụp tương tác và preview chọn template
+  cùng dựng từ một plan -> ô ảnh trên preview khớp đúng ảnh in.
+"""
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from src.shared.types import models as layout_models
+
+# Layout không khai báo SLOTS: tên "RxC" = số hàng x số cột
+_GRIDS = {
+    "1x2": (1, 2),
+    "2x1": (2, 1),
+    "2x2": (2, 2),
+    "4x1": (4, 1),
+}
+
+
+class SlotPlan:
+    """Một ô ảnh của layout (bất biến)."""
+
+    __slots__ = ("x", "y", "w", "h", "aspect", "downscale", "_crops")
+
+    def __init__(self, x, y, w, h, aspect=None, downscale=cv2.INTER_LINEAR):
+        object.__setattr__(self, "x", int(x))
+        object.__setattr__(self, "y", int(y))
+        object.__setattr__(self, "w", int(w))
+        object.__setattr__(self, "h", int(h))
+        # Tỉ lệ dùng để crop: ô thu nhỏ giữ tỉ lệ của ô gốc -> cắt đúng như ảnh in
+        object.__setattr__(self, "aspect", aspect or (self.w, self.h))
+        # Nội suy khi thu nhỏ: ảnh in giữ INTER_LINEAR như bản gốc, plan preview dùng INTER_AREA
+        object.__setattr__(self, "downscale", downscale)
+        object.__setattr__(self, "_crops", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SlotPlan la bat bien")
+
+    @property
+    def rect(self):
+        return self.x, self.y, self.w, self.h
+
+    def crop_for(self, src_w, src_h):
+        """
+        (x0, y0, cw, ch, interpolation) để cắt ảnh nguồn src_w x src_h theo tỉ lệ ô
+        (giống crop_to_aspect_wh). Tính một lần cho mỗi độ phân giải nguồn.
+        """
+        key = (src_w, src_h)
+        crop = self._crops.get(key)
+        if crop is None:
+            target_ratio = self.aspect[0] / self.aspect[1]
+            if src_w / src_h > target_ratio:
+                cw, ch = int(src_h * target_ratio), src_h
+            else:
+                cw, ch = src_w, int(src_w / target_ratio)
+            interp = self.downscale if cw >= self.w and ch >= self.h else cv2.INTER_LINEAR
+            crop = ((src_w - cw) // 2, (src_h - ch) // 2, cw, ch, interp)
+            self._crops[key] = crop
+        return crop
+
+    def fit(self, image):
+        """Ảnh nguồn -> ảnh đúng kích thước ô (cắt giữa theo tỉ lệ rồi resize)."""
+        if image is None:
+            return np.zeros((self.h, self.w, 3), np.uint8)
+        x0, y0, cw, ch, interp = self.crop_for(image.shape[1], image.shape[0])
+        return cv2.resize(image[y0:y0 + ch, x0:x0 + cw], (self.w, self.h), interpolation=interp)
+
+
+class LayoutPlan:
+    """Kế hoạch dựng cho một layout (bất biến, dùng chung giữa các luồng)."""
+
+    __slots__ = ("name", "canvas_w", "canvas_h", "slots", "group", "rotation", "scale", "_scaled")
+
+    def __init__(self, name, canvas_w, canvas_h, slots, group="custom", rotation=0, scale=1.0):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "canvas_w", int(canvas_w))
+        object.__setattr__(self, "canvas_h", int(canvas_h))
+        object.__setattr__(self, "slots", tuple(slots))
+        object.__setattr__(self, "group", group)
+        object.__setattr__(self, "rotation", rotation)
+        object.__setattr__(self, "scale", scale)
+        object.__setattr__(self, "_scaled", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LayoutPlan la bat bien")
+
+    def __len__(self):
+        return len(self.slots)
+
+    def scaled(self, scale):
+        """
+        Plan thu nhỏ theo tỉ lệ scale (preview). Mép ô được làm tròn như khi thu
+        nhỏ ảnh in; ô giữ tỉ lệ crop của ô gốc. Plan thu nhỏ được nhớ lại.
+        """
+        if scale >= 1.0 or self.scale != 1.0:
+            return self
+        plan = self._scaled.get(scale)
+        if plan is None:
+            slots = []
+            for s in self.slots:
+                x0, y0 = round(s.x * scale), round(s.y * scale)
+                x1, y1 = round((s.x + s.w) * scale), round((s.y + s.h) * scale)
+                slots.append(SlotPlan(x0, y0, max(1, x1 - x0), max(1, y1 - y0),
+                                      aspect=s.aspect, downscale=cv2.INTER_AREA))
+            plan = LayoutPlan(self.name, max(1, round(self.canvas_w * scale)),
+                              max(1, round(self.canvas_h * scale)), slots,
+                              self.group, self.rotation, scale)
+            self._scaled[scale] = plan
+        return plan
+
+    def blank(self, color=(0, 0, 0)):
+        canvas = np.empty((self.canvas_h, self.canvas_w, 3), dtype=np.uint8)
+        canvas[:] = color
+        return canvas
+
+    def place(self, canvas, index, image):
+        """Đặt ảnh vào ô thứ index của canvas."""
+        slot = self.slots[index]
+        canvas[slot.y:slot.y + slot.h, slot.x:slot.x + slot.w] = slot.fit(image)
+
+    def fill_slots(self, canvas, color, start=0):
+        """Tô màu các ô từ start trở đi (ô giữ chỗ chưa có ảnh)."""
+        for slot in self.slots[start:]:
+            canvas[slot.y:slot.y + slot.h, slot.x:slot.x + slot.w] = color
+
+    def render(self, images, background=(0, 0, 0)):
+        """Dựng collage: ảnh thứ i vào ô thứ i, thừa ảnh thì bỏ qua."""
+        canvas = self.blank(background)
+        for i, img in enumerate(images[:len(self.slots)]):
+            self.place(canvas, i, img)
+        return canvas
+
+
+def _grid_shape(name, count=None):
+    """
+    (hàng, cột) của layout lưới. count = số ảnh thực có, xếp giống create_collage gốc:
+    2 ảnh -> 2x1 dọc nếu tên là "2x1", còn lại 1x2 ngang; 4 ảnh -> 4x1 nếu tên là "4x1",
+    còn lại 2x2; số ảnh khác -> None (canvas trống). count=None -> lưới theo tên.
+    """
+    if count is None:
+        return _GRIDS.get(name, (2, 2))
+    if count == 2:
+        return (2, 1) if name == "2x1" else (1, 2)
+    if count == 4:
+        return (4, 1) if name == "4x1" else (2, 2)
+    return None
+
+
+def _grid_slots(cfg, canvas_w, canvas_h, shape):
+    """Tính các ô từ PAD_*/GAP cho layout dạng lưới."""
+    if shape is None:
+        return []
+    rows, cols = shape
+    pad_top = cfg.get("PAD_TOP", 20)
+    pad_bottom = cfg.get("PAD_BOTTOM", 100)
+    pad_left = cfg.get("PAD_LEFT", 20)
+    pad_right = cfg.get("PAD_RIGHT", 20)
+    gap = cfg.get("GAP", 15)
+    img_w = (canvas_w - pad_left - pad_right - (cols - 1) * gap) // cols
+    img_h = (canvas_h - pad_top - pad_bottom - (rows - 1) * gap) // rows
+    return [SlotPlan(pad_left + c * (img_w + gap), pad_top + r * (img_h + gap), img_w, img_h)
+            for r in range(rows) for c in range(cols)]
+
+
+def compile_layout(name, cfg, count=None):
+    """Biên dịch một cấu hình layout (dict) thành LayoutPlan (count: xem _grid_shape)."""
+    canvas_w = cfg.get("CANVAS_W", 1280)
+    canvas_h = cfg.get("CANVAS_H", 720)
+    if cfg.get("SLOTS"):
+        # Slot có thể kèm rotation (x, y, w, h, rot): w/h đã phản ánh hình dáng ô
+        slots = [SlotPlan(*s[:4]) for s in cfg["SLOTS"]]
+    else:
+        slots = _grid_slots(cfg, canvas_w, canvas_h, _grid_shape(name, count))
+    group = cfg.get("group", "vertical" if name in layout_models.DEFAULT_LAYOUTS else "custom")
+    return LayoutPlan(name, canvas_w, canvas_h, slots, group, cfg.get("rotation", 0))
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+_custom_stamp = None
+
+
+def _layouts_stamp():
+    try:
+        st = os.stat(layout_models.CUSTOM_LAYOUTS_FILE)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def get_layout_plan(layout_type, count=None):
+    """
+    LayoutPlan của layout (đã cache). Layout không có trong danh sách dùng cấu hình 4x1
+    nhưng giữ tên riêng (vd: "2x2" -> lưới 2x2 trên canvas 4x1).
+    count: số ảnh sẽ đặt vào (chỉ đổi cách xếp của layout lưới), None = theo tên layout.
+    """
+    global _custom_stamp
+    stamp = _layouts_stamp()
+    with _plans_lock:
+        if stamp != _custom_stamp:
+            # custom_layouts.json đã đổi (admin lưu/xoá layout) -> đọc lại, bỏ mọi plan cũ.
+            # File đang ghi dở / lỗi -> giữ layout + plan cũ, lần gọi sau thử lại.
+            if layout_models.reload_custom_layouts():
+                _custom_stamp = stamp
+                _plans.clear()
+        cfg = layout_models.get_layout_config(layout_type)
+        key = (layout_type, None if cfg.get("SLOTS") else count)
+        plan = _plans.get(key)
+        if plan is None:
+            plan = compile_layout(layout_type, cfg, count)
+            _plans[key] = plan
+        return plan
+
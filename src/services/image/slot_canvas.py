@@ -0,0 +1,94 @@
+# ==========================================
+# SLOT CANVAS - Preview chụp tương tác cập nhật theo từng ô
+# ==========================================
+"""
+Sau mỗi pô, preview chụp tương tác từng dựng lại toàn bộ: cấp phát canvas,
+crop + resize MỌI ảnh đã chụp, tô lại ô trống, lồng template cả khung.
+Chi phí tăng dần theo số pô đã chụp.
+
+SlotCanvas giữ canvas suốt phiên chụp:
+- Nền (màu nền, ô trống, viền) và ảnh đã lồng template dựng MỘT lần.
+- Mỗi pô mới / chụp lại chỉ vẽ lại đúng ô đó và trộn lại template trong
+  vùng của ô -> chi phí mỗi lần cập nhật không đổi theo số ô đã lấp.
+- scale < 1: dựng thẳng ở độ phân giải của khung hiển thị (plan thu nhỏ,
+  template thu nhỏ lấy từ template_cache, ảnh chụp crop như ảnh in rồi thu
+  nhỏ một lần vào ô). Chỉ ảnh in cuối (ImageWorkflow) dựng full-res.
+"""
+
+import cv2
+
+from src.services.image.template_cache import template_cache
+
+BACKGROUND = (245, 245, 255)    # Nền hồng nhạt (#FFF5F5)
+EMPTY_SLOT = (229, 227, 242)    # Ô chưa chụp (#F2E3E5)
+BORDER = (0, 0, 0)
+BORDER_PX = 5
+
+
+def preview_scale(plan, width, height):
+    """Tỉ lệ để canvas của plan vừa khung width x height (tối đa 1, làm tròn xuống 0.01)."""
+    if width <= 10 or height <= 10:
+        return 1.0
+    scale = min(width / plan.canvas_w, height / plan.canvas_h, 1.0)
+    # Làm tròn để khung đổi kích thước vài pixel không phải dựng lại canvas
+    return max(0.01, int(scale * 100) / 100.0)
+
+
+class SlotCanvas:
+    """Canvas preview của một phiên chụp theo một LayoutPlan + template."""
+
+    def __init__(self, plan, template_path=None, scale=1.0):
+        self.source_plan = plan
+        self.plan = plan.scaled(scale)
+        self.scale = scale
+        self.border_px = max(1, round(BORDER_PX * scale))
+
+        # base: canvas trước khi lồng template (giữ sẵn ảnh đã thu nhỏ của từng ô)
+        self.base = self.plan.blank(BACKGROUND)
+        self.plan.fill_slots(self.base, EMPTY_SLOT)
+        self._draw_border()
+        self._photos = [None] * len(self.plan)
+        self.set_template(template_path)
+
+    def matches(self, plan, scale):
+        """Canvas còn dùng được cho layout + tỉ lệ này không (đổi template thì gọi set_template)."""
+        return plan is self.source_plan and scale == self.scale
+
+    def set_template(self, template_path):
+        """Đổi template: trộn lại cả canvas từ base, không phải crop/resize lại ảnh."""
+        self.template_path = template_path
+        self.template = None
+        if template_path:
+            self.template = template_cache.prepared(template_path, self.plan.canvas_w, self.plan.canvas_h)
+        self.image = self.template.composite(self.base) if self.template is not None else self.base.copy()
+
+    def _draw_border(self):
+        # Viền bao quanh canvas để thấy rõ biên (vẽ đè lên ô sát mép giống bản cũ)
+        cv2.rectangle(self.base, (0, 0), (self.plan.canvas_w - 1, self.plan.canvas_h - 1),
+                      BORDER, self.border_px)
+
+    def set_photo(self, index, photo):
+        """Đặt / xoá (photo=None) ảnh của ô index. Trả về vùng (x, y, w, h) đã vẽ lại."""
+        slot = self.plan.slots[index]
+        x, y, w, h = slot.rect
+        if photo is None:
+            self.base[y:y + h, x:x + w] = EMPTY_SLOT
+        else:
+            self.plan.place(self.base, index, photo)
+        self._draw_border()
+        self._photos[index] = photo
+
+        if self.template is not None:
+            self.template.composite(self.base, out=self.image, region=slot.rect)
+        else:
+            self.image[y:y + h, x:x + w] = self.base[y:y + h, x:x + w]
+        return slot.rect
+
+    def sync(self, photos):
+        """Cập nhật theo danh sách ảnh hiện tại; chỉ vẽ lại ô có ảnh đổi. Trả về các vùng đã vẽ."""
+        changed = []
+        for i in range(len(self._photos)):
+            photo = photos[i] if i < len(photos) else None
+            if photo is not self._photos[i]:
+                changed.append(self.set_photo(i, photo))
+        return changed
@@ -14,7 +14,7 @@ from src.shared.types.models import (
     TEMPLATE_DIR, get_layout_config, get_all_layouts,
     CUSTOM_LAYOUTS
 )
-from src.utils.image_helpers import overlay_images
+from src.services.image.template_cache import template_cache
 
 
 def generate_frame_templates():
@@ -179,8 +179,11 @@ def detect_layout_from_template(template_path):
 
 
 def apply_template_overlay(collage_image, template_path):
-    """Áp dụng template lên collage."""
-    template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
-    if template is not None and collage_image is not None:
-        return overlay_images(collage_image.copy(), template)
-    return collage_image
+    """Áp dụng template lên collage (template lấy từ cache, không đọc lại file)."""
+    if collage_image is None:
+        return collage_image
+    h, w = collage_image.shape[:2]
+    prepared = template_cache.prepared(template_path, w, h)
+    if prepared is None:
+        return collage_image.copy()
+    return prepared.composite(collage_image)
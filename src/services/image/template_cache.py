@@ -0,0 +1,164 @@
+# ==========================================
+# TEMPLATE CACHE - Cache template đã giải mã + dữ liệu trộn alpha
+# ==========================================
+"""
+apply_template_overlay được gọi sau mỗi lần chọn template, sau mỗi pô chụp
+tương tác và khi dựng ảnh cuối. Mỗi lần đều cv2.imread PNG 1210x1810 (~30 ms)
+rồi chuẩn bị lại dữ liệu trộn.
+
+TemplateCache (dùng chung cả tiến trình):
+- Khoá theo đường dẫn; mỗi lần tra cứu so (mtime, kích thước file) -> admin
+  sửa/ghi đè template thì tự đọc lại.
+- Mỗi mục giữ ảnh BGRA đã giải mã và các CompositeTemplate đã chuẩn bị theo
+  kích thước canvas.
+- Vượt ngân sách bộ nhớ -> bỏ mục ít dùng gần đây nhất (LRU).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from src.services.image.compositor import prepare_template
+
+DEFAULT_BUDGET_MB = 128
+
+
+class _Entry:
+    __slots__ = ("stamp", "image", "prepared", "nbytes")
+
+    def __init__(self, stamp, image):
+        self.stamp = stamp
+        self.image = image
+        self.prepared = {}          # (width, height) -> CompositeTemplate | None
+        self.nbytes = image.nbytes if image is not None else 0
+
+
+class TemplateCache:
+    """LRU cache template theo ngân sách byte, có đếm hit/miss."""
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _lookup(self, path):
+        """Mục còn hợp lệ của path (đã đưa lên đầu LRU) hoặc None. Gọi khi giữ lock."""
+        stamp = self._stamp(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry.stamp != stamp:
+            # File đã đổi hoặc bị xoá -> bỏ bản cũ
+            self._drop(path)
+            entry = None
+        if entry is None:
+            if stamp is None:
+                return None
+            image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            self.decodes += 1
+            if image is None:
+                return None
+            entry = _Entry(stamp, image)
+            self._entries[path] = entry
+            self._bytes += entry.nbytes
+        self._entries.move_to_end(path)
+        return entry
+
+    def _drop(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _evict(self, keep):
+        # Giữ lại mục vừa dùng kể cả khi riêng nó đã vượt ngân sách
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            path = next(iter(self._entries))
+            if path == keep:
+                break
+            self._drop(path)
+            self.evictions += 1
+
+    def get(self, path):
+        """Ảnh template BGRA đã giải mã (không được sửa) hoặc None nếu không đọc được."""
+        path = os.path.abspath(path)
+        with self._lock:
+            decodes = self.decodes
+            entry = self._lookup(path)
+            if entry is None or self.decodes != decodes:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if entry is None:
+                return None
+            self._evict(path)
+            return entry.image
+
+    def prepared(self, path, width, height):
+        """CompositeTemplate của template cho canvas width x height; None nếu không có alpha."""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._lookup(path)
+            if entry is None:
+                self.misses += 1
+                return None
+            key = (width, height)
+            if key in entry.prepared:
+                self.hits += 1
+                return entry.prepared[key]
+            self.misses += 1
+            th, tw = entry.image.shape[:2]
+            # Preview dựng ở kích thước thu nhỏ cùng tỉ lệ -> chỉ cảnh báo khi lệch tỉ lệ
+            if abs(tw * height - th * width) > 0.01 * tw * height:
+                print(f"[TEMPLATE CACHE] Template {tw}x{th} khac canvas {width}x{height} -> resize template")
+            comp = prepare_template(entry.image, width, height)
+            entry.prepared[key] = comp
+            if comp is not None:
+                entry.nbytes += comp.nbytes
+                self._bytes += comp.nbytes
+            self._evict(path)
+            return comp
+
+    def set_budget(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict(None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "decodes": self.decodes,
+                "evictions": self.evictions,
+            }
+
+
+# Cache dùng chung toàn tiến trình
+template_cache = TemplateCache()
+
+
+def configure_template_cache(budget_mb):
+    """Đặt ngân sách bộ nhớ cho cache template (MB)."""
+    template_cache.set_budget(max(0, float(budget_mb)) * 1024 * 1024)
+    print(f"[TEMPLATE CACHE] Ngan sach: {budget_mb} MB")
@@ -0,0 +1,3 @@
+# Media Service
+from src.services.media.media_jobs import MediaJob, MediaJobService, MEDIA_TYPES
+from src.services.media.branded_video import BrandOverlay, prepare_overlay, brand_video
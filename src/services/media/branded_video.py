@@ -0,0 +1,203 @@
+# ==========================================
+# BRANDED VIDEO - Lồng khung template vào video session
+# ==========================================
+"""
+Video session được đặt vào các ô (slot) của template giống dải ảnh in,
+khung template (có alpha) phủ lên trên.
+
+- BrandOverlay được chuẩn bị MỘT lần cho mỗi video: template thu nhỏ về kích
+  thước đầu ra, chuẩn bị bằng CompositeTemplate (cùng phép trộn với ảnh in) và
+  phần nền tĩnh -> mỗi frame chỉ còn resize + trộn lại vùng các slot.
+- Video được chia thành các đoạn theo số frame, mỗi đoạn xử lý ở một tiến trình
+  con (ProcessPoolExecutor), sau đó ghép lại bằng ffmpeg concat (không encode lại).
+- Không có ffmpeg để ghép -> xử lý tuần tự trong một job duy nhất.
+"""
+
+import os
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from src.services.image.compositor import prepare_template
+
+# Ô nhỏ hơn tỉ lệ này (so với canvas) không coi là slot (vd: lỗ trang trí)
+_MIN_SLOT_RATIO = 0.01
+
+
+class BrandOverlay:
+    """Template đã chuẩn bị sẵn cho một kích thước đầu ra (pickle được)."""
+
+    def __init__(self, width, height, slots, composite):
+        self.width = width
+        self.height = height
+        self.slots = slots              # [(x, y, w, h)] theo kích thước đầu ra
+        self.composite = composite      # CompositeTemplate (vùng đục / trong suốt / bán trong suốt)
+        # Phần nền tĩnh: template phủ lên nền đen (giống collage)
+        self.static = composite.composite(np.zeros((height, width, 3), np.uint8))
+        self._base = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_base"] = None           # Buffer làm việc, không gửi sang tiến trình con
+        return state
+
+    def render(self, frame):
+        """Frame video -> frame đã lồng khung."""
+        if self._base is None:
+            self._base = np.zeros((self.height, self.width, 3), np.uint8)
+        out = self.static.copy()
+        fh, fw = frame.shape[:2]
+        for x, y, w, h in self.slots:
+            # Cắt frame theo tỉ lệ ô (cover) rồi thu nhỏ vào nền
+            if fw * h > fh * w:
+                cw = fh * w // h
+                src = frame[:, (fw - cw) // 2:(fw - cw) // 2 + cw]
+            else:
+                ch = fw * h // w
+                src = frame[(fh - ch) // 2:(fh - ch) // 2 + ch]
+            self._base[y:y + h, x:x + w] = cv2.resize(src, (w, h), interpolation=cv2.INTER_AREA)
+            # Trộn template chỉ trong vùng ô, cùng phép trộn với ảnh in (compositor)
+            self.composite.composite(self._base, out=out, region=(x, y, w, h))
+        return out
+
+
+def _slots_from_alpha(alpha):
+    """Tìm các vùng trong suốt của template (slot) khi layout không khai báo SLOTS."""
+    mask = (alpha < 128).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+    min_area = _MIN_SLOT_RATIO * alpha.shape[0] * alpha.shape[1]
+    slots = []
+    for i in range(1, count):
+        x, y, w, h, area = stats[i]
+        if area >= min_area:
+            slots.append((int(x), int(y), int(w), int(h)))
+    slots.sort(key=lambda s: (s[1], s[0]))
+    return slots
+
+
+def prepare_overlay(template_path, width=720, slots=None):
+    """
+    Đọc template và chuẩn bị BrandOverlay với chiều rộng đầu ra `width`.
+    slots: danh sách ô theo kích thước gốc của template (None = tự dò theo alpha).
+    Trả về None nếu template không có kênh alpha.
+    """
+    template = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+    if template is None or template.ndim < 3 or template.shape[2] < 4:
+        return None
+    th, tw = template.shape[:2]
+
+    # yuv420p cần kích thước chẵn
+    width = min(width, tw) & ~1
+    height = round(th * width / tw) & ~1
+    sx, sy = width / tw, height / th
+    small = cv2.resize(template, (width, height), interpolation=cv2.INTER_AREA)
+
+    if slots:
+        scaled = []
+        for slot in slots:
+            x, y, w, h = slot[:4]
+            x1, y1 = max(0, round(x * sx)), max(0, round(y * sy))
+            x2, y2 = min(width, round((x + w) * sx)), min(height, round((y + h) * sy))
+            if x2 > x1 and y2 > y1:
+                scaled.append((x1, y1, x2 - x1, y2 - y1))
+        slots = scaled
+    else:
+        slots = _slots_from_alpha(small[:, :, 3])
+
+    return BrandOverlay(width, height, slots, prepare_template(small))
+
+
+def _brand_chunk(video_path, output_path, overlay, start, count, encoder_options):
+    """Xử lý frame [start, start + count) của video (chạy trong tiến trình con)."""
+    from src.services.camera.encoders import create_encoder
+    t0 = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Khong mo duoc video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    enc = create_encoder(output_path, overlay.width, overlay.height, fps, **(encoder_options or {}))
+    if enc is None:
+        cap.release()
+        raise IOError(f"Khong mo duoc encoder: {output_path}")
+    written = 0
+    try:
+        while count is None or written < count:
+            ok, img = cap.read()
+            if not ok:
+                break
+            enc.write(overlay.render(img))
+            written += 1
+    finally:
+        cap.release()
+        enc.release()
+    return {"path": output_path, "frames": written, "work_ms": (time.perf_counter() - t0) * 1000.0}
+
+
+def concat_videos(paths, output_path, ffmpeg):
+    """Ghép các đoạn mp4 cùng thông số bằng concat demuxer (copy stream)."""
+    list_path = output_path + ".txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in paths:
+            f.write("file '{}'\n".format(os.path.abspath(p).replace("\\", "/").replace("'", "'\\''")))
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+           "-c", "copy", "-movflags", "+faststart", output_path]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        return result.returncode == 0
+    except OSError as e:
+        print(f"[BRANDED VIDEO] Khong chay duoc ffmpeg: {e}")
+        return False
+    finally:
+        os.remove(list_path)
+
+
+def brand_video(pool, workers, video_path, output_path, overlay, encoder_options=None):
+    """
+    Lồng khung cho cả video: chia đoạn chạy song song trên `pool` rồi ghép lại.
+    Chạy ở luồng nền của tiến trình chính, trả về dict thông tin như các job media.
+    """
+    from src.services.camera.encoders import find_ffmpeg
+    t0 = time.perf_counter()
+    ffmpeg = find_ffmpeg((encoder_options or {}).get("ffmpeg_path"))
+
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    cap.release()
+
+    # Mỗi đoạn ít nhất ~2 giây video, tránh chi phí mở encoder quá nhiều lần
+    chunks = min(workers, total // 40) if ffmpeg else 1
+    if chunks <= 1:
+        info = pool.submit(_brand_chunk, video_path, output_path, overlay, 0, None, encoder_options).result()
+        info["chunks"] = 1
+        return info
+
+    base, ext = os.path.splitext(output_path)
+    size = -(-total // chunks)
+    futures = []
+    for i in range(chunks):
+        futures.append(pool.submit(_brand_chunk, video_path, f"{base}_part{i:02d}{ext}", overlay,
+                                   i * size, size if i < chunks - 1 else None, encoder_options))
+    parts = []
+    try:
+        parts = [f.result() for f in futures]
+        if not concat_videos([p["path"] for p in parts], output_path, ffmpeg):
+            raise IOError("ffmpeg concat loi")
+    finally:
+        for f in futures:
+            f.cancel()
+        for i in range(chunks):
+            part = f"{base}_part{i:02d}{ext}"
+            if os.path.exists(part):
+                os.remove(part)
+    return {
+        "path": output_path,
+        "frames": sum(p["frames"] for p in parts),
+        "chunks": chunks,
+        "chunk_ms": [round(p["work_ms"], 1) for p in parts],
+        "work_ms": (time.perf_counter() - t0) * 1000.0,
+    }
@@ -0,0 +1,240 @@
+# ==========================================
+# MEDIA JOBS - Tạo GIF / Boomerang / Timelapse ở tiến trình nền
+# ==========================================
+"""
+Encode GIF/MP4 rất tốn CPU, chạy trong tiến trình GUI sẽ làm treo máy.
+MediaJobService đẩy các job sang ProcessPoolExecutor:
+- Frame được thu nhỏ NGAY ở tiến trình chính (ảnh nhỏ -> truyền qua pickle rẻ).
+- Tiến trình con chỉ encode và ghi file, trả về đường dẫn + thời gian xử lý.
+- Bước upload (CloudinaryLandingPageThread) gọi job.result() ở luồng nền rồi upload file.
+
+Các loại job:
+- gif       : Ảnh động GIF từ các frame burst (Pillow).
+- boomerang : MP4 chạy xuôi rồi ngược từ frame burst của pô cuối.
+- timelapse : MP4 tua nhanh từ video session đã quay.
+- branded   : Video session lồng khung template (xem branded_video.py), chia đoạn
+              chạy song song trên nhiều tiến trình.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import cv2
+
+MEDIA_TYPES = ("gif", "boomerang", "timelapse", "branded")
+
+
+# --- Hàm chạy trong tiến trình con (phải ở cấp module để pickle được) ---
+
+def _job_gif(frames, output_path, fps):
+    from PIL import Image
+    t0 = time.perf_counter()
+    images = [Image.fromarray(cv2.cvtColor(f, cv2.COLOR_BGR2RGB)) for f in frames]
+    # Dùng chung 1 bảng màu cho cả GIF -> file nhỏ, không nhấp nháy màu
+    palette = images[0].quantize(colors=256, method=Image.MEDIANCUT)
+    images = [im.quantize(palette=palette, dither=Image.NONE) for im in images]
+    images[0].save(output_path, save_all=True, append_images=images[1:],
+                   duration=int(1000 / fps), loop=0, optimize=True)
+    return {"path": output_path, "frames": len(images), "work_ms": (time.perf_counter() - t0) * 1000.0}
+
+
+def _write_mp4(frames, output_path, fps, encoder_options):
+    from src.services.camera.encoders import create_encoder
+    h, w = frames[0].shape[:2]
+    enc = create_encoder(output_path, w, h, fps, **(encoder_options or {}))
+    if enc is None:
+        raise IOError(f"Khong mo duoc encoder: {output_path}")
+    try:
+        for f in frames:
+            enc.write(f)
+    finally:
+        enc.release()
+
+
+def _job_boomerang(frames, output_path, fps, loops, encoder_options):
+    t0 = time.perf_counter()
+    # Xuôi rồi ngược (bỏ frame đầu/cuối ở chiều ngược để không bị khựng)
+    cycle = list(frames) + list(frames[-2:0:-1])
+    sequence = cycle * max(1, loops)
+    _write_mp4(sequence, output_path, fps, encoder_options)
+    return {"path": output_path, "frames": len(sequence), "work_ms": (time.perf_counter() - t0) * 1000.0}
+
+
+def _job_timelapse(video_path, output_path, speed, width, encoder_options):
+    t0 = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Khong mo duoc video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+    frames = []
+    index = 0
+    try:
+        while True:
+            # grab() bỏ qua giải mã các frame không dùng tới
+            if not cap.grab():
+                break
+            if index % speed == 0:
+                ok, img = cap.retrieve()
+                if ok:
+                    h, w = img.shape[:2]
+                    if w > width:
+                        img = cv2.resize(img, (width, round(h * width / w)), interpolation=cv2.INTER_AREA)
+                    frames.append(img)
+            index += 1
+    finally:
+        cap.release()
+    if not frames:
+        raise IOError("Video rong")
+    _write_mp4(frames, output_path, fps, encoder_options)
+    return {"path": output_path, "frames": len(frames), "work_ms": (time.perf_counter() - t0) * 1000.0}
+
+
+# --- Tiến trình chính ---
+
+class MediaJob:
+    """Một job đã gửi đi. result() chặn -> chỉ gọi ở luồng nền."""
+
+    def __init__(self, kind, future=None, submit=None):
+        self.kind = kind
+        self.future = future
+        self._submit = submit           # Gửi job muộn (vd: chờ video ghi xong)
+        self.submitted = time.perf_counter()
+        self.prepare_ms = 0.0           # Thời gian chuẩn bị ở tiến trình chính (thu nhỏ frame)
+        self.timing = {}
+
+    @property
+    def is_video(self):
+        return self.kind != "gif"
+
+    def result(self, timeout=120.0):
+        """Đường dẫn file kết quả hoặc None nếu lỗi."""
+        try:
+            if self.future is None and self._submit is not None:
+                self.future = self._submit()
+            if self.future is None:
+                return None
+            info = self.future.result(timeout)
+        except Exception as e:
+            print(f"[MEDIA JOB] {self.kind} loi: {e}")
+            return None
+        self.timing = {
+            "prepare_ms": round(self.prepare_ms, 1),
+            "work_ms": round(info["work_ms"], 1),
+            "total_ms": round((time.perf_counter() - self.submitted) * 1000.0, 1),
+            "frames": info["frames"],
+        }
+        print(f"[MEDIA JOB] {self.kind} xong: {info['path']} {self.timing}")
+        return info["path"]
+
+
+class MediaJobService:
+    """Quản lý ProcessPoolExecutor cho các job media."""
+
+    def __init__(self, output_dir, max_workers=None, width=480, encoder_options=None):
+        self.output_dir = output_dir
+        # Mặc định chừa 1 lõi cho giao diện
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.width = width                  # Chiều rộng đầu ra (ảnh động không cần full-res)
+        self.encoder_options = encoder_options or {}
+        self._executor = None
+        # _pool() được gọi từ nhiều luồng (GUI, luồng upload, luồng BrandedVideo)
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Tạo pool khi cần lần đầu (tránh tốn tài nguyên nếu không dùng)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _encoder_kwargs(self):
+        return {k: v for k, v in self.encoder_options.items() if k != "passthrough"}
+
+    def _output_path(self, kind, ext):
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.output_dir, f"{kind}_{ts}.{ext}")
+
+    def _downscale(self, frames):
+        """Thu nhỏ frame ở tiến trình chính trước khi gửi sang tiến trình con."""
+        out = []
+        for f in frames:
+            h, w = f.shape[:2]
+            if w > self.width:
+                f = cv2.resize(f, (self.width, round(h * self.width / w)), interpolation=cv2.INTER_AREA)
+            out.append(f)
+        return out
+
+    def submit_gif(self, frames, fps=8):
+        if not frames:
+            return None
+        t0 = time.perf_counter()
+        small = self._downscale(frames)
+        job = MediaJob("gif", self._pool().submit(_job_gif, small, self._output_path("gif", "gif"), fps))
+        job.prepare_ms = (time.perf_counter() - t0) * 1000.0
+        return job
+
+    def submit_boomerang(self, frames, fps=20, loops=3):
+        if len(frames) < 2:
+            return None
+        t0 = time.perf_counter()
+        small = self._downscale(frames)
+        job = MediaJob("boomerang", self._pool().submit(
+            _job_boomerang, small, self._output_path("boomerang", "mp4"), fps, loops,
+            self._encoder_kwargs()))
+        job.prepare_ms = (time.perf_counter() - t0) * 1000.0
+        return job
+
+    def submit_timelapse(self, video_path, speed=4):
+        """Video có thể đang được luồng ghi đóng lại -> chỉ gửi job khi file sẵn sàng."""
+        if not video_path:
+            return None
+        from src.services.camera.video_recorder import wait_for_recording
+
+        def submit():
+            wait_for_recording(video_path)
+            if not os.path.exists(video_path):
+                return None
+            return self._pool().submit(_job_timelapse, video_path, self._output_path("timelapse", "mp4"),
+                                       speed, self.width, self._encoder_kwargs())
+        return MediaJob("timelapse", submit=submit)
+
+    def submit_branded(self, video_path, template_path, slots=None, width=720):
+        """
+        Lồng khung template vào video session. Việc điều phối (chờ file, chuẩn bị
+        overlay, chia đoạn, ghép) chạy ở luồng nền; phần nặng chạy trên pool.
+        """
+        if not video_path or not template_path:
+            return None
+        from src.services.camera.video_recorder import wait_for_recording
+        from src.services.media.branded_video import brand_video, prepare_overlay
+
+        future = Future()
+
+        def run():
+            try:
+                wait_for_recording(video_path)
+                if not os.path.exists(video_path):
+                    raise IOError("Khong co file video")
+                t0 = time.perf_counter()
+                # Overlay chuẩn bị 1 lần cho cả video, dùng chung cho mọi đoạn
+                overlay = prepare_overlay(template_path, width, slots)
+                if overlay is None:
+                    raise ValueError("Template khong co kenh alpha")
+                job.prepare_ms = (time.perf_counter() - t0) * 1000.0
+                future.set_result(brand_video(self._pool(), self.max_workers, video_path,
+                                              self._output_path("branded", "mp4"), overlay,
+                                              self._encoder_kwargs()))
+            except Exception as e:
+                future.set_exception(e)
+
+        job = MediaJob("branded", future)
+        threading.Thread(target=run, name="BrandedVideo", daemon=True).start()
+        return job
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -149,33 +149,51 @@ LAYOUT_4x1 = {
 CUSTOM_LAYOUTS_FILE = CUSTOM_LAYOUTS_PATH
 CUSTOM_LAYOUTS = {}
 
-def load_custom_layouts(force_reload=False):
-    """Tải các layout custom từ file json."""
-    global CUSTOM_LAYOUTS
-    
-    # Chỉ load nếu chưa có dữ liệu hoặc yêu cầu load lại
-    if CUSTOM_LAYOUTS and not force_reload:
-        return CUSTOM_LAYOUTS
-        
-    if not os.path.exists(CUSTOM_LAYOUTS_FILE) or os.path.getsize(CUSTOM_LAYOUTS_FILE) == 0:
+def _read_custom_layouts():
+    """
+    Đọc custom_layouts.json thành dict MỚI.
+    Trả về {} nếu chưa có file, None nếu file rỗng / lỗi (vd: đang được ghi dở).
+    """
+    if not os.path.exists(CUSTOM_LAYOUTS_FILE):
         return {}
-        
     try:
+        if os.path.getsize(CUSTOM_LAYOUTS_FILE) == 0:
+            return None
         with open(CUSTOM_LAYOUTS_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            if not isinstance(data, dict):
-                return {}
-                
-            # Chuyển list sang tuple cho SLOTS nếu cần
-            for key, val in data.items():
-                if "SLOTS" in val:
-                    val["SLOTS"] = [tuple(s) for s in val["SLOTS"]]
-            
-            CUSTOM_LAYOUTS.update(data)
-            return CUSTOM_LAYOUTS
+        if not isinstance(data, dict):
+            return None
+
+        # Chuyển list sang tuple cho SLOTS nếu cần
+        for key, val in data.items():
+            if "SLOTS" in val:
+                val["SLOTS"] = [tuple(s) for s in val["SLOTS"]]
+        return data
     except Exception as e:
         print(f"Lỗi đọc custom_layouts.json: {e}")
-        return {}
+        return None
+
+
+def reload_custom_layouts():
+    """
+    Đọc lại file, chỉ thay nội dung CUSTOM_LAYOUTS khi đọc thành công
+    (giữ nguyên đối tượng dict đang được tham chiếu). Trả về True nếu đã thay.
+    """
+    data = _read_custom_layouts()
+    if data is None:
+        return False
+    CUSTOM_LAYOUTS.clear()
+    CUSTOM_LAYOUTS.update(data)
+    return True
+
+
+def load_custom_layouts(force_reload=False):
+    """Tải các layout custom từ file json (lỗi đọc -> giữ các layout đã có)."""
+    # Chỉ load nếu chưa có dữ liệu hoặc yêu cầu load lại
+    if CUSTOM_LAYOUTS and not force_reload:
+        return CUSTOM_LAYOUTS
+    reload_custom_layouts()
+    return CUSTOM_LAYOUTS
 
 # Load ngay khi import
 load_custom_layouts()
@@ -130,10 +130,13 @@ class DownloadQRDialog(QDialog):
 class DownloadSingleQRDialog(QDialog):
     """Dialog hiển thị QR code dẫn tới Landing Page (Dùng cho bản Free/Interactive)."""
 
-    def __init__(self, image_data, video_path=None, parent=None):
+    def __init__(self, image_data, video_path=None, parent=None, video_uploader=None, media_jobs=None):
         super().__init__(parent)
         self.image_data = image_data
         self.video_path = video_path
+        self.video_uploader = video_uploader  # Video đã upload theo đoạn (SegmentUploader)
+        self.media_jobs = media_jobs or []    # GIF / boomerang / timelapse đang tạo ở tiến trình nền
+        self.video_failed = False             # Video không upload đủ -> trang chỉ có ảnh
 
         self.setWindowTitle("📱 Download your memories")
         self.setFixedSize(500, 600)
@@ -191,16 +194,20 @@ class DownloadSingleQRDialog(QDialog):
 
     def start_combined_upload(self):
         """Bắt đầu upload từ RAM + Video (nếu có)."""
-        self.thread = CloudinaryLandingPageThread(self.image_data, self.video_path)
+        self.thread = CloudinaryLandingPageThread(self.image_data, self.video_path, self.video_uploader,
+                                                  self.media_jobs)
         self.thread.upload_success.connect(self.on_upload_success)
         self.thread.upload_error.connect(self.on_upload_error)
+        self.thread.video_error.connect(self.on_video_error)
         self.thread.start()
 
     def on_upload_success(self, url):
         self.title_label.setText("📱 SCAN TO DOWNLOAD")
         self.title_label.setStyleSheet("font-size: 24px; font-weight: bold; color: #06d6a0;")
         
-        if self.video_path:
+        if self.video_failed:
+            self.status_label.setText("Photos ready! The video could not be uploaded.")
+        elif self.video_path:
             self.status_label.setText("Memories ready! Includes photos & video.")
         else:
             self.status_label.setText("Memories ready! Scan to get photos.")
@@ -224,6 +231,10 @@ class DownloadSingleQRDialog(QDialog):
         self.status_label.setText(f"An error occurred: {error_msg}")
         self.btn_close.show()
 
+    def on_video_error(self, error_msg):
+        print(f"[UPLOAD] Video khong day du: {error_msg}")
+        self.video_failed = True
+
 
 class FinishDialog(QDialog):
     """
@@ -232,10 +243,14 @@ class FinishDialog(QDialog):
     - Chọn số lượng bản in (Chẵn cho dọc, tự nhiên cho custom)
     """
 
-    def __init__(self, image_data, video_path=None, layout_type="4x1", parent=None):
+    def __init__(self, image_data, video_path=None, layout_type="4x1", parent=None, video_uploader=None,
+                 media_jobs=None):
         super().__init__(parent)
         self.image_data = image_data
         self.video_path = video_path
+        self.video_uploader = video_uploader  # Video đã upload theo đoạn (SegmentUploader)
+        self.media_jobs = media_jobs or []    # GIF / boomerang / timelapse đang tạo ở tiến trình nền
+        self.video_failed = False             # Video không upload đủ -> trang chỉ có ảnh
         self.layout_type = layout_type
         
         # Tự động phát hiện group của layout để áp dụng quy tắc in
@@ -376,13 +391,16 @@ class FinishDialog(QDialog):
         self.lbl_count.setText(str(self.print_count))
 
     def start_upload(self):
-        self.thread = CloudinaryLandingPageThread(self.image_data, self.video_path)
+        self.thread = CloudinaryLandingPageThread(self.image_data, self.video_path, self.video_uploader,
+                                                  self.media_jobs)
         self.thread.upload_success.connect(self.on_upload_success)
         self.thread.upload_error.connect(self.on_upload_error)
+        self.thread.video_error.connect(self.on_video_error)
         self.thread.start()
 
     def on_upload_success(self, url):
-        self.status_label.setText("✅ SCAN TO DOWNLOAD")
+        self.status_label.setText("✅ SCAN TO DOWNLOAD (photos only)" if self.video_failed
+                                  else "✅ SCAN TO DOWNLOAD")
         qr = qrcode.QRCode(version=1, box_size=10, border=1)
         qr.add_data(url)
         qr.make(fit=True)
@@ -395,3 +413,7 @@ class FinishDialog(QDialog):
 
     def on_upload_error(self, error):
         self.status_label.setText(f"❌ Error: {error[:30]}")
+
+    def on_video_error(self, error):
+        print(f"[UPLOAD] Video khong day du: {error}")
+        self.video_failed = True
@@ -10,7 +10,6 @@ Các hàm xử lý ảnh liên quan đến Qt:
 """
 
 import cv2
-import numpy as np
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QPainterPath
 from PyQt5.QtCore import Qt
 
@@ -54,25 +53,19 @@ def get_rounded_pixmap(input_data, radius=24):
 
 
 def overlay_images(background, foreground):
-    """Ghép ảnh foreground (có alpha) lên background."""
+    """Ghép ảnh foreground (có alpha) lên background (xem services/image/compositor.py)."""
+    from src.services.image.compositor import prepare_template
+
     bg_h, bg_w = background.shape[:2]
     fg_h, fg_w = foreground.shape[:2]
 
     if (bg_w, bg_h) != (fg_w, fg_h):
         print(f"[WARNING] overlay_images: kích thước khác nhau! Background={bg_w}x{bg_h}, Template={fg_w}x{fg_h} → resize template")
-        foreground = cv2.resize(foreground, (bg_w, bg_h))
 
-    if foreground.shape[2] < 4:
+    prepared = prepare_template(foreground, bg_w, bg_h)
+    if prepared is None:
         return background
-
-    alpha = foreground[:, :, 3] / 255.0
-    output = np.zeros_like(background)
-
-    for c in range(0, 3):
-        output[:, :, c] = (foreground[:, :, c] * alpha +
-                           background[:, :, c] * (1.0 - alpha))
-
-    return output
+    return prepared.composite(background)
 
 
 def convert_cv_qt(cv_img):
@@ -0,0 +1,85 @@
+# ==========================================
+# TEST COLLAGE - create_collage (LayoutPlan) so với bản gốc
+# ==========================================
+"""
+create_collage dựng từ LayoutPlan phải cho ra đúng từng pixel như create_collage
+gốc (tính toạ độ lưới theo số ảnh, resize INTER_LINEAR) với layout lưới.
+"""
+
+import unittest
+
+import cv2
+import numpy as np
+
+from src.services.image.collage import create_collage, crop_to_aspect_wh
+from src.shared.types.models import get_layout_config
+
+
+def baseline_collage(images, layout_type):
+    """create_collage gốc (phần layout lưới, bỏ importlib.reload và log)."""
+    config = get_layout_config(layout_type)
+    pad_top = config.get("PAD_TOP", 20)
+    pad_bottom = config.get("PAD_BOTTOM", 100)
+    pad_left = config.get("PAD_LEFT", 20)
+    pad_right = config.get("PAD_RIGHT", 20)
+    gap = config.get("GAP", 15)
+    canvas_w = config.get("CANVAS_W", 1280)
+    canvas_h = config.get("CANVAS_H", 720)
+
+    canvas = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
+    count = len(images)
+    if count == 2:
+        if layout_type == "2x1":
+            img_w = canvas_w - pad_left - pad_right
+            img_h = (canvas_h - pad_top - pad_bottom - gap) // 2
+            positions = [(pad_left, pad_top + i * (img_h + gap)) for i in range(2)]
+        else:
+            img_w = (canvas_w - pad_left - pad_right - gap) // 2
+            img_h = canvas_h - pad_top - pad_bottom
+            positions = [(pad_left + i * (img_w + gap), pad_top) for i in range(2)]
+    elif count == 4:
+        if layout_type == "4x1":
+            img_w = canvas_w - pad_left - pad_right
+            img_h = (canvas_h - pad_top - pad_bottom - 3 * gap) // 4
+            positions = [(pad_left, pad_top + i * (img_h + gap)) for i in range(4)]
+        else:
+            img_w = (canvas_w - pad_left - pad_right - gap) // 2
+            img_h = (canvas_h - pad_top - pad_bottom - gap) // 2
+            positions = [(pad_left + (i % 2) * (img_w + gap), pad_top + (i // 2) * (img_h + gap))
+                         for i in range(4)]
+    else:
+        return canvas
+
+    for img, (x, y) in zip(images, positions):
+        cropped = crop_to_aspect_wh(img, img_w, img_h)
+        canvas[y:y + img_h, x:x + img_w] = cv2.resize(cropped, (img_w, img_h))
+    return canvas
+
+
+class CreateCollageBaselineTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # Ảnh ngang, ảnh dọc và ảnh nhỏ hơn ô (phóng to)
+        sizes = [(720, 1280), (1280, 720), (480, 640), (120, 160)]
+        self.photos = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for h, w in sizes]
+
+    def test_grid_layouts_match_baseline(self):
+        for layout_type in ("2x2", "1x2", "2x1", "4x1"):
+            for count in (2, 4):
+                with self.subTest(layout=layout_type, count=count):
+                    images = self.photos[:count]
+                    expected = baseline_collage(images, layout_type)
+                    actual = create_collage(images, layout_type)
+                    self.assertEqual(actual.shape, expected.shape)
+                    self.assertTrue(np.array_equal(actual, expected))
+
+    def test_other_counts_give_blank_canvas(self):
+        for layout_type in ("2x2", "4x1"):
+            with self.subTest(layout=layout_type):
+                expected = baseline_collage(self.photos[:3], layout_type)
+                self.assertTrue(np.array_equal(create_collage(self.photos[:3], layout_type), expected))
+
+
+if __name__ == "__main__":
+    unittest.main()